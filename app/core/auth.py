@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.models import User, RevokedToken
+from .cache import MemoryCache
+from .config import PRINCIPAL_CACHE_TTL, CACHE_MAX_ENTRIES
+from .database import get_db
+from .metrics import Counter
+from .security import decode_access_token
+
+_bearer = HTTPBearer(auto_error=False)
+
+# Resolved tokens, per process: user_id -> token id -> shop name. Revoked
+# token ids live in the database until the token expires, so every worker
+# sees a logout once its cached entry for the token runs out (at most
+# PRINCIPAL_CACHE_TTL), and the worker that handled it sees it at once.
+_users = MemoryCache(ttl=PRINCIPAL_CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+
+principal_hits = Counter()
+principal_misses = Counter()
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    shop_name: str
+    token_id: str
+    expires_at: int
+
+
+def _unauthorized(detail: str):
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def revoke(db: AsyncSession, principal: Principal):
+    """Record the token as revoked until it expires; expired records are dropped on the way."""
+    now = datetime.utcnow()
+    await db.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+    db.add(RevokedToken(
+        jti=principal.token_id,
+        user_id=principal.user_id,
+        expires_at=datetime.utcfromtimestamp(principal.expires_at)
+    ))
+    await db.commit()
+    forget_user(principal.user_id)
+
+
+def forget_user(user_id: int):
+    """Drop a cached user so the next request re-reads it."""
+    _users.invalidate(user_id)
+
+
+async def get_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    if credentials is None:
+        raise _unauthorized("Not authenticated")
+
+    claims = decode_access_token(credentials.credentials)
+    if claims is None:
+        raise _unauthorized("Invalid or expired token")
+
+    user_id = claims["sub"]
+    shop_name = _users.get(user_id, claims["jti"])
+    if shop_name is None:
+        principal_misses.inc()
+        # The user and the token's revocation in one round trip
+        row = (await db.execute(select(
+            User.shop_name,
+            exists().where(RevokedToken.jti == claims["jti"]).label("revoked")
+        ).where(User.user_id == user_id))).first()
+        if row is None:
+            raise _unauthorized("User no longer exists")
+        if row.revoked:
+            raise _unauthorized("Token has been revoked")
+        shop_name = row.shop_name
+        _users.set(user_id, claims["jti"], shop_name)
+    else:
+        principal_hits.inc()
+
+    return Principal(user_id=user_id, shop_name=shop_name, token_id=claims["jti"], expires_at=claims["exp"])
+
+
+def auth_stats() -> dict:
+    return {"principal_hits": principal_hits.value, "principal_misses": principal_misses.value}
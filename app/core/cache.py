@@ -0,0 +1,111 @@
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from .config import CACHE_BACKEND, CACHE_TTL, CACHE_MAX_ENTRIES
+from .metrics import Counter
+
+
+class MemoryCache:
+    """In-process LRU with a per-entry TTL, grouped by namespace.
+
+    A custom backend only needs the same get / set / invalidate methods;
+    `set` may be given a TTL for that entry instead of the backend's own.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove((namespace, key))
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace, key, value, ttl: float = None):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end((namespace, key))
+            self._namespaces.setdefault(namespace, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, namespace):
+        with self._lock:
+            for key in self._namespaces.pop(namespace, ()):
+                self._entries.pop((namespace, key), None)
+
+    def _remove(self, entry_key):
+        self._entries.pop(entry_key, None)
+        namespace, key = entry_key
+        keys = self._namespaces.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespaces[namespace]
+
+
+class NullCache:
+    def get(self, namespace, key):
+        return None
+
+    def set(self, namespace, key, value, ttl: float = None):
+        pass
+
+    def invalidate(self, namespace):
+        pass
+
+
+class ResponseCache:
+    """Caches per-shop responses; every write for a shop drops its entries."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = Counter()
+        self.misses = Counter()
+        self.invalidations = Counter()
+
+    def get(self, user_id: int, key):
+        value = self.backend.get(user_id, key)
+        if value is None:
+            self.misses.inc()
+        else:
+            self.hits.inc()
+        return value
+
+    def set(self, user_id: int, key, value):
+        self.backend.set(user_id, key, value)
+
+    def invalidate(self, user_id: int):
+        self.invalidations.inc()
+        self.backend.invalidate(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "invalidations": self.invalidations.value
+        }
+
+
+def load_backend(name: str):
+    if name == "memory":
+        return MemoryCache()
+    if name == "none":
+        return NullCache()
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+dashboard_cache = ResponseCache(load_backend(CACHE_BACKEND))
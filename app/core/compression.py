@@ -0,0 +1,154 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from .config import COMPRESSION_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Already compressed (exports are zip containers) or not worth the CPU
+SKIP_CONTENT_TYPES = ("image/", "application/zip", "application/gzip", "application/vnd.openxmlformats")
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Emit everything so far without ending the stream
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+ENCODERS = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+
+# Server preference when the client accepts several equally
+PREFERENCE = ("br", "gzip")
+
+
+def negotiate(accept_encoding: str):
+    """Pick an encoder class from an Accept-Encoding header, or None."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    best = None
+    for name in PREFERENCE:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if name in ENCODERS and quality > 0 and (best is None or quality > best[1]):
+            best = (name, quality)
+    return ENCODERS[best[0]] if best else None
+
+
+class CompressionMiddleware:
+    """Brotli (when installed) or gzip for responses of at least `minimum_size` bytes.
+
+    Streaming responses are compressed chunk by chunk and flushed after each
+    one, so NDJSON ledger streams still arrive incrementally.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoder_class = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoder_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                headers = Headers(raw=message.get("headers", []))
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or headers.get("content-type", "").startswith(SKIP_CONTENT_TYPES)
+                )
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start is not None:
+                headers = MutableHeaders(raw=start.setdefault("headers", []))
+                if not passthrough:
+                    headers.add_vary_header("Accept-Encoding")
+                if passthrough or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                else:
+                    encoder = encoder_class()
+                    headers["Content-Encoding"] = encoder.name
+                    if "content-length" in headers:
+                        del headers["Content-Length"]
+                    if not more_body:
+                        body = encoder.compress(body) + encoder.finish()
+                        headers["Content-Length"] = str(len(body))
+                        encoder = None
+                        message = {**message, "body": body}
+                await send(start)
+                start = None
+                if encoder is None:
+                    await send(message)
+                    return
+
+            if encoder is None:
+                await send(message)
+                return
+
+            chunk = encoder.compress(body) + (encoder.flush() if more_body else encoder.finish())
+            await send({**message, "body": chunk})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,7 +1,107 @@
 import os
+import secrets
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5500").split(",")
\ No newline at end of file
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5500").split(",")
+
+# Async engine mode: handlers await an AsyncSession on an async driver
+# (asyncpg / aiosqlite) instead of running a sync Session in the threadpool.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Connection pool (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Startup. Pending migrations are applied by `manage.py migrate`, by
+# serve.py before it starts workers, or by each process's lifespan hook
+# while MIGRATE_ON_STARTUP is on. The database gets DB_STARTUP_TIMEOUT
+# seconds to come up; WARMUP_CONNECTIONS pooled connections are opened and
+# the hot statements compiled before the first request.
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+DB_STARTUP_TIMEOUT = float(os.getenv("DB_STARTUP_TIMEOUT", "30"))
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "2"))
+
+# serve.py: worker processes and how long a stopping worker may spend
+# finishing in-flight requests
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+# Optional read replicas for the read-only GET routes: comma-separated URLs
+# (async URLs are derived as for the primary). So a shop sees its own
+# changes, a replica serves its reads only once it has caught up with the
+# shop's last write: the version sent back in the X-Shop-Version header, or
+# the one recorded for REPLICA_STICKY_SECONDS after the write (in the shared
+# cache backend if one is configured, else per process); keep this above
+# the replicas' usual lag. A replica that can't be reached is skipped for
+# REPLICA_RETRY_SECONDS.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+# Ledger writes that lose a deadlock/serialization race (or find SQLite
+# locked) are rolled back and rerun: attempts in total, base backoff seconds
+WRITE_RETRY_ATTEMPTS = int(os.getenv("WRITE_RETRY_ATTEMPTS", "4"))
+WRITE_RETRY_BACKOFF = float(os.getenv("WRITE_RETRY_BACKOFF", "0.02"))
+
+# Dashboard response cache: "memory" (in-process LRU + TTL), "none", or a
+# "module:Class" path to a custom backend
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+# Bulk import: rows per transaction and per request
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "50000"))
+# Queued offline writes accepted by one POST /api/sync
+SYNC_MAX_OPERATIONS = int(os.getenv("SYNC_MAX_OPERATIONS", "500"))
+
+# Response compression: brotli when the package is installed, else gzip.
+# Bodies smaller than COMPRESSION_MIN_SIZE bytes are sent as they are.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Password hashing: "scrypt" or "pbkdf2_sha256". Stored hashes made with
+# other parameters are upgraded on the next successful login.
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "scrypt")
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+PBKDF2_ITERATIONS = int(os.getenv("PBKDF2_ITERATIONS", "600000"))
+# Threads reserved for hashing so login bursts can't take the shared threadpool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+# Access tokens are HMAC-signed and verified without a database round trip.
+# Set SECRET_KEY in production: the random fallback invalidates every token
+# on restart and differs between worker processes.
+SECRET_KEY = os.getenv("SECRET_KEY") or secrets.token_urlsafe(32)
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", str(12 * 3600)))
+# How long a resolved user stays cached before it is re-read from the database
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+
+# Statements slower than this are logged with the route that ran them
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+# Customer search on SQLite uses an in-process index per shop; it is rebuilt
+# after customer writes in this process or once this many seconds pass
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "300"))
+
+# Background jobs (exports) run on their own bounded thread pool and write
+# their output under JOB_OUTPUT_DIR; a shop can have this many unfinished.
+# The process running a job refreshes its heartbeat every
+# JOB_HEARTBEAT_SECONDS; a running job without one for JOB_STALE_SECONDS
+# lost its process to a restart or crash and is failed when a process starts.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "5"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_CHUNK_ROWS = int(os.getenv("JOB_CHUNK_ROWS", "1000"))
+JOB_OUTPUT_DIR = os.getenv("JOB_OUTPUT_DIR") or os.path.join(tempfile.gettempdir(), "shopkhata-jobs")
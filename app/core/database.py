@@ -1,15 +1,251 @@
-from sqlalchemy import create_engine
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+from .config import (
+    DATABASE_URL, DB_ASYNC, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, WRITE_RETRY_ATTEMPTS, WRITE_RETRY_BACKOFF
+)
+from .metrics import Histogram, Counter
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+
+class _TimedPoolMixin:
+    """Records how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_time = Histogram()
+        self.timeouts = Counter()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_time, pool.timeouts = self.wait_time, self.timeouts
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts.inc()
+            raise
+        finally:
+            self.wait_time.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, poolclass) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    # In-memory SQLite needs its single-connection pool
+    if make_url(url).database in (None, "", ":memory:"):
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE
+    )
+    return options
+
+
+def pool_stats(pool) -> dict:
+    stats = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow
+        )
+    if isinstance(pool, _TimedPoolMixin):
+        stats.update(timeouts=pool.timeouts.value, wait_seconds=pool.wait_time.snapshot())
+    return stats
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, TimedQueuePool))
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    async_url = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+    async_engine = create_async_engine(async_url, **engine_options(async_url, TimedAsyncQueuePool))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Rows the ORM buffers at a time for ThreadedSession.stream()
+STREAM_YIELD_PER = 1000
+
+
+class _ThreadedStream:
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size: int):
+        while True:
+            rows = await run_in_threadpool(self._result.fetchmany, size)
+            if not rows:
+                break
+            yield rows
+
+
+class ThreadedSession:
+    """AsyncSession-compatible wrapper that runs a sync Session in the threadpool.
+
+    Lets the async handlers run unchanged when DB_ASYNC is off.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def _execute(self, statement, params=None, **kwargs):
+        result = self.sync_session.execute(statement, params, **kwargs)
+        # Buffer rows like AsyncSession does so nothing touches the
+        # connection once we are back on the event loop. ORM bulk
+        # RETURNING results can't be frozen; their DBAPI cursor has
+        # already been read by the executemany.
+        if getattr(result, "returns_rows", True):
+            try:
+                return result.freeze()()
+            except NotImplementedError:
+                pass
+        return result
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self._execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalar()
+
+    async def scalars(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalars()
+
+    async def stream(self, statement, params=None, **kwargs):
+        # Without yield_per the ORM fetches every row on the first fetch
+        result = await run_in_threadpool(
+            self.sync_session.execute, statement, params,
+            execution_options={"stream_results": True, "yield_per": STREAM_YIELD_PER}, **kwargs
+        )
+        return _ThreadedStream(result)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, objects=None):
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def connection(self):
+        return await run_in_threadpool(self.sync_session.connection)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+@asynccontextmanager
+async def session_scope():
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = ThreadedSession(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+async def get_db():
+    async with session_scope() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+
+# SQLSTATEs for serialization_failure and deadlock_detected
+RETRYABLE_SQLSTATES = ("40001", "40P01")
+
+write_retries = Counter()
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for a lost lock race that a rerun of the transaction can win."""
+    if not isinstance(error, exc.DBAPIError) or error.connection_invalidated:
+        return False
+    orig = error.orig
+    # psycopg2 sets pgcode; asyncpg (through the adapter) sets sqlstate
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if code in RETRYABLE_SQLSTATES:
+        return True
+    return isinstance(error, exc.OperationalError) and "database is locked" in str(orig)
+
+
+async def retry_on_conflict(db, operation, attempts: int = WRITE_RETRY_ATTEMPTS):
+    """Run `await operation()` as one transaction, rerunning it if it loses a lock race.
+
+    The operation must start from scratch each time (re-read rows, build new
+    ORM objects) and commit itself; on a retryable error the session is
+    rolled back and the operation rerun after a jittered backoff.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return await operation()
+        except exc.DBAPIError as e:
+            await db.rollback()
+            if attempt == attempts or not is_retryable(e):
+                raise
+            write_retries.inc()
+            await asyncio.sleep(WRITE_RETRY_BACKOFF * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+
+async def dispose_engines():
+    # Close pooled connections so async driver threads don't outlive the loop
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
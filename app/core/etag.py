@@ -0,0 +1,50 @@
+from typing import Optional
+from fastapi import HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.models import CustomerBalance, ShopVersion
+
+
+async def shop_version(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(ShopVersion.version).where(ShopVersion.user_id == user_id)) or 0
+
+
+async def customer_version(db: AsyncSession, user_id: int, customer_id: int) -> Optional[int]:
+    """None when the customer doesn't exist or belongs to another shop."""
+    return await db.scalar(select(CustomerBalance.version).where(
+        CustomerBalance.customer_id == customer_id,
+        CustomerBalance.user_id == user_id
+    ))
+
+
+def weak_etag(*parts) -> str:
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match always uses the weak comparison
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def etag_headers(etag: str) -> dict:
+    # Per-shop data: clients may keep it but must revalidate every time
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def check_etag(request: Request, *parts) -> str:
+    """Build the ETag for `parts`; raises 304 if the client already has it.
+
+    Call with the version read before any other query, so a response is
+    never tagged with a version newer than the data it was built from.
+    """
+    etag = weak_etag(*parts)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=etag_headers(etag))
+    return etag
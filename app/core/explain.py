@@ -0,0 +1,96 @@
+import re
+from sqlalchemy import func, select, text
+from core.database import Base
+from models.models import (
+    Credit, Payment, Customer, CustomerBalance, MonthlyTotal, ClosedPeriod, LedgerCheckpoint, CreditArchive
+)
+
+# Words in a plan line that mean the table was read through an index
+SQLITE_INDEX_MARKERS = ("USING INDEX", "USING COVERING INDEX", "USING INTEGER PRIMARY KEY")
+POSTGRES_INDEX_MARKERS = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+# A plan line that reads a whole table; the group is the table name.
+# SQLite's "SCAN t USING ... INDEX" walks an index and isn't matched, and
+# names that aren't tables ("SCAN CONSTANT ROW", subqueries) are ignored.
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)\b(?! USING)")
+POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def hot_queries(user_id: int = 1, customer_id: int = 1, year: int = 2024) -> dict:
+    """The statement shapes the list, dashboard and ledger routes run."""
+    return {
+        "credits_page": select(Credit, Customer.name).outerjoin(
+            Customer, Customer.customer_id == Credit.customer_id
+        ).where(Credit.user_id == user_id).order_by(Credit.date.desc(), Credit.credit_id.desc()).limit(51),
+        "payments_page": select(Payment, Customer.name).outerjoin(
+            Customer, Customer.customer_id == Payment.customer_id
+        ).where(Payment.user_id == user_id).order_by(Payment.date.desc(), Payment.payment_id.desc()).limit(51),
+        "customers_list": select(Customer).where(Customer.user_id == user_id),
+        "customers_search_name": select(Customer, CustomerBalance.outstanding).join(
+            CustomerBalance, CustomerBalance.customer_id == Customer.customer_id
+        ).where(Customer.user_id == user_id).order_by(Customer.name, Customer.customer_id).limit(51),
+        "customers_recent_activity": select(CustomerBalance.customer_id).where(
+            CustomerBalance.user_id == user_id
+        ).order_by(CustomerBalance.updated_at.desc()).limit(51),
+        "charts_monthly_totals": select(MonthlyTotal).where(
+            MonthlyTotal.user_id == user_id, MonthlyTotal.year >= year, MonthlyTotal.year <= year
+        ),
+        "top_customers": select(CustomerBalance.customer_id, CustomerBalance.outstanding).where(
+            CustomerBalance.user_id == user_id, CustomerBalance.outstanding > 0
+        ).order_by(CustomerBalance.outstanding.desc()).limit(5),
+        "sync_credits": select(Credit).where(Credit.user_id == user_id, Credit.version > 0).order_by(
+            Credit.version, Credit.credit_id
+        ),
+        "sync_credits_archive": select(CreditArchive).where(
+            CreditArchive.user_id == user_id, CreditArchive.version > 0
+        ).order_by(CreditArchive.version, CreditArchive.credit_id),
+        "ledger_credits": select(Credit).where(Credit.customer_id == customer_id).order_by(Credit.date),
+        "ledger_payments": select(Payment).where(Payment.customer_id == customer_id).order_by(Payment.date),
+        "ledger_checkpoint": select(LedgerCheckpoint).where(
+            LedgerCheckpoint.customer_id == customer_id
+        ).order_by(LedgerCheckpoint.period_end.desc()).limit(1),
+        "closed_through": select(func.max(ClosedPeriod.period_end)).where(ClosedPeriod.user_id == user_id),
+    }
+
+
+def explain(conn, statement) -> list:
+    compiled = statement.compile(dialect=conn.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        return [row[-1] for row in rows]
+
+    # Tiny test tables make the planner prefer sequential scans; we only
+    # want to know whether an index is usable for the shape.
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {compiled}", params).all()]
+
+
+def full_scans(plan: list, dialect_name: str) -> list:
+    """Tables the plan reads in full."""
+    pattern = SQLITE_FULL_SCAN if dialect_name == "sqlite" else POSTGRES_FULL_SCAN
+    matches = (pattern.search(line.strip()) for line in plan)
+    return [match.group(1) for match in matches if match and match.group(1) in Base.metadata.tables]
+
+
+def uses_index(plan: list, dialect_name: str) -> bool:
+    """True if the plan reads through an index and scans no table in full.
+
+    Checked per table: an indexed join partner doesn't hide a full scan.
+    """
+    markers = SQLITE_INDEX_MARKERS if dialect_name == "sqlite" else POSTGRES_INDEX_MARKERS
+    indexed = any(marker in line for line in plan for marker in markers)
+    return indexed and not full_scans(plan, dialect_name)
+
+
+def check_hot_queries(engine) -> dict:
+    """Plan every hot query; maps name -> (uses_index, plan lines)."""
+    results = {}
+    with engine.begin() as conn:
+        for name, statement in hot_queries().items():
+            plan = explain(conn, statement)
+            results[name] = (uses_index(plan, conn.dialect.name), plan)
+    return results
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from .config import SLOW_QUERY_MS
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """Queries and database time seen while serving one request."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_name(self.scope)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+_route_paths = {}
+
+
+def route_name(scope) -> str:
+    # The router stores the matched endpoint in the scope; map it back to
+    # the path template so /api/ledger/1 and /api/ledger/2 aggregate together.
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return f"{scope['method']} <unmatched>"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        for route in scope["app"].router.routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                path = _route_paths[endpoint] = route.path
+                break
+        else:
+            path = scope["path"]
+    return f"{scope['method']} {path}"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s",
+            elapsed * 1000, stats.route if stats is not None else "<no request>", " ".join(statement.split())
+        )
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument(engine):
+    """Count and time every statement run through `engine` (a sync Engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.queries_max = 0
+        self.db_seconds = 0.0
+        self.handler_seconds = Histogram()
+
+
+class RouteMetrics:
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, stats: RequestStats, handler_seconds: float):
+        with self._lock:
+            route_stats = self._routes.get(route)
+            if route_stats is None:
+                route_stats = self._routes[route] = RouteStats()
+            route_stats.requests += 1
+            route_stats.queries += stats.queries
+            route_stats.queries_max = max(route_stats.queries_max, stats.queries)
+            route_stats.db_seconds += stats.db_seconds
+        route_stats.handler_seconds.observe(handler_seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = dict(self._routes)
+        return {
+            route: {
+                "requests": stats.requests,
+                "queries": stats.queries,
+                "queries_per_request": round(stats.queries / stats.requests, 2),
+                "queries_max": stats.queries_max,
+                "db_seconds": round(stats.db_seconds, 6),
+                "handler_seconds": stats.handler_seconds.snapshot(),
+            }
+            for route, stats in sorted(routes.items())
+        }
+
+
+route_metrics = RouteMetrics()
+
+
+class QueryStatsMiddleware:
+    """Adds Server-Timing and X-Query-Count headers and feeds route_metrics.
+
+    Pure ASGI so the context variable set here is the one the handler (and
+    the engine events it triggers) runs under. Queries a StreamingResponse
+    runs after its headers are sent still count towards the route
+    aggregates, just not the headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                handler_ms = (time.perf_counter() - started) * 1000
+                timing = f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", app;dur={handler_ms:.1f}'
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.encode()))
+                headers.append((b"x-query-count", str(stats.queries).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            route_metrics.record(stats.route, stats, time.perf_counter() - started)
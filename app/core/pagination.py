@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(row_date: date, row_id: int) -> str:
+    raw = f"{row_date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        row_date, row_id = raw.split("|")
+        return date.fromisoformat(row_date), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_sort_cursor(value, row_id: int) -> str:
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps([str(value), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sort_cursor(cursor: str, parse):
+    """(parse(value), id) from encode_sort_cursor output."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return parse(value), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(sort_column, id_column, value, row_id: int, descending: bool):
+    """Rows that come after (value, row_id) in ORDER BY sort_column, id_column."""
+    if descending:
+        return or_(sort_column < value, and_(sort_column == value, id_column < row_id))
+    return or_(sort_column > value, and_(sort_column == value, id_column > row_id))
+
+
+def keyset_filter(date_column, id_column, cursor: str):
+    # Rows are listed newest first, so the next page holds everything
+    # strictly before the (date, id) of the last row already returned.
+    cursor_date, cursor_id = decode_cursor(cursor)
+    return keyset_after(date_column, id_column, cursor_date, cursor_id, descending=True)
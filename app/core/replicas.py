@@ -0,0 +1,237 @@
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from .auth import Principal, get_principal
+from .cache import MemoryCache, load_backend
+from .config import (
+    DB_ASYNC, DATABASE_REPLICA_URLS, REPLICA_STICKY_SECONDS, REPLICA_RETRY_SECONDS, CACHE_BACKEND, CACHE_MAX_ENTRIES
+)
+from .database import (
+    ThreadedSession, TimedQueuePool, TimedAsyncQueuePool, engine_options, pool_stats, session_scope, to_async_url
+)
+from .etag import shop_version
+from .metrics import Counter
+
+
+class Replica:
+    """One read replica, with the engine the current DB_ASYNC mode needs."""
+
+    def __init__(self, url: str):
+        self.url = url
+        if DB_ASYNC:
+            async_url = to_async_url(url)
+            self.engine = create_async_engine(async_url, **engine_options(async_url, TimedAsyncQueuePool))
+            self._sessions = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        else:
+            self.engine = create_engine(url, **engine_options(url, TimedQueuePool))
+            self._sessions = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=self.engine)
+        self.down_until = 0.0
+        self.reads = Counter()
+        self.failures = Counter()
+
+    @property
+    def sync_engine(self):
+        return getattr(self.engine, "sync_engine", self.engine)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self):
+        self.failures.inc()
+        self.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+    def session(self):
+        session = self._sessions()
+        return session if DB_ASYNC else ThreadedSession(session)
+
+    def stats(self) -> dict:
+        return {
+            "url": make_url(self.url).render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "reads": self.reads.value,
+            "failures": self.failures.value,
+            "pool": pool_stats(self.engine.pool),
+        }
+
+
+class ReplicaSet:
+    def __init__(self, urls):
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = itertools.count()
+
+    def candidates(self) -> list:
+        """Healthy replicas, round-robin: each call starts one further along."""
+        if not self.replicas:
+            return []
+        start = next(self._turn) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.healthy]
+
+    async def dispose(self):
+        for replica in self.replicas:
+            if DB_ASYNC:
+                await replica.engine.dispose()
+            else:
+                replica.engine.dispose()
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+# Each shop's last committed write version, kept for REPLICA_STICKY_SECONDS.
+# A configured shared cache backend makes it visible to every worker; the
+# in-process default only to this one, and clients that send back
+# X-Shop-Version cover the rest. Its own namespace, so dashboard_cache
+# invalidations on the same backend leave it alone.
+_last_writes = (
+    MemoryCache(ttl=REPLICA_STICKY_SECONDS, max_entries=CACHE_MAX_ENTRIES)
+    if CACHE_BACKEND in ("memory", "none") else load_backend(CACHE_BACKEND)
+)
+
+primary_reads = Counter()
+lagging_reads = Counter()
+
+VERSION_HEADER = "X-Shop-Version"
+
+_written: ContextVar[Optional[list]] = ContextVar("written_version", default=None)
+
+
+def _version_key(user_id: int) -> tuple:
+    return ("replica-version", user_id)
+
+
+def note_write(db, user_id: int, version: int):
+    """Record the shop's new version once `db` commits, so its reads skip replicas that haven't reached it.
+
+    A write that is refused and rolled back records nothing: replicas
+    never see that version.
+    """
+    info = db.sync_session.info
+    info.setdefault("written_versions", {})[user_id] = version
+    # The commit may run on a worker thread, outside this request's context
+    info["written_to"] = _written.get()
+
+
+@event.listens_for(Session, "after_commit")
+def _record_written(session):
+    written = session.info.pop("written_versions", None)
+    written_to = session.info.pop("written_to", None)
+    if not written:
+        return
+    for user_id, version in written.items():
+        if written_to is not None:
+            written_to[0] = version
+        if replicas.replicas and version > (_last_writes.get(*_version_key(user_id)) or 0):
+            _last_writes.set(*_version_key(user_id), version, ttl=REPLICA_STICKY_SECONDS)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written(session):
+    session.info.pop("written_versions", None)
+    session.info.pop("written_to", None)
+
+
+def required_version(request: Request, user_id: int) -> int:
+    """The version a replica must have reached to serve this shop's read."""
+    try:
+        sent = int(request.headers.get(VERSION_HEADER, 0))
+    except ValueError:
+        sent = 0
+    return max(sent, _last_writes.get(*_version_key(user_id)) or 0)
+
+
+class WriteVersionMiddleware:
+    """Adds X-Shop-Version to successful writes.
+
+    Clients send the last one back on reads, so whichever worker serves the
+    read knows what the shop has written. Pure ASGI for the same reason as
+    QueryStatsMiddleware: the handler has to run under the context set here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        written = [None]
+        token = _written.set(written)
+
+        async def send_with_version(message):
+            if message["type"] == "http.response.start" and written[0] is not None and message["status"] < 400:
+                headers = list(message.get("headers", []))
+                headers.append((VERSION_HEADER.lower().encode(), str(written[0]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_version)
+        finally:
+            _written.reset(token)
+
+
+@asynccontextmanager
+async def read_session(user_id: int, required: int = 0):
+    """A healthy replica that has reached version `required` of the shop, else the primary.
+
+    A replica that lags, and an unreachable replica set, fall back to the
+    primary. A replica that fails to connect, or drops its connection
+    mid-request, is skipped for REPLICA_RETRY_SECONDS.
+    """
+    for replica in replicas.candidates():
+        db = replica.session()
+        try:
+            # Connect up front so a dead replica can still be skipped
+            await db.connection()
+            behind = required and await shop_version(db, user_id) < required
+        except exc.DBAPIError:
+            await db.close()
+            replica.mark_down()
+            continue
+        if behind:
+            await db.close()
+            lagging_reads.inc()
+            continue
+
+        replica.reads.inc()
+        try:
+            yield db
+        except exc.DBAPIError as e:
+            if e.connection_invalidated:
+                replica.mark_down()
+            raise
+        finally:
+            await db.close()
+        return
+
+    primary_reads.inc()
+    async with session_scope() as db:
+        yield db
+
+
+async def get_read_db(request: Request, principal: Principal = Depends(get_principal)):
+    """Session for read-only routes: see read_session.
+
+    The replica must have caught up with the shop's last write
+    (required_version), so the shop always sees its own changes.
+    """
+    required = required_version(request, principal.user_id) if replicas.replicas else 0
+    async with read_session(principal.user_id, required) as db:
+        yield db
+
+
+def replica_stats() -> dict:
+    return {
+        "primary_reads": primary_reads.value,
+        "lagging_reads": lagging_reads.value,
+        "replicas": [replica.stats() for replica in replicas.replicas],
+    }
@@ -0,0 +1,62 @@
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    # Decimals go out as strings, matching what pydantic emits for the
+    # response models; dates only reach here on the stdlib fallback.
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def epoch_seconds(value: datetime) -> int:
+    """Naive UTC datetime (as stored) to Unix seconds."""
+    return (value - _EPOCH) // _SECOND
+
+
+def columnar_page(items: list, fields: tuple, next_cursor) -> dict:
+    """A list page as column arrays instead of repeated objects.
+
+    Customer names go into one id -> name map rather than every row, and
+    created_at becomes Unix seconds; user_id is the caller's and left out.
+    """
+    columns = {field: [item[field] for item in items] for field in fields}
+    if "created_at" in columns:
+        columns["created_at"] = [epoch_seconds(value) for value in columns["created_at"]]
+    return {
+        "columns": columns,
+        "customers": {str(item["customer_id"]): item["customer_name"] for item in items},
+        "next_cursor": next_cursor
+    }
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for trusted handler output.
+
+    Returning a Response from a route skips FastAPI's response_model
+    validation and jsonable_encoder pass, so the content must already have
+    the shape of the declared model; response_model still documents it.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
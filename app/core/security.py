@@ -0,0 +1,125 @@
+import asyncio
+import base64
+import functools
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .config import (
+    PASSWORD_HASH_SCHEME, SCRYPT_N, SCRYPT_R, SCRYPT_P, PBKDF2_ITERATIONS, PASSWORD_HASH_WORKERS,
+    SECRET_KEY, ACCESS_TOKEN_TTL
+)
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+DEFAULT_PARAMS = {
+    "scrypt": {"n": SCRYPT_N, "r": SCRYPT_R, "p": SCRYPT_P},
+    "pbkdf2_sha256": {"iterations": PBKDF2_ITERATIONS},
+}
+
+# hashlib's scrypt and pbkdf2_hmac release the GIL, so threads give real
+# parallelism here while keeping hashing off the request threadpool.
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode()
+
+
+def _derive(scheme: str, params: dict, password: str, salt: bytes) -> bytes:
+    if scheme == "scrypt":
+        n, r, p = params["n"], params["r"], params["p"]
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES, maxmem=128 * r * (n + p + 2)
+        )
+    if scheme == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, params["iterations"], dklen=KEY_BYTES)
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
+
+
+def _parse(stored: str):
+    """(scheme, params, salt, key), or None for a legacy plaintext value."""
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            params = {"n": int(parts[1]), "r": int(parts[2]), "p": int(parts[3])}
+            return "scrypt", params, base64.b64decode(parts[4]), base64.b64decode(parts[5])
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            params = {"iterations": int(parts[1])}
+            return "pbkdf2_sha256", params, base64.b64decode(parts[2]), base64.b64decode(parts[3])
+    except ValueError:
+        pass
+    return None
+
+
+def hash_password(password: str, scheme: str = PASSWORD_HASH_SCHEME, params: dict = None) -> str:
+    params = params or DEFAULT_PARAMS[scheme]
+    salt = os.urandom(SALT_BYTES)
+    key = _b64(_derive(scheme, params, password, salt))
+    if scheme == "scrypt":
+        return f"scrypt${params['n']}${params['r']}${params['p']}${_b64(salt)}${key}"
+    return f"pbkdf2_sha256${params['iterations']}${_b64(salt)}${key}"
+
+
+def verify_password(password: str, stored: str) -> bool:
+    parsed = _parse(stored)
+    if parsed is None:
+        # Accounts created before hashing still hold the plaintext
+        return hmac.compare_digest(password.encode(), stored.encode())
+    scheme, params, salt, key = parsed
+    return hmac.compare_digest(_derive(scheme, params, password, salt), key)
+
+
+def needs_rehash(stored: str) -> bool:
+    parsed = _parse(stored)
+    return parsed is None or parsed[0] != PASSWORD_HASH_SCHEME or parsed[1] != DEFAULT_PARAMS[PASSWORD_HASH_SCHEME]
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, hash_password, password)
+
+
+async def verify_password_async(password: str, stored: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_executor, verify_password, password, stored)
+
+
+@functools.lru_cache(maxsize=None)
+def dummy_hash() -> str:
+    # Verified against when the email is unknown, so both failures cost the same
+    return hash_password("dummy-password")
+
+
+def _b64url(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _sign(body: str) -> str:
+    return _b64url(hmac.new(SECRET_KEY.encode(), body.encode(), hashlib.sha256).digest())
+
+
+def create_access_token(user_id: int, ttl: int = ACCESS_TOKEN_TTL):
+    """Signed token `<claims>.<signature>`; returns it with its claims."""
+    issued_at = int(time.time())
+    claims = {"sub": user_id, "iat": issued_at, "exp": issued_at + ttl, "jti": secrets.token_urlsafe(12)}
+    body = _b64url(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{body}.{_sign(body)}", claims
+
+
+def decode_access_token(token: str):
+    """Claims of a well-signed, unexpired token, otherwise None."""
+    body, _, signature = token.partition(".")
+    if not hmac.compare_digest(signature.encode(), _sign(body).encode()):
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(claims, dict) or not isinstance(claims.get("sub"), int):
+        return None
+    if claims.get("exp", 0) <= time.time():
+        return None
+    return claims
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from contextlib import AsyncExitStack, ExitStack
+from sqlalchemy import exc, text
+from sqlalchemy.orm import configure_mappers
+from starlette.concurrency import run_in_threadpool
+from .config import DB_STARTUP_TIMEOUT, WARMUP_CONNECTIONS
+from .database import engine, async_engine
+from .explain import hot_queries
+from .replicas import replicas
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimings:
+    """Cold-start milestones for this process, in seconds, reported in /metrics.
+
+    import_seconds covers importing main (app, routers, models). The
+    first request is timed from the start of that import, or from the
+    fork for a worker of a preloading server (serve.py).
+    """
+
+    def __init__(self):
+        self.import_started = None
+        self.import_seconds = None
+        self.startup_seconds = None
+        self.first_request_seconds = None
+        self._lock = threading.Lock()
+
+    def imported(self, started: float):
+        self.import_started = started
+        self.import_seconds = time.perf_counter() - started
+
+    def forked(self):
+        self.import_started = time.perf_counter()
+        self.startup_seconds = self.first_request_seconds = None
+
+    def started(self, seconds: float):
+        self.startup_seconds = seconds
+        logger.info("Startup took %.3fs (import %.3fs)", seconds, self.import_seconds or 0.0)
+
+    def request_done(self):
+        if self.first_request_seconds is not None or self.import_started is None:
+            return
+        with self._lock:
+            if self.first_request_seconds is None:
+                self.first_request_seconds = time.perf_counter() - self.import_started
+                logger.info("First request answered %.3fs after start", self.first_request_seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            name: round(value, 6) if value is not None else None
+            for name, value in (
+                ("import_seconds", self.import_seconds),
+                ("startup_seconds", self.startup_seconds),
+                ("first_request_seconds", self.first_request_seconds),
+            )
+        }
+
+
+startup_timings = StartupTimings()
+
+
+def wait_for_database(engine, timeout: float = DB_STARTUP_TIMEOUT):
+    """Block until `engine` accepts a connection, retrying with backoff for up to `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while True:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return
+        except exc.DBAPIError as e:
+            if time.monotonic() + delay > deadline:
+                raise
+            logger.warning("Database not reachable yet (%s); retrying in %.1fs", e.orig, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+
+def _warm_sync(engine, connections: int):
+    # Hold them all at once so the pool really grows to `connections`
+    with ExitStack() as stack:
+        opened = [stack.enter_context(engine.connect()) for _ in range(max(1, connections))]
+        for statement in hot_queries(user_id=0, customer_id=0).values():
+            opened[0].execute(statement).all()
+
+
+async def _warm_async(engine, connections: int):
+    async with AsyncExitStack() as stack:
+        opened = [await stack.enter_async_context(engine.connect()) for _ in range(max(1, connections))]
+        for statement in hot_queries(user_id=0, customer_id=0).values():
+            (await opened[0].execute(statement)).all()
+
+
+async def warm_up(connections: int = WARMUP_CONNECTIONS):
+    """Fill the connection pools and compile the hot statements before traffic arrives.
+
+    The statements run for a shop that doesn't exist, so they return nothing
+    but leave their compiled form in SQLAlchemy's cache (and the plan in the
+    database's). A replica that can't be reached here is marked down.
+    """
+    configure_mappers()
+    if async_engine is not None:
+        await _warm_async(async_engine, connections)
+    else:
+        await run_in_threadpool(_warm_sync, engine, connections)
+
+    for replica in replicas.replicas:
+        try:
+            if async_engine is not None:
+                await _warm_async(replica.engine, 1)
+            else:
+                await run_in_threadpool(_warm_sync, replica.engine, 1)
+        except exc.DBAPIError:
+            logger.warning("Read replica %s is not reachable", replica.stats()["url"])
+            replica.mark_down()
+
+
+class FirstRequestMiddleware:
+    """Records when this process finished its first HTTP response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or startup_timings.first_request_seconds is not None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            startup_timings.request_done()
@@ -1,17 +1,50 @@
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from core.database import engine, Base
-from core.config import CORS_ORIGINS
-from routers import auth, customers, credits, payments, dashboard, ledger
+from starlette.concurrency import run_in_threadpool
+from core.database import engine, async_engine, pool_stats, dispose_engines, write_retries
+from core.config import CORS_ORIGINS, MIGRATE_ON_STARTUP
+from core.cache import dashboard_cache
+from core.auth import auth_stats
+from core.replicas import WriteVersionMiddleware, replicas, replica_stats
+from core.instrumentation import QueryStatsMiddleware, instrument, route_metrics
+from core.compression import CompressionMiddleware
+from core.startup import FirstRequestMiddleware, startup_timings, wait_for_database, warm_up
+from migrations import upgrade
+from routers import auth, customers, credits, payments, dashboard, ledger, bulk, jobs, sync, periods
+from services import jobs as job_runner
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+# Count and time SQL per request
+instrument(engine)
+if async_engine is not None:
+    instrument(async_engine.sync_engine)
+for replica in replicas.replicas:
+    instrument(replica.sync_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await run_in_threadpool(wait_for_database, engine)
+    if MIGRATE_ON_STARTUP:
+        await run_in_threadpool(upgrade, engine)
+    await warm_up()
+    await run_in_threadpool(job_runner.resume_jobs)
+    startup_timings.started(time.perf_counter() - started)
+    yield
+    await run_in_threadpool(job_runner.shutdown)
+    await replicas.dispose()
+    await dispose_engines()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="ShopKhata API",
     description="Digital Credit Management System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -21,7 +54,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing", "X-Query-Count", "X-Shop-Version"],
 )
+app.add_middleware(WriteVersionMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(FirstRequestMiddleware)
 
 # Include routers
 app.include_router(auth.router)
@@ -30,9 +68,13 @@ app.include_router(credits.router)
 app.include_router(payments.router)
 app.include_router(dashboard.router)
 app.include_router(ledger.router)
+app.include_router(bulk.router)
+app.include_router(jobs.router)
+app.include_router(sync.router)
+app.include_router(periods.router)
 
 @app.get("/")
-def root():
+async def root():
     return {
         "message": "ShopKhata API is running!",
         "version": "1.0.0",
@@ -40,5 +82,22 @@ def root():
     }
 
 @app.get("/health")
-def health():
-    return {"status": "healthy"}
\ No newline at end of file
+async def health():
+    return {"status": "healthy"}
+
+@app.get("/metrics")
+async def metrics():
+    pools = {"sync": pool_stats(engine.pool)}
+    if async_engine is not None:
+        pools["async"] = pool_stats(async_engine.pool)
+    return {
+        "pools": pools,
+        "reads": replica_stats(),
+        "cache": dashboard_cache.stats(),
+        "auth": auth_stats(),
+        "write_retries": write_retries.value,
+        "startup": startup_timings.snapshot(),
+        "routes": route_metrics.snapshot()
+    }
+
+startup_timings.imported(_import_started)
\ No newline at end of file
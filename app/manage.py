@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import sys
+from datetime import date
+from sqlalchemy import func, select
+from core.database import engine, session_scope, dispose_engines
+from core.explain import check_hot_queries
+from migrations import upgrade, status
+from models.models import ClosedPeriod
+from services.balances import rebuild_balances
+from services.monthly_totals import rebuild_monthly_totals
+from services.periods import archive_period
+
+
+async def reconcile_balances(args):
+    async with session_scope() as db:
+        result = await rebuild_balances(db, user_id=args.user_id)
+    print(f"Balances rebuilt: {result['created']} created, {result['corrected']} corrected, {result['removed']} removed")
+
+
+async def backfill_monthly_totals(args):
+    async with session_scope() as db:
+        months = await rebuild_monthly_totals(db, user_id=args.user_id)
+    print(f"Monthly totals rebuilt: {months} shop-months")
+
+
+async def archive_periods(args):
+    # Per shop, the latest closed period ending on or before --through that isn't archived yet
+    query = select(ClosedPeriod.user_id, func.max(ClosedPeriod.period_end)).where(
+        ClosedPeriod.period_end <= args.through,
+        ClosedPeriod.archived_at.is_(None)
+    ).group_by(ClosedPeriod.user_id)
+    if args.user_id is not None:
+        query = query.where(ClosedPeriod.user_id == args.user_id)
+
+    async with session_scope() as db:
+        shops = (await db.execute(query)).all()
+        for user_id, period_end in shops:
+            result = await archive_period(db, user_id, period_end)
+            print(f"Shop {user_id}: archived through {period_end} "
+                  f"({result['credits']} credits, {result['payments']} payments)")
+    print(f"Archived {len(shops)} shop(s)")
+
+
+async def migrate(args):
+    if args.status:
+        for version, name, applied in status(engine):
+            print(f"{version:04d} {name:<30} {'applied' if applied else 'pending'}")
+        return
+    applied = upgrade(engine, target=args.target)
+    print(f"Applied migrations: {', '.join(f'{v:04d}' for v in applied) or 'none'}")
+
+
+async def check_indexes(args):
+    failed = False
+    for name, (indexed, plan) in check_hot_queries(engine).items():
+        print(f"{'ok  ' if indexed else 'FAIL'} {name}")
+        if not indexed or args.verbose:
+            for line in plan:
+                print(f"       {line}")
+        failed = failed or not indexed
+    if failed:
+        sys.exit(1)
+
+
+async def run(args):
+    try:
+        await args.func(args)
+    finally:
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ShopKhata management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = subparsers.add_parser("reconcile-balances", help="Rebuild customer_balances from credits and payments")
+    reconcile.add_argument("--user-id", type=int, default=None, help="Only rebuild balances for this shop")
+    reconcile.set_defaults(func=reconcile_balances)
+
+    backfill = subparsers.add_parser("backfill-monthly-totals", help="Rebuild monthly_totals from credits and payments")
+    backfill.add_argument("--user-id", type=int, default=None, help="Only rebuild totals for this shop")
+    backfill.set_defaults(func=backfill_monthly_totals)
+
+    archive = subparsers.add_parser("archive-periods", help="Move closed periods' credits and payments to the archive tables")
+    archive.add_argument("--through", type=date.fromisoformat, required=True, help="Archive periods ending on or before this date")
+    archive.add_argument("--user-id", type=int, default=None, help="Only archive this shop")
+    archive.set_defaults(func=archive_periods)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument("--target", type=int, default=None, help="Stop after this version")
+    migrate_parser.add_argument("--status", action="store_true", help="List migrations without applying")
+    migrate_parser.set_defaults(func=migrate)
+
+    check = subparsers.add_parser("check-indexes", help="EXPLAIN the hot queries and fail if any misses an index")
+    check.add_argument("--verbose", action="store_true", help="Print every plan")
+    check.set_defaults(func=check_indexes)
+
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+from . import (
+    m0001_baseline, m0002_hot_path_indexes, m0003_monthly_totals, m0004_customer_search, m0005_jobs,
+    m0006_change_versions, m0007_sync, m0008_period_closing,
+    m0009_backfill_balances, m0010_revoked_tokens, m0011_archived_monthly_totals,
+    m0012_archive_sync_indexes, m0013_job_heartbeats
+)
+
+MIGRATIONS = [
+    m0001_baseline,
+    m0002_hot_path_indexes,
+    m0003_monthly_totals,
+    m0004_customer_search,
+    m0005_jobs,
+    m0006_change_versions,
+    m0007_sync,
+    m0008_period_closing,
+    m0009_backfill_balances,
+    m0010_revoked_tokens,
+    m0011_archived_monthly_totals,
+    m0012_archive_sync_indexes,
+    m0013_job_heartbeats,
+]
+
+# Serialises concurrent upgrades on Postgres (arbitrary constant key)
+ADVISORY_LOCK_KEY = 7245310
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(engine, target: int = None) -> list:
+    """Apply pending migrations in order, one transaction each."""
+    applied = []
+    for migration in MIGRATIONS:
+        if target is not None and migration.VERSION > target:
+            break
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            if migration.VERSION in applied_versions(conn):
+                continue
+            migration.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=migration.VERSION,
+                name=migration.NAME,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(migration.VERSION)
+    return applied
+
+
+def status(engine) -> list:
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [(migration.VERSION, migration.NAME, migration.VERSION in done) for migration in MIGRATIONS]
@@ -0,0 +1,13 @@
+from core.database import Base
+import models.models  # noqa: F401  (registers the tables)
+
+VERSION = 1
+NAME = "baseline"
+
+TABLES = ["users", "customers", "credits", "payments", "customer_balances"]
+
+
+def upgrade(conn):
+    # Existing deployments already have these from create_all; checkfirst
+    # makes this a no-op for them.
+    Base.metadata.create_all(conn, tables=[Base.metadata.tables[name] for name in TABLES], checkfirst=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import text
+from core.database import Base
+
+VERSION = 2
+NAME = "hot_path_indexes"
+
+INDEXES = {
+    "customers": ["ix_customers_user_id"],
+    "credits": ["ix_credits_user_date", "ix_credits_customer_date"],
+    "payments": ["ix_payments_user_date", "ix_payments_customer_date"],
+    "customer_balances": ["ix_customer_balances_user_outstanding"],
+}
+
+
+def upgrade(conn):
+    for table_name, index_names in INDEXES.items():
+        table = Base.metadata.tables[table_name]
+        for index in table.indexes:
+            if index.name in index_names:
+                index.create(conn, checkfirst=True)
+    # Superseded by (user_id, outstanding)
+    conn.execute(text("DROP INDEX IF EXISTS ix_customer_balances_user_id"))
@@ -0,0 +1,31 @@
+from sqlalchemy import text
+from core.database import Base
+
+VERSION = 3
+NAME = "monthly_totals"
+
+# Frozen SQL, as in 0009: the rollup as the credits and payments tables
+# stood when this migration was written
+MONTHS = {
+    "sqlite": ("CAST(STRFTIME('%Y', date) AS INTEGER)", "CAST(STRFTIME('%m', date) AS INTEGER)"),
+    "postgresql": ("CAST(EXTRACT(YEAR FROM date) AS INTEGER)", "CAST(EXTRACT(MONTH FROM date) AS INTEGER)"),
+}
+
+BACKFILL = """
+INSERT INTO monthly_totals (user_id, year, month, credits, payments)
+SELECT user_id, year, month, SUM(credits), SUM(payments) FROM (
+    SELECT user_id, {year} AS year, {month} AS month, amount AS credits, 0 AS payments FROM credits
+    UNION ALL
+    SELECT user_id, {year} AS year, {month} AS month, 0 AS credits, amount AS payments FROM payments
+) AS entries
+GROUP BY user_id, year, month
+"""
+
+
+def upgrade(conn):
+    table = Base.metadata.tables["monthly_totals"]
+    table.create(conn, checkfirst=True)
+    # Seed from existing credits and payments; a fresh install has none
+    year, month = MONTHS[conn.dialect.name]
+    conn.execute(text("DELETE FROM monthly_totals"))
+    conn.execute(text(BACKFILL.format(year=year, month=month)))
@@ -0,0 +1,32 @@
+from sqlalchemy import text
+from core.database import Base
+
+VERSION = 4
+NAME = "customer_search"
+
+INDEXES = {
+    "customers": ["ix_customers_user_name"],
+    "customer_balances": ["ix_customer_balances_user_updated"],
+}
+
+# Name/phone substring and fuzzy matching; SQLite uses the in-process
+# index in services.customer_search instead.
+POSTGRES_TRIGRAM_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_customers_name_trgm ON customers USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_customers_phone_trgm ON customers USING gin (phone gin_trgm_ops)",
+]
+
+
+def upgrade(conn):
+    for table_name, index_names in INDEXES.items():
+        table = Base.metadata.tables[table_name]
+        for index in table.indexes:
+            if index.name in index_names:
+                index.create(conn, checkfirst=True)
+    # Superseded by (user_id, name)
+    conn.execute(text("DROP INDEX IF EXISTS ix_customers_user_id"))
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for statement in POSTGRES_TRIGRAM_INDEXES:
+            conn.execute(text(statement))
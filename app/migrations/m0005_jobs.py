@@ -0,0 +1,11 @@
+from core.database import Base
+
+VERSION = 5
+NAME = "jobs"
+
+
+def upgrade(conn):
+    table = Base.metadata.tables["jobs"]
+    table.create(conn, checkfirst=True)
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
@@ -0,0 +1,21 @@
+from sqlalchemy import inspect, literal, select, text
+from core.database import Base
+
+VERSION = 6
+NAME = "change_versions"
+
+
+def upgrade(conn):
+    table = Base.metadata.tables["shop_versions"]
+    table.create(conn, checkfirst=True)
+
+    columns = {column["name"] for column in inspect(conn).get_columns("customer_balances")}
+    if "version" not in columns:
+        conn.execute(text("ALTER TABLE customer_balances ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+
+    # One row per shop up front so the first writes don't race to insert it
+    users = Base.metadata.tables["users"]
+    conn.execute(table.insert().from_select(
+        ["user_id", "version"],
+        select(users.c.user_id, literal(0)).where(~users.c.user_id.in_(select(table.c.user_id)))
+    ))
@@ -0,0 +1,32 @@
+from sqlalchemy import inspect, text
+from core.database import Base
+
+VERSION = 7
+NAME = "sync"
+
+SYNCED_TABLES = ["customers", "credits", "payments"]
+
+COLUMNS = {
+    "updated_at": "TIMESTAMP",
+    "version": "INTEGER NOT NULL DEFAULT 0",
+    "client_id": "VARCHAR",
+}
+
+
+def upgrade(conn):
+    for table_name in SYNCED_TABLES:
+        existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+        for column, ddl in COLUMNS.items():
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column} {ddl}"))
+        conn.execute(text(f"UPDATE {table_name} SET updated_at = created_at WHERE updated_at IS NULL"))
+
+        table = Base.metadata.tables[table_name]
+        for index in table.indexes:
+            if index.name.endswith(("_user_version", "_user_client")):
+                index.create(conn, checkfirst=True)
+
+    tombstones = Base.metadata.tables["tombstones"]
+    tombstones.create(conn, checkfirst=True)
+    for index in tombstones.indexes:
+        index.create(conn, checkfirst=True)
@@ -0,0 +1,14 @@
+from core.database import Base
+
+VERSION = 8
+NAME = "period_closing"
+
+TABLES = ["closed_periods", "ledger_checkpoints", "credits_archive", "payments_archive"]
+
+
+def upgrade(conn):
+    for table_name in TABLES:
+        table = Base.metadata.tables[table_name]
+        table.create(conn, checkfirst=True)
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
@@ -0,0 +1,42 @@
+from sqlalchemy import text
+
+VERSION = 9
+NAME = "backfill_balances"
+
+# Frozen SQL: a migration must do the same thing whenever it runs, so it
+# doesn't go through the models or services. Customers created before
+# customer_balances existed get their row from the raw credits and
+# payments (archived ones included); rows that already exist are kept.
+BACKFILL = """
+INSERT INTO customer_balances (customer_id, user_id, total_credits, total_payments, outstanding, updated_at, version)
+SELECT
+    customers.customer_id,
+    customers.user_id,
+    COALESCE(credit_totals.amount, 0),
+    COALESCE(payment_totals.amount, 0),
+    COALESCE(credit_totals.amount, 0) - COALESCE(payment_totals.amount, 0),
+    CURRENT_TIMESTAMP,
+    0
+FROM customers
+LEFT JOIN (
+    SELECT customer_id, SUM(amount) AS amount FROM (
+        SELECT customer_id, amount FROM credits
+        UNION ALL
+        SELECT customer_id, amount FROM credits_archive
+    ) AS all_credits GROUP BY customer_id
+) AS credit_totals ON credit_totals.customer_id = customers.customer_id
+LEFT JOIN (
+    SELECT customer_id, SUM(amount) AS amount FROM (
+        SELECT customer_id, amount FROM payments
+        UNION ALL
+        SELECT customer_id, amount FROM payments_archive
+    ) AS all_payments GROUP BY customer_id
+) AS payment_totals ON payment_totals.customer_id = customers.customer_id
+WHERE NOT EXISTS (
+    SELECT 1 FROM customer_balances WHERE customer_balances.customer_id = customers.customer_id
+)
+"""
+
+
+def upgrade(conn):
+    conn.execute(text(BACKFILL))
@@ -0,0 +1,11 @@
+from core.database import Base
+
+VERSION = 10
+NAME = "revoked_tokens"
+
+
+def upgrade(conn):
+    table = Base.metadata.tables["revoked_tokens"]
+    table.create(conn, checkfirst=True)
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+VERSION = 11
+NAME = "archived_monthly_totals"
+
+# Frozen SQL, as in 0009. Rebuilds the rollup from the live and the
+# archived credits and payments (0008), the same sums
+# services.monthly_totals.rebuild_monthly_totals computes.
+MONTHS = {
+    "sqlite": ("CAST(STRFTIME('%Y', date) AS INTEGER)", "CAST(STRFTIME('%m', date) AS INTEGER)"),
+    "postgresql": ("CAST(EXTRACT(YEAR FROM date) AS INTEGER)", "CAST(EXTRACT(MONTH FROM date) AS INTEGER)"),
+}
+
+BACKFILL = """
+INSERT INTO monthly_totals (user_id, year, month, credits, payments)
+SELECT user_id, year, month, SUM(credits), SUM(payments) FROM (
+    SELECT user_id, {year} AS year, {month} AS month, amount AS credits, 0 AS payments FROM credits
+    UNION ALL
+    SELECT user_id, {year} AS year, {month} AS month, amount AS credits, 0 AS payments FROM credits_archive
+    UNION ALL
+    SELECT user_id, {year} AS year, {month} AS month, 0 AS credits, amount AS payments FROM payments
+    UNION ALL
+    SELECT user_id, {year} AS year, {month} AS month, 0 AS credits, amount AS payments FROM payments_archive
+) AS entries
+GROUP BY user_id, year, month
+"""
+
+
+def upgrade(conn):
+    year, month = MONTHS[conn.dialect.name]
+    conn.execute(text("DELETE FROM monthly_totals"))
+    conn.execute(text(BACKFILL.format(year=year, month=month)))
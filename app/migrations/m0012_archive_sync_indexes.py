@@ -0,0 +1,18 @@
+from core.database import Base
+
+VERSION = 12
+NAME = "archive_sync_indexes"
+
+# /api/sync reads archived credits and payments too, by version like the live ones
+INDEXES = {
+    "credits_archive": ["ix_credits_archive_user_version"],
+    "payments_archive": ["ix_payments_archive_user_version"],
+}
+
+
+def upgrade(conn):
+    for table_name, index_names in INDEXES.items():
+        table = Base.metadata.tables[table_name]
+        for index in table.indexes:
+            if index.name in index_names:
+                index.create(conn, checkfirst=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import inspect, text
+
+VERSION = 13
+NAME = "job_heartbeats"
+
+COLUMNS = {
+    "worker": "VARCHAR",
+    "heartbeat_at": "TIMESTAMP",
+}
+
+
+def upgrade(conn):
+    existing = {column["name"] for column in inspect(conn).get_columns("jobs")}
+    for column, ddl in COLUMNS.items():
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE jobs ADD COLUMN {column} {ddl}"))
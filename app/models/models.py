@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Numeric, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
@@ -25,6 +25,11 @@ class User(Base):
 # TABLE 2: Customers
 class Customer(Base):
     __tablename__ = "customers"
+    __table_args__ = (
+        Index("ix_customers_user_name", "user_id", "name"),
+        Index("ix_customers_user_version", "user_id", "version"),
+        Index("ux_customers_user_client", "user_id", "client_id", unique=True),
+    )
     
     customer_id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
@@ -32,16 +37,27 @@ class Customer(Base):
     phone = Column(String, nullable=False)
     email = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Shop version of the last change (sync cursor) and the offline client's id
+    version = Column(Integer, nullable=False, default=0)
+    client_id = Column(String)
     
     # Relationships
     owner = relationship("User", back_populates="customers")
     credits = relationship("Credit", back_populates="customer", cascade="all, delete-orphan")
     payments = relationship("Payment", back_populates="customer", cascade="all, delete-orphan")
+    balance = relationship("CustomerBalance", back_populates="customer", uselist=False, cascade="all, delete-orphan")
 
 
 # TABLE 3: Credits
 class Credit(Base):
     __tablename__ = "credits"
+    __table_args__ = (
+        Index("ix_credits_user_date", "user_id", "date"),
+        Index("ix_credits_customer_date", "customer_id", "date"),
+        Index("ix_credits_user_version", "user_id", "version"),
+        Index("ux_credits_user_client", "user_id", "client_id", unique=True),
+    )
     
     credit_id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
@@ -50,6 +66,9 @@ class Credit(Base):
     description = Column(String)
     date = Column(Date, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=0)
+    client_id = Column(String)
     
     # Relationships
     owner = relationship("User", back_populates="credits")
@@ -59,6 +78,12 @@ class Credit(Base):
 # TABLE 4: Payments
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_user_date", "user_id", "date"),
+        Index("ix_payments_customer_date", "customer_id", "date"),
+        Index("ix_payments_user_version", "user_id", "version"),
+        Index("ux_payments_user_client", "user_id", "client_id", unique=True),
+    )
     
     payment_id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
@@ -67,7 +92,171 @@ class Payment(Base):
     payment_method = Column(String, nullable=False)
     date = Column(Date, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=0)
+    client_id = Column(String)
     
     # Relationships
     owner = relationship("User", back_populates="payments")
-    customer = relationship("Customer", back_populates="payments")
\ No newline at end of file
+    customer = relationship("Customer", back_populates="payments")
+
+
+# TABLE 5: Customer Balances (maintained on every credit/payment write)
+class CustomerBalance(Base):
+    __tablename__ = "customer_balances"
+    __table_args__ = (
+        Index("ix_customer_balances_user_outstanding", "user_id", "outstanding"),
+        Index("ix_customer_balances_user_updated", "user_id", "updated_at"),
+    )
+    
+    customer_id = Column(Integer, ForeignKey("customers.customer_id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    total_credits = Column(Numeric(12, 2), nullable=False, default=0)
+    total_payments = Column(Numeric(12, 2), nullable=False, default=0)
+    outstanding = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Shop version of the last write that touched this customer (ledger ETag)
+    version = Column(Integer, nullable=False, default=0)
+    
+    # Relationships
+    customer = relationship("Customer", back_populates="balance")
+
+# TABLE 6: Monthly Totals (per-shop rollup for the dashboard charts)
+class MonthlyTotal(Base):
+    __tablename__ = "monthly_totals"
+    
+    # The primary key (user_id, year, month) serves the charts range read
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    credits = Column(Numeric(14, 2), nullable=False, default=0)
+    payments = Column(Numeric(14, 2), nullable=False, default=0)
+
+# TABLE 7: Jobs (background exports and reports run outside the request)
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_user_created", "user_id", "created_at"),
+        Index("ix_jobs_status", "status"),
+    )
+    
+    job_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    kind = Column(String, nullable=False)
+    format = Column(String, nullable=False)
+    params = Column(Text, nullable=False, default="{}")
+    status = Column(String, nullable=False, default="queued")
+    rows = Column(Integer)
+    size_bytes = Column(Integer)
+    file_path = Column(String)
+    error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # Process running the job and its last sign of life (services.jobs)
+    worker = Column(String)
+    heartbeat_at = Column(DateTime)
+
+# TABLE 8: Shop Versions (bumped by every write; drives the ETags on GETs)
+class ShopVersion(Base):
+    __tablename__ = "shop_versions"
+    
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# TABLE 9: Tombstones (deleted rows, kept so offline clients can sync deletes)
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_user_version", "user_id", "version"),
+    )
+    
+    tombstone_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    client_id = Column(String)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+# TABLE 10: Closed Periods (a shop's books are closed through period_end)
+class ClosedPeriod(Base):
+    __tablename__ = "closed_periods"
+    
+    # The primary key (user_id, period_end) serves the "closed through" lookup on every write
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True, autoincrement=False)
+    period_end = Column(Date, primary_key=True)
+    customers = Column(Integer, nullable=False, default=0)
+    closed_at = Column(DateTime, default=datetime.utcnow)
+    archived_at = Column(DateTime)
+
+
+# TABLE 11: Ledger Checkpoints (each customer's totals through a closed period)
+class LedgerCheckpoint(Base):
+    __tablename__ = "ledger_checkpoints"
+    __table_args__ = (
+        Index("ix_ledger_checkpoints_user_period", "user_id", "period_end"),
+    )
+    
+    # Totals are cumulative from the customer's first entry, so the latest
+    # checkpoint plus the rows dated after it gives the full balance
+    customer_id = Column(Integer, ForeignKey("customers.customer_id"), primary_key=True, autoincrement=False)
+    period_end = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    total_credits = Column(Numeric(12, 2), nullable=False, default=0)
+    total_payments = Column(Numeric(12, 2), nullable=False, default=0)
+    balance = Column(Numeric(12, 2), nullable=False, default=0)
+
+
+# TABLE 12: Archived Credits (credits of closed periods, moved out of credits)
+class CreditArchive(Base):
+    __tablename__ = "credits_archive"
+    __table_args__ = (
+        Index("ix_credits_archive_user_date", "user_id", "date"),
+        Index("ix_credits_archive_customer_date", "customer_id", "date"),
+        Index("ix_credits_archive_user_version", "user_id", "version"),
+    )
+    
+    credit_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.customer_id"), nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+    description = Column(String)
+    date = Column(Date, nullable=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    version = Column(Integer, nullable=False, default=0)
+    client_id = Column(String)
+
+
+# TABLE 13: Archived Payments (payments of closed periods, moved out of payments)
+class PaymentArchive(Base):
+    __tablename__ = "payments_archive"
+    __table_args__ = (
+        Index("ix_payments_archive_user_date", "user_id", "date"),
+        Index("ix_payments_archive_customer_date", "customer_id", "date"),
+        Index("ix_payments_archive_user_version", "user_id", "version"),
+    )
+    
+    payment_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.customer_id"), nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+    payment_method = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    version = Column(Integer, nullable=False, default=0)
+    client_id = Column(String)
+
+# TABLE 14: Revoked Tokens (logged-out access tokens, kept until they expire)
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
+    
+    jti = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
\ No newline at end of file
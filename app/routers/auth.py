@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from core.database import get_db
-from models.models import User
-from schemas.auth import RegisterRequest, LoginRequest, UserResponse
+from core.security import (
+    hash_password_async, verify_password_async, needs_rehash, dummy_hash, create_access_token
+)
+from core.auth import Principal, get_principal, revoke
+from models.models import User, ShopVersion
+from schemas.auth import RegisterRequest, LoginRequest, UserResponse, TokenResponse
+from datetime import datetime, timezone
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=UserResponse)
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == request.email).first()
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
+    existing_user = await db.scalar(select(User).where(User.email == request.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -17,23 +23,48 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
         owner_name=request.owner_name,
         email=request.email,
         phone=request.phone,
-        password=request.password
+        password=await hash_password_async(request.password)
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.flush()
+    db.add(ShopVersion(user_id=new_user.user_id))
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
-@router.post("/login", response_model=UserResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+@router.post("/login", response_model=TokenResponse)
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.email == request.email))
     
     if not user:
+        await verify_password_async(request.password, dummy_hash())
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    if user.password != request.password:
+    if not await verify_password_async(request.password, user.password):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    return user
\ No newline at end of file
+    # Upgrade plaintext or outdated hashes now that we know the password
+    if needs_rehash(user.password):
+        user.password = await hash_password_async(request.password)
+        await db.commit()
+    
+    token, claims = create_access_token(user.user_id)
+    
+    return {
+        "user_id": user.user_id,
+        "shop_name": user.shop_name,
+        "owner_name": user.owner_name,
+        "email": user.email,
+        "phone": user.phone,
+        "access_token": token,
+        "token_type": "bearer",
+        "expires_at": datetime.fromtimestamp(claims["exp"], tz=timezone.utc)
+    }
+
+@router.post("/logout")
+async def logout(principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    await revoke(db, principal)
+    
+    return {"message": "Logged out successfully"}
\ No newline at end of file
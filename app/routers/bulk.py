@@ -0,0 +1,213 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert
+from sqlalchemy.exc import SQLAlchemyError
+from decimal import Decimal
+from core.database import engine, get_db, retry_on_conflict
+from core.auth import Principal, get_principal
+from core.cache import dashboard_cache
+from core.config import BULK_BATCH_SIZE, BULK_MAX_ROWS
+from models.models import Customer, CustomerBalance, Credit, Payment
+from schemas.bulk import BulkCustomerRow, BulkCreditRow, BulkPaymentRow, BulkImportResponse
+from services import customer_search
+from services.balances import InsufficientBalance, apply_deltas, get_outstanding, reserve_payment
+from services.monthly_totals import apply_month_deltas
+from services.periods import PeriodClosed, closed_through, ensure_open
+from services.versions import bump_version, stamp_customers
+
+router = APIRouter(prefix="/api/bulk", tags=["Bulk Import"])
+
+async def _read_rows(request: Request) -> list:
+    """Rows from a JSON array body or a CSV body with a header line."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    
+    if content_type.startswith("text/csv"):
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        rows = [{key: value or None for key, value in row.items()} for row in reader]
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or text/csv")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or text/csv")
+    
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows per request")
+    
+    return rows
+
+def _validate(rows: list, schema):
+    """Returns ([(index, model)], [error]) with 1-based row numbers in errors."""
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, schema.model_validate(row)))
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                for error in e.errors()
+            )
+            errors.append({"row": index + 1, "error": message})
+    return valid, errors
+
+async def _owned(db: AsyncSession, user_id: int, valid: list, errors: list) -> list:
+    customer_ids = {row.customer_id for _, row in valid}
+    owned = set((await db.scalars(select(Customer.customer_id).where(
+        Customer.user_id == user_id,
+        Customer.customer_id.in_(customer_ids)
+    ))).all()) if customer_ids else set()
+    
+    kept = []
+    for index, row in valid:
+        if row.customer_id in owned:
+            kept.append((index, row))
+        else:
+            errors.append({"row": index + 1, "error": "Customer not found or not authorized"})
+    return kept
+
+async def _open(db: AsyncSession, user_id: int, valid: list, errors: list) -> list:
+    closed = await closed_through(db, user_id)
+    if closed is None:
+        return valid
+    
+    kept = []
+    for index, row in valid:
+        if row.date > closed:
+            kept.append((index, row))
+        else:
+            errors.append({"row": index + 1, "error": str(PeriodClosed(closed))})
+    return kept
+
+def _batches(items: list):
+    for start in range(0, len(items), BULK_BATCH_SIZE):
+        yield items[start:start + BULK_BATCH_SIZE]
+
+async def _insert_batches(db: AsyncSession, user_id: int, model, id_column, valid: list, errors: list, ids: list, after_batch=None):
+    for batch in _batches(valid):
+        async def write():
+            version = await bump_version(db, user_id)
+            values = [{"user_id": user_id, "version": version, **row.model_dump()} for _, row in batch]
+            if engine.dialect.name == "sqlite":
+                # SQLite can't batch an ordered RETURNING and would insert
+                # row by row. One executemany instead: its rows take
+                # ascending ids in order, and only this batch has `version`.
+                await db.execute(insert(model), values)
+                new_ids = (await db.scalars(select(id_column).where(
+                    model.user_id == user_id, model.version == version
+                ).order_by(id_column))).all()
+            else:
+                result = await db.execute(insert(model).returning(id_column, sort_by_parameter_order=True), values)
+                new_ids = result.scalars().all()
+            if after_batch is not None:
+                await after_batch(batch, new_ids, version)
+            await db.commit()
+            return new_ids
+        
+        try:
+            new_ids = await retry_on_conflict(db, write)
+        except (SQLAlchemyError, InsufficientBalance, PeriodClosed) as e:
+            await db.rollback()
+            errors.extend({"row": index + 1, "error": f"Batch failed: {e.__class__.__name__}"} for index, _ in batch)
+            continue
+        for (index, _), new_id in zip(batch, new_ids):
+            ids[index] = new_id
+
+def _response(rows: list, ids: list, errors: list) -> dict:
+    return {
+        "received": len(rows),
+        "inserted": sum(1 for new_id in ids if new_id is not None),
+        "ids": ids,
+        "errors": sorted(errors, key=lambda error: error["row"])
+    }
+
+async def _apply_deltas(db: AsyncSession, user_id: int, batch: list, field: str, version: int):
+    # Rows were checked up front; this catches a period closed since then
+    await ensure_open(db, user_id, *(row.date for _, row in batch))
+    deltas = defaultdict(Decimal)
+    for _, row in batch:
+        deltas[row.customer_id] += row.amount
+    if field == "payments":
+        # Guarded like single payments: a concurrent payment may have
+        # spent the balance since the batch was validated
+        for customer_id, amount in deltas.items():
+            if not await reserve_payment(db, customer_id, user_id, amount):
+                raise InsufficientBalance(customer_id)
+    else:
+        await apply_deltas(db, user_id, deltas, field)
+    await apply_month_deltas(db, user_id, [(row.date, row.amount) for _, row in batch], field)
+    await stamp_customers(db, deltas.keys(), version)
+
+@router.post("/customers", response_model=BulkImportResponse)
+async def bulk_create_customers(request: Request, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    rows = await _read_rows(request)
+    valid, errors = _validate(rows, BulkCustomerRow)
+    ids = [None] * len(rows)
+    
+    async def create_balances(batch, new_ids, version):
+        await db.execute(insert(CustomerBalance), [
+            {"customer_id": customer_id, "user_id": principal.user_id, "version": version} for customer_id in new_ids
+        ])
+    
+    await _insert_batches(db, principal.user_id, Customer, Customer.customer_id, valid, errors, ids, create_balances)
+    dashboard_cache.invalidate(principal.user_id)
+    customer_search.invalidate(principal.user_id)
+    
+    return _response(rows, ids, errors)
+
+@router.post("/credits", response_model=BulkImportResponse)
+async def bulk_create_credits(request: Request, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    rows = await _read_rows(request)
+    valid, errors = _validate(rows, BulkCreditRow)
+    valid = await _owned(db, principal.user_id, valid, errors)
+    valid = await _open(db, principal.user_id, valid, errors)
+    ids = [None] * len(rows)
+    
+    async def update_balances(batch, new_ids, version):
+        await _apply_deltas(db, principal.user_id, batch, "credits", version)
+    
+    await _insert_batches(db, principal.user_id, Credit, Credit.credit_id, valid, errors, ids, update_balances)
+    dashboard_cache.invalidate(principal.user_id)
+    
+    return _response(rows, ids, errors)
+
+@router.post("/payments", response_model=BulkImportResponse)
+async def bulk_create_payments(request: Request, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    rows = await _read_rows(request)
+    valid, errors = _validate(rows, BulkPaymentRow)
+    valid = await _owned(db, principal.user_id, valid, errors)
+    valid = await _open(db, principal.user_id, valid, errors)
+    ids = [None] * len(rows)
+    
+    # Payment cannot exceed outstanding: walk the batch in date order
+    customer_ids = {row.customer_id for _, row in valid}
+    outstanding = dict((await db.execute(select(
+        CustomerBalance.customer_id, CustomerBalance.outstanding
+    ).where(CustomerBalance.customer_id.in_(customer_ids)))).all()) if customer_ids else {}
+    
+    accepted = []
+    for index, row in sorted(valid, key=lambda item: (item[1].date, item[0])):
+        if row.customer_id not in outstanding:
+            outstanding[row.customer_id] = await get_outstanding(db, row.customer_id)
+        if row.amount > outstanding[row.customer_id]:
+            errors.append({
+                "row": index + 1,
+                "error": f"Payment amount (₹{row.amount}) exceeds outstanding balance (₹{outstanding[row.customer_id]})"
+            })
+            continue
+        outstanding[row.customer_id] -= row.amount
+        accepted.append((index, row))
+    
+    async def update_balances(batch, new_ids, version):
+        await _apply_deltas(db, principal.user_id, batch, "payments", version)
+    
+    await _insert_batches(db, principal.user_id, Payment, Payment.payment_id, accepted, errors, ids, update_balances)
+    dashboard_cache.invalidate(principal.user_id)
+    
+    return _response(rows, ids, errors)
\ No newline at end of file
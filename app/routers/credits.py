@@ -1,54 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
-from core.database import get_db
-from models.models import Credit, Customer
-from schemas.credit import CreditCreate, CreditResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional, Union
+from datetime import date
+from core.database import get_db, retry_on_conflict
+from core.replicas import get_read_db
+from core.auth import Principal, get_principal
+from core.cache import dashboard_cache
+from core.etag import check_etag, etag_headers, shop_version
+from core.responses import FastJSONResponse, columnar_page
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, keyset_filter
+from models.models import Credit, Customer, Tombstone
+from schemas.credit import CreditCreate, CreditResponse, CreditPage, CreditColumnPage
+from services.balances import apply_delta
+from services.monthly_totals import apply_month_delta
+from services.sync import find_by_client_id
+from services.periods import PeriodClosed, ensure_open
+from services.versions import bump_version, stamp_customers
 
 router = APIRouter(prefix="/api/credits", tags=["Credits"])
 
-@router.get("", response_model=List[CreditResponse])
-def get_credits(user_id: int = Query(...), db: Session = Depends(get_db)):
-    credits = db.query(Credit).filter(Credit.user_id == user_id).all()
+# Fields sent by the opt-in columnar list format
+CREDITS_COLUMNS = ("credit_id", "customer_id", "amount", "description", "date", "created_at")
+
+@router.get("", response_model=Union[CreditPage, CreditColumnPage])
+async def get_credits(
+    request: Request,
+    principal: Principal = Depends(get_principal),
+    customer_id: Optional[int] = Query(None),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("objects", pattern="^(objects|columns)$"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    etag = check_etag(request, principal.user_id, await shop_version(db, principal.user_id))
+    query = select(Credit, Customer.name).outerjoin(
+        Customer, Customer.customer_id == Credit.customer_id
+    ).where(Credit.user_id == principal.user_id)
+    
+    if customer_id is not None:
+        query = query.where(Credit.customer_id == customer_id)
+    if from_date is not None:
+        query = query.where(Credit.date >= from_date)
+    if to_date is not None:
+        query = query.where(Credit.date <= to_date)
+    if cursor:
+        query = query.where(keyset_filter(Credit.date, Credit.credit_id, cursor))
+    
+    query = query.order_by(Credit.date.desc(), Credit.credit_id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
     
     result = []
-    for credit in credits:
-        customer = db.query(Customer).filter(Customer.customer_id == credit.customer_id).first()
-        credit_dict = {
+    for credit, customer_name in rows[:limit]:
+        result.append({
             "credit_id": credit.credit_id,
             "user_id": credit.user_id,
             "customer_id": credit.customer_id,
-            "customer_name": customer.name if customer else "Unknown",
+            "customer_name": customer_name or "Unknown",
             "amount": credit.amount,
             "description": credit.description,
             "date": credit.date,
             "created_at": credit.created_at
-        }
-        result.append(credit_dict)
+        })
     
-    return result
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1][0]
+        next_cursor = encode_cursor(last.date, last.credit_id)
+    
+    if format == "columns":
+        return FastJSONResponse(columnar_page(result, CREDITS_COLUMNS, next_cursor), headers=etag_headers(etag))
+    return FastJSONResponse({"items": result, "next_cursor": next_cursor}, headers=etag_headers(etag))
 
 @router.post("", response_model=CreditResponse)
-def create_credit(request: CreditCreate, db: Session = Depends(get_db)):
-    customer = db.query(Customer).filter(
+async def create_credit(request: CreditCreate, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    customer = await db.scalar(select(Customer).where(
         Customer.customer_id == request.customer_id,
-        Customer.user_id == request.user_id
-    ).first()
+        Customer.user_id == principal.user_id
+    ))
     
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found or not authorized")
     
-    new_credit = Credit(
-        user_id=request.user_id,
-        customer_id=request.customer_id,
-        amount=request.amount,
-        description=request.description,
-        date=request.date
-    )
+    async def write():
+        if request.client_id and await find_by_client_id(db, "credit", principal.user_id, request.client_id):
+            raise HTTPException(status_code=409, detail="Credit with this client_id already exists")
+        
+        # The shop lock first, as bulk imports take it: a shop's writers then
+        # lock shop version, balance and month rows in the same order
+        version = await bump_version(db, principal.user_id)
+        try:
+            await ensure_open(db, principal.user_id, request.date)
+        except PeriodClosed as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        new_credit = Credit(
+            user_id=principal.user_id,
+            customer_id=request.customer_id,
+            amount=request.amount,
+            description=request.description,
+            date=request.date,
+            client_id=request.client_id,
+            version=version
+        )
+        
+        db.add(new_credit)
+        await db.flush()
+        await apply_delta(db, new_credit.customer_id, new_credit.user_id, credits=new_credit.amount)
+        await apply_month_delta(db, new_credit.user_id, new_credit.date, credits=new_credit.amount)
+        await stamp_customers(db, [new_credit.customer_id], version)
+        await db.commit()
+        return new_credit
     
-    db.add(new_credit)
-    db.commit()
-    db.refresh(new_credit)
+    new_credit = await retry_on_conflict(db, write)
+    dashboard_cache.invalidate(new_credit.user_id)
+    await db.refresh(new_credit)
     
     return {
         "credit_id": new_credit.credit_id,
@@ -62,20 +130,41 @@ def create_credit(request: CreditCreate, db: Session = Depends(get_db)):
     }
 
 @router.delete("/{credit_id}")
-def delete_credit(
+async def delete_credit(
     credit_id: int, 
-    user_id: int = Query(...),
-    db: Session = Depends(get_db)
+    principal: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    credit = db.query(Credit).filter(Credit.credit_id == credit_id).first()
-    
-    if not credit:
-        raise HTTPException(status_code=404, detail="Credit not found")
-    
-    if credit.user_id != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this credit")
+    async def write():
+        credit = await db.get(Credit, credit_id)
+        
+        if not credit:
+            raise HTTPException(status_code=404, detail="Credit not found")
+        
+        if credit.user_id != principal.user_id:
+            raise HTTPException(status_code=403, detail="Not authorized to delete this credit")
+        
+        version = await bump_version(db, credit.user_id)
+        try:
+            await ensure_open(db, principal.user_id, credit.date)
+        except PeriodClosed as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        await db.delete(credit)
+        await db.flush()
+        await apply_delta(db, credit.customer_id, credit.user_id, credits=-credit.amount)
+        await apply_month_delta(db, credit.user_id, credit.date, credits=-credit.amount)
+        await stamp_customers(db, [credit.customer_id], version)
+        db.add(Tombstone(
+            user_id=credit.user_id,
+            entity="credit",
+            entity_id=credit.credit_id,
+            client_id=credit.client_id,
+            version=version
+        ))
+        await db.commit()
     
-    db.delete(credit)
-    db.commit()
+    await retry_on_conflict(db, write)
+    dashboard_cache.invalidate(principal.user_id)
     
     return {"message": "Credit deleted successfully"}
\ No newline at end of file
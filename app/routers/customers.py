@@ -1,71 +1,189 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from typing import List, Optional
+from decimal import Decimal
+from datetime import datetime
 from core.database import get_db
-from models.models import Customer
-from schemas.customer import CustomerCreate, CustomerUpdate, CustomerResponse
+from core.replicas import get_read_db
+from core.auth import Principal, get_principal
+from core.cache import dashboard_cache
+from core.etag import check_etag, etag_headers, shop_version
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_sort_cursor, decode_sort_cursor, keyset_after
+from core.responses import FastJSONResponse
+from models.models import Customer, CustomerBalance, Credit, Payment, CreditArchive, PaymentArchive, LedgerCheckpoint
+from schemas.customer import CustomerCreate, CustomerUpdate, CustomerResponse, CustomerSearchPage
+from services import customer_search
+from services.monthly_totals import remove_customer_totals
+from services.sync import find_by_client_id, record_deletions
+from services.versions import bump_version
 
 router = APIRouter(prefix="/api/customers", tags=["Customers"])
 
+# sort key -> (column, cursor value parser, newest/largest first by default)
+SEARCH_SORTS = {
+    "name": (Customer.name, str, False),
+    "outstanding": (CustomerBalance.outstanding, Decimal, True),
+    "last_activity": (CustomerBalance.updated_at, datetime.fromisoformat, True),
+}
+
 @router.get("", response_model=List[CustomerResponse])
-def get_customers(user_id: int = Query(...), db: Session = Depends(get_db)):
-    customers = db.query(Customer).filter(Customer.user_id == user_id).all()
-    return customers
+async def get_customers(request: Request, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_read_db)):
+    etag = check_etag(request, principal.user_id, await shop_version(db, principal.user_id))
+    customers = (await db.scalars(select(Customer).where(Customer.user_id == principal.user_id))).all()
+    return FastJSONResponse([
+        {
+            "customer_id": customer.customer_id,
+            "user_id": customer.user_id,
+            "name": customer.name,
+            "phone": customer.phone,
+            "email": customer.email,
+            "created_at": customer.created_at
+        }
+        for customer in customers
+    ], headers=etag_headers(etag))
+
+@router.get("/search", response_model=CustomerSearchPage)
+async def search_customers(
+    request: Request,
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    fuzzy: bool = Query(False),
+    sort: str = Query("name", pattern="^(name|outstanding|last_activity)$"),
+    order: Optional[str] = Query(None, pattern="^(asc|desc)$"),
+    outstanding_only: bool = Query(False),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    principal: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    etag = check_etag(request, principal.user_id, await shop_version(db, principal.user_id))
+    sort_column, parse, descending = SEARCH_SORTS[sort]
+    if order is not None:
+        descending = order == "desc"
+    
+    query = select(Customer, CustomerBalance.outstanding, CustomerBalance.updated_at).join(
+        CustomerBalance, CustomerBalance.customer_id == Customer.customer_id
+    ).where(
+        Customer.user_id == principal.user_id,
+        CustomerBalance.user_id == principal.user_id
+    )
+    
+    if q and q.strip():
+        query = query.where(await customer_search.match_clause(db, principal.user_id, q.strip(), fuzzy))
+    if outstanding_only:
+        query = query.where(CustomerBalance.outstanding > 0)
+    if cursor:
+        value, customer_id = decode_sort_cursor(cursor, parse)
+        query = query.where(keyset_after(sort_column, Customer.customer_id, value, customer_id, descending))
+    
+    if descending:
+        query = query.order_by(sort_column.desc(), Customer.customer_id.desc())
+    else:
+        query = query.order_by(sort_column, Customer.customer_id)
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    
+    items = [
+        {
+            "customer_id": customer.customer_id,
+            "name": customer.name,
+            "phone": customer.phone,
+            "email": customer.email,
+            "outstanding": outstanding,
+            "last_activity": last_activity
+        }
+        for customer, outstanding, last_activity in rows[:limit]
+    ]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_sort_cursor(last[sort], last["customer_id"])
+    
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor}, headers=etag_headers(etag))
 
 @router.post("", response_model=CustomerResponse)
-def create_customer(request: CustomerCreate, db: Session = Depends(get_db)):
+async def create_customer(request: CustomerCreate, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    if request.client_id and await find_by_client_id(db, "customer", principal.user_id, request.client_id):
+        raise HTTPException(status_code=409, detail="Customer with this client_id already exists")
+    
+    version = await bump_version(db, principal.user_id)
     new_customer = Customer(
-        user_id=request.user_id,
+        user_id=principal.user_id,
         name=request.name,
         phone=request.phone,
-        email=request.email
+        email=request.email,
+        client_id=request.client_id,
+        version=version
     )
+    new_customer.balance = CustomerBalance(user_id=principal.user_id, version=version)
     
     db.add(new_customer)
-    db.commit()
-    db.refresh(new_customer)
+    await db.commit()
+    dashboard_cache.invalidate(principal.user_id)
+    customer_search.invalidate(principal.user_id)
+    await db.refresh(new_customer)
     
     return new_customer
 
 @router.put("/{customer_id}", response_model=CustomerResponse)
-def update_customer(
+async def update_customer(
     customer_id: int, 
     request: CustomerUpdate, 
-    user_id: int = Query(...),
-    db: Session = Depends(get_db)
+    principal: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    customer = db.query(Customer).filter(Customer.customer_id == customer_id).first()
+    customer = await db.get(Customer, customer_id)
     
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    if customer.user_id != user_id:
+    if customer.user_id != principal.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this customer")
     
     customer.name = request.name
     customer.phone = request.phone
     customer.email = request.email
+    customer.version = await bump_version(db, principal.user_id, [customer_id])
     
-    db.commit()
-    db.refresh(customer)
+    await db.commit()
+    dashboard_cache.invalidate(principal.user_id)
+    customer_search.invalidate(principal.user_id)
+    await db.refresh(customer)
     
     return customer
 
 @router.delete("/{customer_id}")
-def delete_customer(
+async def delete_customer(
     customer_id: int, 
-    user_id: int = Query(...),
-    db: Session = Depends(get_db)
+    principal: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    customer = db.query(Customer).filter(Customer.customer_id == customer_id).first()
+    customer = await db.get(Customer, customer_id)
     
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    if customer.user_id != user_id:
+    if customer.user_id != principal.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this customer")
     
-    db.delete(customer)
-    db.commit()
+    version = await bump_version(db, principal.user_id)
+    await remove_customer_totals(db, principal.user_id, customer_id)
+    await record_deletions(db, "credit", version, Credit.customer_id == customer_id)
+    await record_deletions(db, "payment", version, Payment.customer_id == customer_id)
+    await record_deletions(db, "credit", version, CreditArchive.customer_id == customer_id, archived=True)
+    await record_deletions(db, "payment", version, PaymentArchive.customer_id == customer_id, archived=True)
+    await record_deletions(db, "customer", version, Customer.customer_id == customer_id)
+    
+    # Remove dependent rows set-based instead of loading them for the ORM cascade
+    await db.execute(delete(Credit).where(Credit.customer_id == customer_id))
+    await db.execute(delete(Payment).where(Payment.customer_id == customer_id))
+    await db.execute(delete(CustomerBalance).where(CustomerBalance.customer_id == customer_id))
+    await db.execute(delete(CreditArchive).where(CreditArchive.customer_id == customer_id))
+    await db.execute(delete(PaymentArchive).where(PaymentArchive.customer_id == customer_id))
+    await db.execute(delete(LedgerCheckpoint).where(LedgerCheckpoint.customer_id == customer_id))
+    await db.delete(customer)
+    await db.commit()
+    dashboard_cache.invalidate(principal.user_id)
+    customer_search.invalidate(principal.user_id)
     
     return {"message": "Customer deleted successfully"}
\ No newline at end of file
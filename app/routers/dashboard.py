@@ -1,94 +1,168 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from core.database import get_db
-from models.models import Credit, Payment, Customer
-from schemas.dashboard import DashboardStatsResponse, DashboardChartsResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from core.replicas import get_read_db
+from core.auth import Principal, get_principal
+from core.cache import dashboard_cache
+from core.etag import check_etag, etag_headers, shop_version
+from models.models import Customer, CustomerBalance, MonthlyTotal
+from services.aging import aging_report
+from schemas.dashboard import DashboardStatsResponse, DashboardChartsResponse, AgingResponse
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
+MAX_CHART_YEARS = 10
+
 @router.get("/stats", response_model=DashboardStatsResponse)
-def get_dashboard_stats(user_id: int = Query(...), db: Session = Depends(get_db)):
-    total_credits = db.query(func.sum(Credit.amount)).filter(Credit.user_id == user_id).scalar()
-    total_credits = total_credits or Decimal(0)
+async def get_dashboard_stats(
+    request: Request,
+    response: Response,
+    principal: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # The version is in the cache key too: a write from another process can
+    # land between reading it and filling the cache, and that body must not
+    # be served under a later version's tag
+    version = await shop_version(db, principal.user_id)
+    etag = check_etag(request, principal.user_id, version)
+    response.headers.update(etag_headers(etag))
+    
+    cached = dashboard_cache.get(principal.user_id, ("stats", version))
+    if cached is not None:
+        return cached
+    
+    totals = (await db.execute(select(
+        func.sum(CustomerBalance.total_credits),
+        func.sum(CustomerBalance.total_payments)
+    ).where(CustomerBalance.user_id == principal.user_id))).one()
     
-    total_payments = db.query(func.sum(Payment.amount)).filter(Payment.user_id == user_id).scalar()
-    total_payments = total_payments or Decimal(0)
+    total_credits = totals[0] or Decimal(0)
+    total_payments = totals[1] or Decimal(0)
     
     outstanding = total_credits - total_payments
     
-    active_customers = db.query(Customer).filter(Customer.user_id == user_id).count()
+    active_customers = await db.scalar(
+        select(func.count()).select_from(Customer).where(Customer.user_id == principal.user_id)
+    )
     
-    return {
+    result = {
         "total_credits": total_credits,
         "total_payments": total_payments,
         "outstanding": outstanding,
         "active_customers": active_customers
     }
+    dashboard_cache.set(principal.user_id, ("stats", version), result)
+    
+    return result
 
 @router.get("/charts", response_model=DashboardChartsResponse)
-def get_dashboard_charts(user_id: int = Query(...), db: Session = Depends(get_db)):
-    current_year = datetime.now().year
+async def get_dashboard_charts(
+    request: Request,
+    response: Response,
+    principal: Principal = Depends(get_principal),
+    year: Optional[int] = Query(None, ge=1900, le=9999),
+    to_year: Optional[int] = Query(None, ge=1900, le=9999),
+    limit: int = Query(5, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    start_year = year or datetime.now().year
+    end_year = to_year or start_year
     
-    monthly_credits = db.query(
-        extract('month', Credit.date).label('month'),
-        func.sum(Credit.amount).label('total')
-    ).filter(
-        Credit.user_id == user_id,
-        extract('year', Credit.date) == current_year
-    ).group_by(
-        extract('month', Credit.date)
-    ).all()
-    
-    monthly_payments = db.query(
-        extract('month', Payment.date).label('month'),
-        func.sum(Payment.amount).label('total')
-    ).filter(
-        Payment.user_id == user_id,
-        extract('year', Payment.date) == current_year
-    ).group_by(
-        extract('month', Payment.date)
-    ).all()
+    if end_year < start_year:
+        raise HTTPException(status_code=400, detail="to_year must not be before year")
+    if end_year - start_year >= MAX_CHART_YEARS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CHART_YEARS} years per chart")
+    
+    # The resolved years are part of the tag: the default year rolls over
+    version = await shop_version(db, principal.user_id)
+    etag = check_etag(request, principal.user_id, version, start_year, end_year)
+    response.headers.update(etag_headers(etag))
+    
+    cache_key = ("charts", version, start_year, end_year, limit)
+    cached = dashboard_cache.get(principal.user_id, cache_key)
+    if cached is not None:
+        return cached
+    
+    # One range read on the (user_id, year, month) primary key of the rollup
+    monthly_totals = (await db.execute(select(
+        MonthlyTotal.year,
+        MonthlyTotal.month,
+        MonthlyTotal.credits,
+        MonthlyTotal.payments
+    ).where(
+        MonthlyTotal.user_id == principal.user_id,
+        MonthlyTotal.year >= start_year,
+        MonthlyTotal.year <= end_year
+    ))).all()
     
     month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
     monthly_data = []
     
-    credits_dict = {int(row.month): float(row.total) for row in monthly_credits}
-    payments_dict = {int(row.month): float(row.total) for row in monthly_payments}
-    
-    for month_num in range(1, 13):
-        monthly_data.append({
-            "month": month_names[month_num - 1],
-            "credits": credits_dict.get(month_num, 0),
-            "payments": payments_dict.get(month_num, 0)
-        })
-    
-    customers = db.query(Customer).filter(Customer.user_id == user_id).all()
-    
-    top_customers_data = []
-    for customer in customers:
-        customer_credits = db.query(func.sum(Credit.amount)).filter(
-            Credit.customer_id == customer.customer_id
-        ).scalar() or Decimal(0)
-        
-        customer_payments = db.query(func.sum(Payment.amount)).filter(
-            Payment.customer_id == customer.customer_id
-        ).scalar() or Decimal(0)
-        
-        outstanding = float(customer_credits - customer_payments)
-        
-        if outstanding > 0:
-            top_customers_data.append({
-                "name": customer.name,
-                "outstanding": outstanding
+    totals_dict = {(row.year, row.month): row for row in monthly_totals}
+    
+    for chart_year in range(start_year, end_year + 1):
+        for month_num in range(1, 13):
+            totals = totals_dict.get((chart_year, month_num))
+            monthly_data.append({
+                "year": chart_year,
+                "month": month_names[month_num - 1],
+                "credits": float(totals.credits) if totals else 0,
+                "payments": float(totals.payments) if totals else 0
             })
     
-    top_customers_data.sort(key=lambda x: x['outstanding'], reverse=True)
-    top_customers = top_customers_data[:5]
+    top_customers = (await db.execute(select(
+        Customer.customer_id,
+        Customer.name,
+        CustomerBalance.outstanding
+    ).join(
+        CustomerBalance, CustomerBalance.customer_id == Customer.customer_id
+    ).filter(
+        CustomerBalance.user_id == principal.user_id,
+        CustomerBalance.outstanding > 0
+    ).order_by(
+        CustomerBalance.outstanding.desc(),
+        Customer.customer_id
+    ).limit(limit))).all()
+    
+    top_customers = [
+        {"customer_id": row.customer_id, "name": row.name, "outstanding": float(row.outstanding)}
+        for row in top_customers
+    ]
     
-    return {
+    result = {
         "monthly_data": monthly_data,
         "top_customers": top_customers
-    }
\ No newline at end of file
+    }
+    dashboard_cache.set(principal.user_id, cache_key, result)
+    
+    return result
+
+@router.get("/aging", response_model=AgingResponse)
+async def get_aging_report(
+    request: Request,
+    response: Response,
+    principal: Principal = Depends(get_principal),
+    as_of: Optional[date] = Query(None),
+    include_settled: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Unpaid credit by age on `as_of`; payments settle the oldest credits first
+    as_of = as_of or date.today()
+    
+    # The resolved date is part of the tag: the default one rolls over
+    version = await shop_version(db, principal.user_id)
+    etag = check_etag(request, principal.user_id, version, as_of.isoformat(), include_settled)
+    response.headers.update(etag_headers(etag))
+    
+    cache_key = ("aging", version, as_of, include_settled)
+    cached = dashboard_cache.get(principal.user_id, cache_key)
+    if cached is not None:
+        return cached
+    
+    result = await aging_report(db, principal.user_id, as_of, include_settled)
+    dashboard_cache.set(principal.user_id, cache_key, result)
+    
+    return result
\ No newline at end of file
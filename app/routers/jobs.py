@@ -0,0 +1,122 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from typing import List
+from core.database import get_db
+from core.auth import Principal, get_principal
+from core.config import JOB_MAX_PENDING
+from models.models import Job, Customer
+from schemas.job import ExportRequest, JobResponse
+from services import jobs
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _job_response(job: Job) -> dict:
+    return {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "format": job.format,
+        "status": job.status,
+        "rows": job.rows,
+        "size_bytes": job.size_bytes,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "download_url": f"/api/jobs/{job.job_id}/download" if job.status == "succeeded" else None
+    }
+
+
+async def _get_job(db: AsyncSession, job_id: int, user_id: int) -> Job:
+    job = await db.scalar(select(Job).where(Job.job_id == job_id, Job.user_id == user_id))
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or not authorized")
+    
+    return job
+
+@router.post("/exports", response_model=JobResponse, status_code=202)
+async def submit_export(request: ExportRequest, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    if request.kind == "ledger" and request.customer_id is None:
+        raise HTTPException(status_code=400, detail="customer_id is required for a ledger export")
+    
+    if request.from_date and request.to_date and request.from_date > request.to_date:
+        raise HTTPException(status_code=400, detail="from_date must not be after to_date")
+    
+    if request.customer_id is not None:
+        customer = await db.scalar(select(Customer.customer_id).where(
+            Customer.customer_id == request.customer_id,
+            Customer.user_id == principal.user_id
+        ))
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found or not authorized")
+    
+    pending = await db.scalar(select(func.count()).select_from(Job).where(
+        Job.user_id == principal.user_id,
+        Job.status.in_(jobs.UNFINISHED)
+    ))
+    if pending >= JOB_MAX_PENDING:
+        raise HTTPException(status_code=429, detail=f"At most {JOB_MAX_PENDING} jobs can be pending at once")
+    
+    job = Job(
+        user_id=principal.user_id,
+        kind=request.kind,
+        format=request.format,
+        params=json.dumps(request.model_dump(mode="json", exclude={"kind", "format"}))
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    jobs.submit(job.job_id)
+    
+    return _job_response(job)
+
+@router.get("", response_model=List[JobResponse])
+async def list_jobs(
+    principal: Principal = Depends(get_principal),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.scalars(select(Job).where(
+        Job.user_id == principal.user_id
+    ).order_by(Job.created_at.desc(), Job.job_id.desc()).limit(limit))
+    
+    return [_job_response(job) for job in result.all()]
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    return _job_response(await _get_job(db, job_id, principal.user_id))
+
+@router.get("/{job_id}/download")
+async def download_job(job_id: int, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    job = await _get_job(db, job_id, principal.user_id)
+    
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    
+    return FileResponse(
+        job.file_path,
+        media_type=MEDIA_TYPES[job.format],
+        filename=f"{job.kind}-{job.job_id}.{job.format}"
+    )
+
+@router.delete("/{job_id}")
+async def delete_job(job_id: int, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    job = await _get_job(db, job_id, principal.user_id)
+    
+    if job.status == "running":
+        raise HTTPException(status_code=409, detail="Job is still running")
+    
+    jobs.remove_output(job)
+    await db.delete(job)
+    await db.commit()
+    
+    return {"message": "Job deleted successfully"}
\ No newline at end of file
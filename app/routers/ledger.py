@@ -1,24 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
+from datetime import date, timedelta
+from core.replicas import get_read_db, read_session, replicas, required_version
+from core.auth import Principal, get_principal
+from core.etag import check_etag, etag_headers, customer_version
+from core.responses import FastJSONResponse, dumps
 from models.models import Credit, Payment, Customer
-from schemas.ledger import LedgerResponse, LedgerTransaction
+from schemas.ledger import LedgerResponse
+from services.ledger import ledger_entries, opening_balance
+from services.periods import latest_checkpoint
 from decimal import Decimal
 
 router = APIRouter(prefix="/api/ledger", tags=["Ledger"])
 
 @router.get("/{customer_id}", response_model=LedgerResponse)
-def get_ledger(customer_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
-    customer = db.query(Customer).filter(
+async def get_ledger(customer_id: int, request: Request, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_read_db)):
+    version = await customer_version(db, principal.user_id, customer_id)
+    etag = check_etag(request, "c", customer_id, version) if version is not None else None
+    
+    customer = await db.scalar(select(Customer).where(
         Customer.customer_id == customer_id,
-        Customer.user_id == user_id
-    ).first()
+        Customer.user_id == principal.user_id
+    ))
     
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found or not authorized")
     
-    credits = db.query(Credit).filter(Credit.customer_id == customer_id).all()
-    payments = db.query(Payment).filter(Payment.customer_id == customer_id).all()
+    # Closed periods are carried in as the latest checkpoint's balance
+    checkpoint = await latest_checkpoint(db, customer_id)
+    credits_query = select(Credit).where(Credit.customer_id == customer_id)
+    payments_query = select(Payment).where(Payment.customer_id == customer_id)
+    if checkpoint is not None:
+        credits_query = credits_query.where(Credit.date > checkpoint.period_end)
+        payments_query = payments_query.where(Payment.date > checkpoint.period_end)
+    
+    credits = (await db.scalars(credits_query)).all()
+    payments = (await db.scalars(payments_query)).all()
     
     transactions = []
     
@@ -44,23 +64,112 @@ def get_ledger(customer_id: int, user_id: int = Query(...), db: Session = Depend
     
     transactions.sort(key=lambda x: (x["date"], x["sort_order"]))
     
-    balance = Decimal(0)
+    opening = checkpoint.balance if checkpoint is not None else Decimal(0)
+    balance = opening
     ledger_transactions = []
     
     for transaction in transactions:
         balance += transaction["debit"]
         balance -= transaction["credit"]
         
-        ledger_transactions.append(LedgerTransaction(
-            date=transaction["date"],
-            description=transaction["description"],
-            debit=transaction["debit"],
-            credit=transaction["credit"],
-            balance=balance
-        ))
+        ledger_transactions.append({
+            "date": transaction["date"],
+            "description": transaction["description"],
+            "debit": transaction["debit"],
+            "credit": transaction["credit"],
+            "balance": balance
+        })
+    
+    return FastJSONResponse({
+        "customer_name": customer.name,
+        "closed_through": checkpoint.period_end if checkpoint is not None else None,
+        "opening_balance": opening,
+        "transactions": ledger_transactions,
+        "outstanding_balance": balance
+    }, headers=etag_headers(etag) if etag else None)
+
+STREAM_CHUNK_ROWS = 500
+
+
+async def _stream_ledger(customer: Customer, from_date: Optional[date], to_date: Optional[date], fmt: str,
+                         required: int):
+    # Own session: the request-scoped one may be closed before the body is
+    # sent. Chosen like get_read_db's, from replicas at version `required`.
+    async with read_session(customer.user_id, required) as db:
+        if from_date is None:
+            # Without a range the statement starts after the last closed period
+            checkpoint = await latest_checkpoint(db, customer.customer_id)
+            opening = checkpoint.balance if checkpoint is not None else Decimal(0)
+            from_date = checkpoint.period_end + timedelta(days=1) if checkpoint is not None else None
+            entries = ledger_entries(customer.customer_id, from_date, to_date, opening)
+        else:
+            # An explicit range may reach back into archived periods
+            opening = await opening_balance(db, customer.customer_id, from_date)
+            entries = ledger_entries(customer.customer_id, from_date, to_date, opening, archived=True)
+        result = await db.stream(entries)
+        header = {
+            "customer_name": customer.name,
+            "from_date": from_date,
+            "to_date": to_date,
+            "opening_balance": opening
+        }
+        
+        if fmt == "ndjson":
+            yield dumps({"type": "header", **header}) + b"\n"
+        else:
+            yield dumps(header)[:-1] + b',"transactions":['
+        
+        balance = opening
+        first = True
+        async for rows in result.partitions(STREAM_CHUNK_ROWS):
+            lines = []
+            for row in rows:
+                balance = row.balance
+                entry = {
+                    "date": row.date,
+                    "description": row.description,
+                    "debit": row.debit,
+                    "credit": row.credit,
+                    "balance": row.balance
+                }
+                if fmt == "ndjson":
+                    lines.append(dumps({"type": "entry", **entry}) + b"\n")
+                else:
+                    lines.append((b"" if first else b",") + dumps(entry))
+                first = False
+            yield b"".join(lines)
+        
+        if fmt == "ndjson":
+            yield dumps({"type": "footer", "outstanding_balance": balance}) + b"\n"
+        else:
+            yield b'],"outstanding_balance":' + dumps(balance) + b"}"
+
+@router.get("/{customer_id}/stream")
+async def stream_ledger(
+    customer_id: int,
+    request: Request,
+    principal: Principal = Depends(get_principal),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    format: str = Query("ndjson", pattern="^(ndjson|json)$"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    version = await customer_version(db, principal.user_id, customer_id)
+    etag = check_etag(request, "c", customer_id, version) if version is not None else None
+    
+    customer = await db.scalar(select(Customer).where(
+        Customer.customer_id == customer_id,
+        Customer.user_id == principal.user_id
+    ))
+    
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found or not authorized")
     
-    return LedgerResponse(
-        customer_name=customer.name,
-        transactions=ledger_transactions,
-        outstanding_balance=balance
+    # At least as new as what the ETag was read from
+    required = max(required_version(request, principal.user_id), version or 0) if replicas.replicas else 0
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(
+        _stream_ledger(customer, from_date, to_date, format, required),
+        media_type=media_type,
+        headers=etag_headers(etag) if etag else None
     )
\ No newline at end of file
@@ -1,78 +1,132 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from core.database import get_db
-from models.models import Payment, Customer, Credit
-from schemas.payment import PaymentCreate, PaymentResponse
-from decimal import Decimal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional, Union
+from datetime import date
+from core.database import get_db, retry_on_conflict
+from core.replicas import get_read_db
+from core.auth import Principal, get_principal
+from core.cache import dashboard_cache
+from core.etag import check_etag, etag_headers, shop_version
+from core.responses import FastJSONResponse, columnar_page
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, keyset_filter
+from models.models import Payment, Customer, Tombstone
+from schemas.payment import PaymentCreate, PaymentResponse, PaymentPage, PaymentColumnPage
+from services.balances import apply_delta, get_outstanding, reserve_payment
+from services.monthly_totals import apply_month_delta
+from services.sync import find_by_client_id
+from services.periods import PeriodClosed, ensure_open
+from services.versions import bump_version, stamp_customers
 
 router = APIRouter(prefix="/api/payments", tags=["Payments"])
 
-@router.get("", response_model=List[PaymentResponse])
-def get_payments(user_id: int = Query(...), db: Session = Depends(get_db)):
-    payments = db.query(Payment).filter(Payment.user_id == user_id).all()
+# Fields sent by the opt-in columnar list format
+PAYMENTS_COLUMNS = ("payment_id", "customer_id", "amount", "payment_method", "date", "created_at")
+
+@router.get("", response_model=Union[PaymentPage, PaymentColumnPage])
+async def get_payments(
+    request: Request,
+    principal: Principal = Depends(get_principal),
+    customer_id: Optional[int] = Query(None),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("objects", pattern="^(objects|columns)$"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    etag = check_etag(request, principal.user_id, await shop_version(db, principal.user_id))
+    query = select(Payment, Customer.name).outerjoin(
+        Customer, Customer.customer_id == Payment.customer_id
+    ).where(Payment.user_id == principal.user_id)
+    
+    if customer_id is not None:
+        query = query.where(Payment.customer_id == customer_id)
+    if from_date is not None:
+        query = query.where(Payment.date >= from_date)
+    if to_date is not None:
+        query = query.where(Payment.date <= to_date)
+    if cursor:
+        query = query.where(keyset_filter(Payment.date, Payment.payment_id, cursor))
+    
+    query = query.order_by(Payment.date.desc(), Payment.payment_id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
     
     result = []
-    for payment in payments:
-        customer = db.query(Customer).filter(Customer.customer_id == payment.customer_id).first()
-        payment_dict = {
+    for payment, customer_name in rows[:limit]:
+        result.append({
             "payment_id": payment.payment_id,
             "user_id": payment.user_id,
             "customer_id": payment.customer_id,
-            "customer_name": customer.name if customer else "Unknown",
+            "customer_name": customer_name or "Unknown",
             "amount": payment.amount,
             "payment_method": payment.payment_method,
             "date": payment.date,
             "created_at": payment.created_at
-        }
-        result.append(payment_dict)
+        })
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1][0]
+        next_cursor = encode_cursor(last.date, last.payment_id)
     
-    return result
+    if format == "columns":
+        return FastJSONResponse(columnar_page(result, PAYMENTS_COLUMNS, next_cursor), headers=etag_headers(etag))
+    return FastJSONResponse({"items": result, "next_cursor": next_cursor}, headers=etag_headers(etag))
 
 @router.post("", response_model=PaymentResponse)
-def create_payment(request: PaymentCreate, db: Session = Depends(get_db)):
+async def create_payment(request: PaymentCreate, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
     # Security check: Verify customer belongs to this user
-    customer = db.query(Customer).filter(
+    customer = await db.scalar(select(Customer).where(
         Customer.customer_id == request.customer_id,
-        Customer.user_id == request.user_id
-    ).first()
+        Customer.user_id == principal.user_id
+    ))
     
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found or not authorized")
     
-    # Calculate customer's total credits
-    total_credits = db.query(func.sum(Credit.amount)).filter(
-        Credit.customer_id == request.customer_id
-    ).scalar() or Decimal(0)
-    
-    # Calculate customer's total payments (including current payments)
-    total_payments = db.query(func.sum(Payment.amount)).filter(
-        Payment.customer_id == request.customer_id
-    ).scalar() or Decimal(0)
-    
-    # Calculate outstanding balance
-    outstanding = total_credits - total_payments
-    
-    # Validation: Payment cannot exceed outstanding balance
-    if request.amount > outstanding:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Payment amount (₹{request.amount}) exceeds outstanding balance (₹{outstanding}). Customer can pay maximum ₹{outstanding} only."
+    async def write():
+        if request.client_id and await find_by_client_id(db, "payment", principal.user_id, request.client_id):
+            raise HTTPException(status_code=409, detail="Payment with this client_id already exists")
+        
+        # The shop lock first, as bulk imports take it: a shop's writers then
+        # lock shop version, balance and month rows in the same order
+        version = await bump_version(db, principal.user_id)
+        try:
+            await ensure_open(db, principal.user_id, request.date)
+        except PeriodClosed as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Validation: Payment cannot exceed outstanding balance. Checked and
+        # applied in one guarded UPDATE of the balance row, so a concurrent
+        # payment for this customer waits and then sees the reduced balance.
+        if not await reserve_payment(db, request.customer_id, principal.user_id, request.amount):
+            outstanding = await get_outstanding(db, request.customer_id)
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Payment amount (₹{request.amount}) exceeds outstanding balance (₹{outstanding}). Customer can pay maximum ₹{outstanding} only."
+            )
+        
+        new_payment = Payment(
+            user_id=principal.user_id,
+            customer_id=request.customer_id,
+            amount=request.amount,
+            payment_method=request.payment_method,
+            date=request.date,
+            client_id=request.client_id,
+            version=version
         )
+        
+        db.add(new_payment)
+        await db.flush()
+        await apply_month_delta(db, new_payment.user_id, new_payment.date, payments=new_payment.amount)
+        await stamp_customers(db, [new_payment.customer_id], version)
+        await db.commit()
+        return new_payment
     
-    # If validation passes, create payment
-    new_payment = Payment(
-        user_id=request.user_id,
-        customer_id=request.customer_id,
-        amount=request.amount,
-        payment_method=request.payment_method,
-        date=request.date
-    )
-    
-    db.add(new_payment)
-    db.commit()
-    db.refresh(new_payment)
+    new_payment = await retry_on_conflict(db, write)
+    dashboard_cache.invalidate(new_payment.user_id)
+    await db.refresh(new_payment)
     
     return {
         "payment_id": new_payment.payment_id,
@@ -86,20 +140,41 @@ def create_payment(request: PaymentCreate, db: Session = Depends(get_db)):
     }
 
 @router.delete("/{payment_id}")
-def delete_payment(
+async def delete_payment(
     payment_id: int, 
-    user_id: int = Query(...),
-    db: Session = Depends(get_db)
+    principal: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    payment = db.query(Payment).filter(Payment.payment_id == payment_id).first()
-    
-    if not payment:
-        raise HTTPException(status_code=404, detail="Payment not found")
-    
-    if payment.user_id != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this payment")
+    async def write():
+        payment = await db.get(Payment, payment_id)
+        
+        if not payment:
+            raise HTTPException(status_code=404, detail="Payment not found")
+        
+        if payment.user_id != principal.user_id:
+            raise HTTPException(status_code=403, detail="Not authorized to delete this payment")
+        
+        version = await bump_version(db, payment.user_id)
+        try:
+            await ensure_open(db, principal.user_id, payment.date)
+        except PeriodClosed as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        await db.delete(payment)
+        await db.flush()
+        await apply_delta(db, payment.customer_id, payment.user_id, payments=-payment.amount)
+        await apply_month_delta(db, payment.user_id, payment.date, payments=-payment.amount)
+        await stamp_customers(db, [payment.customer_id], version)
+        db.add(Tombstone(
+            user_id=payment.user_id,
+            entity="payment",
+            entity_id=payment.payment_id,
+            client_id=payment.client_id,
+            version=version
+        ))
+        await db.commit()
     
-    db.delete(payment)
-    db.commit()
+    await retry_on_conflict(db, write)
+    dashboard_cache.invalidate(principal.user_id)
     
     return {"message": "Payment deleted successfully"}
\ No newline at end of file
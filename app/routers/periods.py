@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List
+from datetime import date
+from core.database import get_db
+from core.auth import Principal, get_principal
+from core.cache import dashboard_cache
+from models.models import ClosedPeriod
+from schemas.period import PeriodClose, PeriodResponse, ArchiveResponse
+from services.periods import archive_period, close_period
+
+router = APIRouter(prefix="/api/periods", tags=["Periods"])
+
+def _period_response(period: ClosedPeriod) -> dict:
+    return {
+        "period_end": period.period_end,
+        "customers": period.customers,
+        "closed_at": period.closed_at,
+        "archived_at": period.archived_at
+    }
+
+@router.get("", response_model=List[PeriodResponse])
+async def list_periods(principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    result = await db.scalars(select(ClosedPeriod).where(
+        ClosedPeriod.user_id == principal.user_id
+    ).order_by(ClosedPeriod.period_end.desc()))
+    
+    return [_period_response(period) for period in result.all()]
+
+@router.post("", response_model=PeriodResponse)
+async def close_books(request: PeriodClose, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    # Entries can still arrive for today; only days that are over can be closed
+    if request.period_end >= date.today():
+        raise HTTPException(status_code=400, detail="period_end must be before today")
+    
+    try:
+        period = await close_period(db, principal.user_id, request.period_end)
+        if request.archive:
+            period["archived_at"] = (await archive_period(db, principal.user_id, request.period_end))["archived_at"]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    dashboard_cache.invalidate(principal.user_id)
+    
+    return period
+
+@router.post("/{period_end}/archive", response_model=ArchiveResponse)
+async def archive_books(period_end: date, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    try:
+        result = await archive_period(db, principal.user_id, period_end)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    dashboard_cache.invalidate(principal.user_id)
+    
+    return result
\ No newline at end of file
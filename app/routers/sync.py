@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Optional
+from core.database import get_db
+from core.auth import Principal, get_principal
+from core.config import SYNC_MAX_OPERATIONS
+from core.responses import FastJSONResponse
+from routers import customers, credits, payments
+from schemas.customer import CustomerCreate, CustomerUpdate
+from schemas.credit import CreditCreate
+from schemas.payment import PaymentCreate
+from schemas.sync import SyncChanges, SyncOperation, SyncPushRequest, SyncPushResponse
+from services.sync import changes_since, find_by_client_id, find_tombstone
+
+router = APIRouter(prefix="/api/sync", tags=["Sync"])
+
+# Offline writes go through the regular handlers so balances, rollups,
+# versions and caches are maintained exactly as for online writes.
+CREATES = {
+    "customer": (CustomerCreate, customers.create_customer, "customer_id"),
+    "credit": (CreditCreate, credits.create_credit, "credit_id"),
+    "payment": (PaymentCreate, payments.create_payment, "payment_id"),
+}
+
+DELETES = {
+    "customer": customers.delete_customer,
+    "credit": credits.delete_credit,
+    "payment": payments.delete_payment,
+}
+
+@router.get("", response_model=SyncChanges)
+async def pull_changes(
+    principal: Principal = Depends(get_principal),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(500, ge=1, le=2000),
+    db: AsyncSession = Depends(get_db)
+):
+    since = -1
+    if cursor:
+        try:
+            since = int(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    return FastJSONResponse(await changes_since(db, principal.user_id, since, limit))
+
+async def _create(operation: SyncOperation, principal: Principal, db: AsyncSession):
+    if not operation.client_id:
+        raise HTTPException(status_code=400, detail="client_id is required to create")
+    
+    existing = await find_by_client_id(db, operation.entity, principal.user_id, operation.client_id)
+    if existing is not None:
+        return "duplicate", existing
+    deleted = await find_tombstone(db, operation.entity, principal.user_id, client_id=operation.client_id)
+    if deleted is not None:
+        return "duplicate", deleted
+    
+    data = dict(operation.data, client_id=operation.client_id)
+    customer_client_id = data.pop("customer_client_id", None)
+    if operation.entity != "customer" and data.get("customer_id") is None and customer_client_id:
+        data["customer_id"] = await find_by_client_id(db, "customer", principal.user_id, customer_client_id)
+        if data["customer_id"] is None:
+            raise HTTPException(status_code=404, detail="Customer not found or not authorized")
+    
+    schema, handler, id_field = CREATES[operation.entity]
+    created = await handler(schema.model_validate(data), principal, db)
+    return "applied", created[id_field] if isinstance(created, dict) else getattr(created, id_field)
+
+async def _apply(operation: SyncOperation, principal: Principal, db: AsyncSession):
+    if operation.op == "create":
+        return await _create(operation, principal, db)
+    
+    target = operation.id
+    if target is None:
+        if not operation.client_id:
+            raise HTTPException(status_code=400, detail="id or client_id is required")
+        target = await find_by_client_id(db, operation.entity, principal.user_id, operation.client_id)
+    
+    if operation.op == "update":
+        if operation.entity != "customer":
+            raise HTTPException(status_code=400, detail=f"A {operation.entity} can't be updated")
+        if target is None:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        await customers.update_customer(target, CustomerUpdate.model_validate(operation.data), principal, db)
+        return "applied", target
+    
+    deleted = await find_tombstone(
+        db, operation.entity, principal.user_id, entity_id=target, client_id=operation.client_id
+    )
+    if deleted is not None:
+        return "duplicate", deleted
+    if target is None:
+        raise HTTPException(status_code=404, detail=f"{operation.entity.capitalize()} not found")
+    await DELETES[operation.entity](target, principal, db)
+    return "applied", target
+
+@router.post("", response_model=SyncPushResponse)
+async def push_changes(request: SyncPushRequest, principal: Principal = Depends(get_principal), db: AsyncSession = Depends(get_db)):
+    if len(request.operations) > SYNC_MAX_OPERATIONS:
+        raise HTTPException(status_code=413, detail=f"At most {SYNC_MAX_OPERATIONS} operations per request")
+    
+    # Applied in order, each in its own transaction: a failed operation is
+    # reported and skipped, and a retried batch skips what already landed.
+    results = []
+    for index, operation in enumerate(request.operations):
+        try:
+            status, row_id = await _apply(operation, principal, db)
+            results.append({"index": index, "status": status, "id": row_id, "error": None})
+        except HTTPException as e:
+            await db.rollback()
+            results.append({"index": index, "status": "error", "id": None, "error": str(e.detail)})
+        except ValidationError as e:
+            await db.rollback()
+            message = "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+            results.append({"index": index, "status": "error", "id": None, "error": message})
+        except SQLAlchemyError as e:
+            await db.rollback()
+            results.append({"index": index, "status": "error", "id": None, "error": f"Failed: {e.__class__.__name__}"})
+    
+    return {"results": results}
\ No newline at end of file
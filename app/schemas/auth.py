@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import datetime
 
 class RegisterRequest(BaseModel):
     shop_name: str
@@ -17,6 +18,11 @@ class UserResponse(BaseModel):
     owner_name: str
     email: str
     phone: str
+
+class TokenResponse(UserResponse):
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: datetime
     
 class Config:
     from_attributes = True
\ No newline at end of file
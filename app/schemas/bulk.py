@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date
+from decimal import Decimal
+
+class BulkCustomerRow(BaseModel):
+    name: str
+    phone: str
+    email: Optional[str] = None
+
+class BulkCreditRow(BaseModel):
+    customer_id: int
+    amount: Decimal
+    description: Optional[str] = None
+    date: date
+
+class BulkPaymentRow(BaseModel):
+    customer_id: int
+    amount: Decimal
+    payment_method: str
+    date: date
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResponse(BaseModel):
+    received: int
+    inserted: int
+    ids: List[Optional[int]]
+    errors: List[BulkRowError]
\ No newline at end of file
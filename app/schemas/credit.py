@@ -1,14 +1,14 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import date, datetime
 from decimal import Decimal
 
 class CreditCreate(BaseModel):
-    user_id: int
     customer_id: int
     amount: Decimal
     description: Optional[str] = None
     date: date
+    client_id: Optional[str] = None
 
 class CreditResponse(BaseModel):
     credit_id: int
@@ -21,4 +21,21 @@ class CreditResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CreditPage(BaseModel):
+    items: List[CreditResponse]
+    next_cursor: Optional[str] = None
+
+class CreditColumns(BaseModel):
+    credit_id: List[int]
+    customer_id: List[int]
+    amount: List[Decimal]
+    description: List[Optional[str]]
+    date: List[date]
+    created_at: List[int]
+
+class CreditColumnPage(BaseModel):
+    columns: CreditColumns
+    customers: Dict[str, str]
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,12 +1,14 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from decimal import Decimal
 from datetime import datetime
 
 class CustomerCreate(BaseModel):
-    user_id: int
     name: str
     phone: str
     email: Optional[str] = None
+    # Generated by offline clients; a repeated create is rejected with 409
+    client_id: Optional[str] = None
 
 class CustomerUpdate(BaseModel):
     name: str
@@ -22,4 +24,16 @@ class CustomerResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CustomerSearchResult(BaseModel):
+    customer_id: int
+    name: str
+    phone: str
+    email: Optional[str] = None
+    outstanding: Decimal
+    last_activity: datetime
+
+class CustomerSearchPage(BaseModel):
+    items: List[CustomerSearchResult]
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from decimal import Decimal
-from typing import List
+from datetime import date
+from typing import List, Optional
 
 class DashboardStatsResponse(BaseModel):
     total_credits: Decimal
@@ -9,14 +10,34 @@ class DashboardStatsResponse(BaseModel):
     active_customers: int
 
 class MonthlyData(BaseModel):
+    year: int
     month: str
     credits: float
     payments: float
 
 class TopCustomer(BaseModel):
+    customer_id: int
     name: str
     outstanding: float
 
 class DashboardChartsResponse(BaseModel):
     monthly_data: List[MonthlyData]
-    top_customers: List[TopCustomer]
\ No newline at end of file
+    top_customers: List[TopCustomer]
+
+class AgingBuckets(BaseModel):
+    days_0_30: Decimal
+    days_31_60: Decimal
+    days_61_90: Decimal
+    days_over_90: Decimal
+    outstanding: Decimal
+    advance: Decimal
+
+class AgingCustomer(AgingBuckets):
+    customer_id: int
+    name: str
+    oldest_due_date: Optional[date]
+
+class AgingResponse(BaseModel):
+    as_of: date
+    totals: AgingBuckets
+    customers: List[AgingCustomer]
\ No newline at end of file
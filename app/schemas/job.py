@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import date, datetime
+
+class ExportRequest(BaseModel):
+    kind: str = Field(pattern="^(credits|payments|ledger)$")
+    format: str = Field("csv", pattern="^(csv|xlsx)$")
+    customer_id: Optional[int] = None
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
+
+class JobResponse(BaseModel):
+    job_id: int
+    kind: str
+    format: str
+    status: str
+    rows: Optional[int] = None
+    size_bytes: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
\ No newline at end of file
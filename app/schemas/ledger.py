@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import date
 from decimal import Decimal
 
@@ -12,5 +12,7 @@ class LedgerTransaction(BaseModel):
 
 class LedgerResponse(BaseModel):
     customer_name: str
+    closed_through: Optional[date] = None
+    opening_balance: Decimal = Decimal(0)
     transactions: List[LedgerTransaction]
     outstanding_balance: Decimal
\ No newline at end of file
@@ -1,13 +1,14 @@
 from pydantic import BaseModel
+from typing import Dict, List, Optional
 from datetime import date, datetime
 from decimal import Decimal
 
 class PaymentCreate(BaseModel):
-    user_id: int
     customer_id: int
     amount: Decimal
     payment_method: str
     date: date
+    client_id: Optional[str] = None
 
 class PaymentResponse(BaseModel):
     payment_id: int
@@ -20,4 +21,21 @@ class PaymentResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PaymentPage(BaseModel):
+    items: List[PaymentResponse]
+    next_cursor: Optional[str] = None
+
+class PaymentColumns(BaseModel):
+    payment_id: List[int]
+    customer_id: List[int]
+    amount: List[Decimal]
+    payment_method: List[str]
+    date: List[date]
+    created_at: List[int]
+
+class PaymentColumnPage(BaseModel):
+    columns: PaymentColumns
+    customers: Dict[str, str]
+    next_cursor: Optional[str] = None
\ No newline at end of file
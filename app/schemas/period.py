@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date, datetime
+
+class PeriodClose(BaseModel):
+    period_end: date
+    archive: bool = False
+
+class PeriodResponse(BaseModel):
+    period_end: date
+    customers: int
+    closed_at: datetime
+    archived_at: Optional[datetime] = None
+
+class ArchiveResponse(BaseModel):
+    period_end: date
+    credits: int
+    payments: int
+    archived_at: datetime
\ No newline at end of file
@@ -0,0 +1,73 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date, datetime
+from decimal import Decimal
+
+class SyncCustomer(BaseModel):
+    customer_id: int
+    client_id: Optional[str] = None
+    name: str
+    phone: str
+    email: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    version: int
+
+class SyncCredit(BaseModel):
+    credit_id: int
+    client_id: Optional[str] = None
+    customer_id: int
+    amount: Decimal
+    description: Optional[str] = None
+    date: date
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    version: int
+
+class SyncPayment(BaseModel):
+    payment_id: int
+    client_id: Optional[str] = None
+    customer_id: int
+    amount: Decimal
+    payment_method: str
+    date: date
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    version: int
+
+class SyncDeletion(BaseModel):
+    entity: str
+    id: int
+    client_id: Optional[str] = None
+    version: int
+    deleted_at: datetime
+
+class SyncChanges(BaseModel):
+    customers: List[SyncCustomer]
+    credits: List[SyncCredit]
+    payments: List[SyncPayment]
+    deleted: List[SyncDeletion]
+    cursor: str
+    has_more: bool
+
+class SyncOperation(BaseModel):
+    op: str = Field(pattern="^(create|update|delete)$")
+    entity: str = Field(pattern="^(customer|credit|payment)$")
+    # Target of an update/delete: the server id, or the client_id it was created with
+    id: Optional[int] = None
+    client_id: Optional[str] = None
+    # Fields of the matching create/update schema; credits and payments for a
+    # customer created offline may give customer_client_id instead of customer_id
+    data: dict = {}
+
+class SyncPushRequest(BaseModel):
+    operations: List[SyncOperation]
+
+class SyncResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class SyncPushResponse(BaseModel):
+    results: List[SyncResult]
\ No newline at end of file
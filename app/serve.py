@@ -0,0 +1,145 @@
+"""Production server: migrate once, preload the app, fork uvicorn workers.
+
+    python serve.py --workers 4 --port 8000
+
+The parent waits for the database, applies pending migrations and imports
+the app, then forks workers that share its listening socket, so each
+worker starts without re-importing or re-migrating and every worker has
+the same configuration (including a generated SECRET_KEY). Each worker
+opens its pools and compiles the hot statements in its lifespan hook
+before it takes traffic.
+
+SIGTERM or SIGINT drains: workers stop accepting, finish in-flight
+requests for up to --graceful-timeout seconds, let running exports finish
+and close their connections. A worker that dies is replaced, unless it
+dies right after starting. Platforms without fork fall back to uvicorn's
+own multi-process mode.
+"""
+import os
+
+# Workers must not each run migrations; this process runs them once
+os.environ["MIGRATE_ON_STARTUP"] = "false"
+
+import argparse
+import logging
+import signal
+import sys
+import time
+import uvicorn
+from core.config import WEB_CONCURRENCY, GRACEFUL_TIMEOUT
+from core.database import engine
+from core.startup import startup_timings, wait_for_database
+from migrations import upgrade
+
+logger = logging.getLogger("serve")
+
+# A worker that exits sooner than this after being forked isn't restarted
+MIN_WORKER_UPTIME = 5.0
+
+
+def fork_worker(config: uvicorn.Config, sockets: list) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Connections the parent opened (migrations) must not be shared
+    engine.dispose(close=False)
+    startup_timings.forked()
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGALRM):
+        signal.signal(signum, signal.SIG_DFL)
+    try:
+        uvicorn.Server(config).run(sockets=sockets)
+    finally:
+        os._exit(0)
+
+
+def supervise(config: uvicorn.Config, workers: int, graceful_timeout: float) -> int:
+    sockets = [config.bind_socket()]
+    children = {}
+    stopping = False
+    status = 0
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info("Draining %d worker(s)", len(children))
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        # Workers enforce the timeout themselves; this catches one that hangs
+        signal.alarm(int(graceful_timeout) + 10)
+
+    def kill(signum, frame):
+        for pid in children:
+            os.kill(pid, signal.SIGKILL)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGALRM, kill)
+
+    for _ in range(workers):
+        children[fork_worker(config, sockets)] = time.monotonic()
+    logger.info("Started %d worker(s) on %s:%d", workers, config.host, config.port)
+
+    while children:
+        try:
+            pid, wait_status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        logger.warning("Worker %d exited with status %d", pid, os.waitstatus_to_exitcode(wait_status))
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            logger.error("Worker %d died during startup; shutting down", pid)
+            status = 1
+            stop(signal.SIGTERM, None)
+        else:
+            children[fork_worker(config, sockets)] = time.monotonic()
+
+    for sock in sockets:
+        sock.close()
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT,
+                        help="Seconds a stopping worker may spend on in-flight requests")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="Import the app in each worker instead of once before forking")
+    parser.add_argument("--no-migrate", dest="migrate", action="store_false",
+                        help="Skip applying pending migrations before starting")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    # The pools log every dispose/recreate at INFO
+    logging.getLogger("core.database").setLevel(logging.WARNING)
+
+    wait_for_database(engine)
+    if args.migrate:
+        applied = upgrade(engine)
+        logger.info("Applied migrations: %s", ", ".join(f"{v:04d}" for v in applied) or "none")
+    engine.dispose()
+
+    if not hasattr(os, "fork"):
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers,
+                    timeout_graceful_shutdown=args.graceful_timeout, log_level=args.log_level)
+        return
+
+    if args.preload:
+        from main import app
+    else:
+        app = "main:app"
+    config = uvicorn.Config(app, host=args.host, port=args.port, timeout_graceful_shutdown=args.graceful_timeout,
+                            log_level=args.log_level)
+    sys.exit(supervise(config, args.workers, args.graceful_timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, literal, union_all, Integer
+from bisect import bisect_left
+from collections import deque
+from decimal import Decimal
+from datetime import date
+from models.models import Customer
+from services.periods import credit_tables, payment_tables
+
+# Upper bound (in days, inclusive) of every bucket but the last
+AGING_BOUNDS = (30, 60, 90)
+AGING_BUCKETS = ("days_0_30", "days_31_60", "days_61_90", "days_over_90")
+
+STREAM_CHUNK_ROWS = 1000
+
+ZERO = Decimal("0.00")
+
+
+def aging_entries(user_id: int, as_of: date):
+    """A shop's credits and payments up to `as_of`, grouped by customer in ledger order.
+
+    Within a customer the order matches the ledger: by date, credits
+    before payments. Rows are (customer_id, date, is_payment, amount).
+    Archived rows are included: a checkpoint has the balance but not the
+    dates of the credits still open in it.
+    """
+    selects = []
+    sources = [(table, 0) for table in credit_tables(archived=True)]
+    sources += [(table, 1) for table in payment_tables(archived=True)]
+    for table, is_payment in sources:
+        selects.append(select(
+            table.c.customer_id.label("customer_id"),
+            table.c.date.label("date"),
+            literal(is_payment, Integer).label("is_payment"),
+            table.c.amount.label("amount")
+        ).where(table.c.user_id == user_id, table.c.date <= as_of))
+
+    entries = union_all(*selects).subquery()
+    return select(entries).order_by(entries.c.customer_id, entries.c.date, entries.c.is_payment)
+
+
+class FifoAging:
+    """Allocates each customer's payments to their oldest credits in one pass.
+
+    Feed entries grouped by customer in ledger order; only the current
+    customer's unpaid credits are held, so memory doesn't grow with the
+    number of entries. A payment larger than what is open is kept as an
+    advance and settles the customer's next credits.
+    """
+
+    def __init__(self, as_of: date, include_settled: bool = False):
+        self.as_of = as_of
+        self.include_settled = include_settled
+        self.customers = []
+        self._customer_id = None
+        self._open = deque()
+        self._advance = ZERO
+
+    def add(self, customer_id: int, on: date, is_payment: bool, amount: Decimal):
+        if customer_id != self._customer_id:
+            self._close()
+            self._customer_id = customer_id
+        if is_payment:
+            self._pay(amount)
+        else:
+            self._charge(on, amount)
+
+    def finish(self) -> list:
+        self._close()
+        return self.customers
+
+    def _charge(self, on: date, amount: Decimal):
+        if self._advance:
+            used = min(self._advance, amount)
+            self._advance -= used
+            amount -= used
+        if not amount:
+            return
+        # [date, unpaid], oldest first; same-day credits share an entry
+        if self._open and self._open[-1][0] == on:
+            self._open[-1][1] += amount
+        else:
+            self._open.append([on, amount])
+
+    def _pay(self, amount: Decimal):
+        while amount and self._open:
+            oldest = self._open[0]
+            if oldest[1] <= amount:
+                amount -= oldest[1]
+                self._open.popleft()
+            else:
+                oldest[1] -= amount
+                amount = ZERO
+        self._advance += amount
+
+    def _close(self):
+        if self._customer_id is None:
+            return
+        buckets = [ZERO] * len(AGING_BUCKETS)
+        for on, unpaid in self._open:
+            buckets[bisect_left(AGING_BOUNDS, (self.as_of - on).days)] += unpaid
+        if self._open or self._advance or self.include_settled:
+            self.customers.append({
+                "customer_id": self._customer_id,
+                **dict(zip(AGING_BUCKETS, buckets)),
+                "outstanding": sum(buckets) - self._advance,
+                "advance": self._advance,
+                "oldest_due_date": self._open[0][0] if self._open else None
+            })
+        self._customer_id = None
+        self._open.clear()
+        self._advance = ZERO
+
+
+async def aging_report(db: AsyncSession, user_id: int, as_of: date, include_settled: bool = False) -> dict:
+    """Receivables aging for a shop: unpaid credit by age, per customer and in total."""
+    aging = FifoAging(as_of, include_settled)
+    result = await db.stream(aging_entries(user_id, as_of))
+    async for rows in result.partitions(STREAM_CHUNK_ROWS):
+        for row in rows:
+            aging.add(row.customer_id, row.date, row.is_payment, row.amount)
+    customers = aging.finish()
+
+    names = dict((await db.execute(
+        select(Customer.customer_id, Customer.name).where(Customer.user_id == user_id)
+    )).all()) if customers else {}
+
+    totals = {field: ZERO for field in (*AGING_BUCKETS, "outstanding", "advance")}
+    for customer in customers:
+        customer["name"] = names.get(customer["customer_id"], "Unknown")
+        for field in totals:
+            totals[field] += customer[field]
+    customers.sort(key=lambda customer: (-customer["outstanding"], customer["name"]))
+
+    return {"as_of": as_of, "totals": totals, "customers": customers}
@@ -0,0 +1,208 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from decimal import Decimal
+from datetime import datetime
+from models.models import Credit, Payment, Customer, CustomerBalance, LedgerCheckpoint
+from services.periods import latest_checkpoint
+
+
+class InsufficientBalance(Exception):
+    """A payment would take a customer's outstanding balance below zero."""
+
+
+async def _raw_totals(db: AsyncSession, customer_id: int):
+    # Closed periods are summed up in the latest checkpoint; only newer rows are read
+    checkpoint = await latest_checkpoint(db, customer_id)
+    credits = select(func.sum(Credit.amount)).where(Credit.customer_id == customer_id)
+    payments = select(func.sum(Payment.amount)).where(Payment.customer_id == customer_id)
+    if checkpoint is not None:
+        credits = credits.where(Credit.date > checkpoint.period_end)
+        payments = payments.where(Payment.date > checkpoint.period_end)
+
+    total_credits = await db.scalar(credits) or Decimal(0)
+    total_payments = await db.scalar(payments) or Decimal(0)
+
+    if checkpoint is not None:
+        total_credits += checkpoint.total_credits
+        total_payments += checkpoint.total_payments
+
+    return total_credits, total_payments
+
+
+async def apply_delta(db: AsyncSession, customer_id: int, user_id: int, credits=Decimal(0), payments=Decimal(0)):
+    """Adjust a customer's balance row inside the caller's transaction.
+
+    Call after the credit/payment change has been flushed: a customer that
+    predates the balances table has its row seeded from the raw rows, which
+    then already include the change.
+    """
+    result = await db.execute(
+        update(CustomerBalance).where(
+            CustomerBalance.customer_id == customer_id
+        ).values(
+            total_credits=CustomerBalance.total_credits + credits,
+            total_payments=CustomerBalance.total_payments + payments,
+            outstanding=CustomerBalance.outstanding + credits - payments,
+            updated_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    )
+
+    if not result.rowcount:
+        total_credits, total_payments = await _raw_totals(db, customer_id)
+        db.add(CustomerBalance(
+            customer_id=customer_id,
+            user_id=user_id,
+            total_credits=total_credits,
+            total_payments=total_payments,
+            outstanding=total_credits - total_payments
+        ))
+        await db.flush()
+
+
+async def apply_deltas(db: AsyncSession, user_id: int, deltas: dict, field: str):
+    """Add `deltas` (customer_id -> amount) to many customers' `field` totals at once.
+
+    One executemany UPDATE for all the balance rows instead of a statement
+    per customer; customers without a row yet are seeded as in apply_delta.
+    """
+    existing = set((await db.scalars(select(CustomerBalance.customer_id).where(
+        CustomerBalance.customer_id.in_(deltas.keys())
+    ))).all())
+    rows = [{"balance_customer_id": customer_id, "delta": amount}
+            for customer_id, amount in deltas.items() if customer_id in existing]
+
+    if rows:
+        # Core table, so the ORM doesn't take the parameter list for a bulk update by primary key
+        table = CustomerBalance.__table__
+        total = table.c[f"total_{field}"]
+        delta = bindparam("delta")
+        await db.execute(update(table).where(table.c.customer_id == bindparam("balance_customer_id")).values({
+            total: total + delta,
+            table.c.outstanding: table.c.outstanding + delta if field == "credits" else table.c.outstanding - delta,
+            table.c.updated_at: datetime.utcnow()
+        }), rows)
+
+    for customer_id in deltas.keys() - existing:
+        await apply_delta(db, customer_id, user_id, **{field: deltas[customer_id]})
+
+
+async def reserve_payment(db: AsyncSession, customer_id: int, user_id: int, amount: Decimal) -> bool:
+    """Apply a payment to the balance row only if it doesn't exceed what is outstanding.
+
+    The check and the update are one conditional UPDATE, so the row lock
+    it takes is the whole critical section: a concurrent payment for the
+    same customer waits for it and then re-checks against the new balance.
+    Other customers aren't blocked. Returns False, changing nothing, when
+    the payment is too large.
+    """
+    statement = update(CustomerBalance).where(
+        CustomerBalance.customer_id == customer_id,
+        CustomerBalance.outstanding >= amount
+    ).values(
+        total_payments=CustomerBalance.total_payments + amount,
+        outstanding=CustomerBalance.outstanding - amount,
+        updated_at=datetime.utcnow()
+    ).execution_options(synchronize_session=False)
+
+    if (await db.execute(statement)).rowcount:
+        return True
+
+    exists = await db.scalar(select(CustomerBalance.customer_id).where(CustomerBalance.customer_id == customer_id))
+    if exists is not None:
+        return False
+
+    # A customer that predates the balances table: seed its row, then retry
+    total_credits, total_payments = await _raw_totals(db, customer_id)
+    db.add(CustomerBalance(
+        customer_id=customer_id,
+        user_id=user_id,
+        total_credits=total_credits,
+        total_payments=total_payments,
+        outstanding=total_credits - total_payments
+    ))
+    await db.flush()
+    return bool((await db.execute(statement)).rowcount)
+
+
+async def get_outstanding(db: AsyncSession, customer_id: int) -> Decimal:
+    outstanding = await db.scalar(
+        select(CustomerBalance.outstanding).where(CustomerBalance.customer_id == customer_id)
+    )
+
+    if outstanding is None:
+        total_credits, total_payments = await _raw_totals(db, customer_id)
+        outstanding = total_credits - total_payments
+
+    return outstanding
+
+
+async def rebuild_balances(db: AsyncSession, user_id: int = None) -> dict:
+    """Recompute every balance row from each customer's latest checkpoint and the rows after it."""
+    latest = select(
+        LedgerCheckpoint.customer_id, func.max(LedgerCheckpoint.period_end).label("period_end")
+    ).group_by(LedgerCheckpoint.customer_id)
+    if user_id is not None:
+        latest = latest.where(LedgerCheckpoint.user_id == user_id)
+    latest = latest.subquery()
+
+    def totals_after_checkpoint(model):
+        return select(model.customer_id, func.sum(model.amount)).outerjoin(
+            latest, latest.c.customer_id == model.customer_id
+        ).where(
+            or_(latest.c.period_end.is_(None), model.date > latest.c.period_end)
+        ).group_by(model.customer_id)
+
+    credit_totals = totals_after_checkpoint(Credit)
+    payment_totals = totals_after_checkpoint(Payment)
+    checkpoints = select(
+        LedgerCheckpoint.customer_id, LedgerCheckpoint.total_credits, LedgerCheckpoint.total_payments
+    ).join(latest, and_(
+        latest.c.customer_id == LedgerCheckpoint.customer_id,
+        latest.c.period_end == LedgerCheckpoint.period_end
+    ))
+    customers = select(Customer.customer_id, Customer.user_id)
+    existing = select(CustomerBalance)
+
+    if user_id is not None:
+        credit_totals = credit_totals.where(Credit.user_id == user_id)
+        payment_totals = payment_totals.where(Payment.user_id == user_id)
+        customers = customers.where(Customer.user_id == user_id)
+        existing = existing.where(CustomerBalance.user_id == user_id)
+
+    credits_by_customer = dict((await db.execute(credit_totals)).all())
+    payments_by_customer = dict((await db.execute(payment_totals)).all())
+    for customer_id, total_credits, total_payments in (await db.execute(checkpoints)).all():
+        credits_by_customer[customer_id] = credits_by_customer.get(customer_id, Decimal(0)) + total_credits
+        payments_by_customer[customer_id] = payments_by_customer.get(customer_id, Decimal(0)) + total_payments
+    balances = {row.customer_id: row for row in (await db.scalars(existing)).all()}
+
+    created = corrected = 0
+    for customer_id, owner_id in (await db.execute(customers)).all():
+        total_credits = credits_by_customer.get(customer_id) or Decimal(0)
+        total_payments = payments_by_customer.get(customer_id) or Decimal(0)
+        balance = balances.pop(customer_id, None)
+
+        if balance is None:
+            db.add(CustomerBalance(
+                customer_id=customer_id,
+                user_id=owner_id,
+                total_credits=total_credits,
+                total_payments=total_payments,
+                outstanding=total_credits - total_payments
+            ))
+            created += 1
+        elif (balance.total_credits, balance.total_payments, balance.outstanding) != (
+            total_credits, total_payments, total_credits - total_payments
+        ):
+            balance.total_credits = total_credits
+            balance.total_payments = total_payments
+            balance.outstanding = total_credits - total_payments
+            corrected += 1
+
+    # Rows left over belong to customers that no longer exist
+    for balance in balances.values():
+        await db.delete(balance)
+
+    await db.commit()
+
+    return {"created": created, "corrected": corrected, "removed": len(balances)}
@@ -0,0 +1,124 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+from bisect import bisect_left
+from collections import defaultdict
+from core.cache import MemoryCache
+from core.config import SEARCH_INDEX_TTL, CACHE_MAX_ENTRIES
+from core.database import engine
+from models.models import Customer
+
+# pg_trgm's default similarity_threshold, so both paths agree on fuzzy hits
+SIMILARITY_THRESHOLD = 0.3
+
+_indexes = MemoryCache(ttl=SEARCH_INDEX_TTL, max_entries=CACHE_MAX_ENTRIES)
+
+
+def trigrams(text: str) -> set:
+    """Trigrams the way pg_trgm extracts them: per alphanumeric word, lowercased, padded."""
+    grams = set()
+    word = []
+    for char in text.lower() + " ":
+        if char.isalnum():
+            word.append(char)
+        elif word:
+            padded = "  " + "".join(word) + " "
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+            word = []
+    return grams
+
+
+def similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class CustomerIndex:
+    """In-process name/phone index for one shop, used where pg_trgm isn't available.
+
+    Matches exactly what the Postgres clause does: the name starts with the
+    query at the beginning or after any space (case-insensitive), the phone
+    starts with it, or, when fuzzy, the name's trigram similarity reaches
+    SIMILARITY_THRESHOLD.
+    """
+
+    def __init__(self, rows):
+        self._name_suffixes = []
+        self._phones = []
+        self._postings = defaultdict(set)
+        self._trigrams = {}
+
+        for customer_id, name, phone in rows:
+            lowered = name.lower()
+            self._name_suffixes.append((lowered, customer_id))
+            for position, char in enumerate(lowered):
+                if char == " ":
+                    self._name_suffixes.append((lowered[position + 1:], customer_id))
+            self._phones.append((phone, customer_id))
+            grams = trigrams(name)
+            self._trigrams[customer_id] = grams
+            for gram in grams:
+                self._postings[gram].add(customer_id)
+
+        self._name_suffixes.sort()
+        self._phones.sort()
+
+    @staticmethod
+    def _prefixed(entries: list, prefix: str) -> set:
+        ids = set()
+        for index in range(bisect_left(entries, (prefix,)), len(entries)):
+            value, customer_id = entries[index]
+            if not value.startswith(prefix):
+                break
+            ids.add(customer_id)
+        return ids
+
+    def match(self, q: str, fuzzy: bool = False) -> set:
+        ids = self._prefixed(self._name_suffixes, q.lower()) | self._prefixed(self._phones, q)
+        if fuzzy:
+            query_grams = trigrams(q)
+            candidates = set().union(*(self._postings.get(gram, ()) for gram in query_grams))
+            ids.update(
+                customer_id for customer_id in candidates
+                if similarity(query_grams, self._trigrams[customer_id]) >= SIMILARITY_THRESHOLD
+            )
+        return ids
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+async def _shop_index(db: AsyncSession, user_id: int) -> CustomerIndex:
+    index = _indexes.get(user_id, "index")
+    if index is None:
+        rows = (await db.execute(select(Customer.customer_id, Customer.name, Customer.phone).where(
+            Customer.user_id == user_id
+        ))).all()
+        index = CustomerIndex(rows)
+        _indexes.set(user_id, "index", index)
+    return index
+
+
+async def match_clause(db: AsyncSession, user_id: int, q: str, fuzzy: bool = False):
+    """WHERE clause selecting the shop's customers that match `q`."""
+    if engine.dialect.name == "postgresql":
+        # Served by the gin_trgm_ops indexes from migration 0004
+        escaped = _like_escape(q)
+        clauses = [
+            Customer.name.ilike(f"{escaped}%", escape="/"),
+            Customer.name.ilike(f"% {escaped}%", escape="/"),
+            Customer.phone.like(f"{escaped}%", escape="/"),
+        ]
+        if fuzzy:
+            clauses.append(Customer.name.op("%")(q))
+        return or_(*clauses)
+
+    index = await _shop_index(db, user_id)
+    return Customer.customer_id.in_(index.match(q, fuzzy))
+
+
+def invalidate(user_id: int):
+    """Drop the shop's in-process index after its customers change."""
+    _indexes.invalidate(user_id)
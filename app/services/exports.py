@@ -0,0 +1,186 @@
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from core.config import JOB_CHUNK_ROWS
+from models.models import Credit, Payment, Customer
+from services.ledger import ledger_entries, opening_balance_query
+from services.periods import latest_checkpoint_query
+
+FORMATS = ("csv", "xlsx")
+
+
+def _filtered(query, model, params: dict):
+    if params.get("customer_id") is not None:
+        query = query.where(model.customer_id == params["customer_id"])
+    if params.get("from_date"):
+        query = query.where(model.date >= date.fromisoformat(params["from_date"]))
+    if params.get("to_date"):
+        query = query.where(model.date <= date.fromisoformat(params["to_date"]))
+    return query
+
+
+def _partitions(session: Session, query):
+    result = session.execute(query.execution_options(yield_per=JOB_CHUNK_ROWS))
+    for rows in result.partitions():
+        yield [tuple(row) for row in rows]
+
+
+def credit_rows(session: Session, user_id: int, params: dict):
+    query = select(
+        Credit.date, Credit.credit_id, Customer.name, Credit.amount, Credit.description
+    ).outerjoin(
+        Customer, Customer.customer_id == Credit.customer_id
+    ).where(Credit.user_id == user_id)
+    query = _filtered(query, Credit, params).order_by(Credit.date, Credit.credit_id)
+    return _partitions(session, query)
+
+
+def payment_rows(session: Session, user_id: int, params: dict):
+    query = select(
+        Payment.date, Payment.payment_id, Customer.name, Payment.amount, Payment.payment_method
+    ).outerjoin(
+        Customer, Customer.customer_id == Payment.customer_id
+    ).where(Payment.user_id == user_id)
+    query = _filtered(query, Payment, params).order_by(Payment.date, Payment.payment_id)
+    return _partitions(session, query)
+
+
+def ledger_rows(session: Session, user_id: int, params: dict):
+    customer_id = params["customer_id"]
+    from_date = date.fromisoformat(params["from_date"]) if params.get("from_date") else None
+    to_date = date.fromisoformat(params["to_date"]) if params.get("to_date") else None
+
+    opening = Decimal(0)
+    if from_date is not None:
+        checkpoint = session.scalar(latest_checkpoint_query(customer_id, from_date))
+        opening = Decimal(session.scalar(opening_balance_query(customer_id, from_date, checkpoint)) or 0)
+        yield [(from_date, "Opening balance", None, None, opening)]
+
+    # Exports are how archived statements are fetched, so read the archive too
+    query = ledger_entries(customer_id, from_date, to_date, opening, archived=True)
+    result = session.execute(query.execution_options(yield_per=JOB_CHUNK_ROWS))
+    for rows in result.partitions():
+        yield [(row.date, row.description, row.debit, row.credit, row.balance) for row in rows]
+
+
+# kind -> (header row, row generator); generators yield lists of tuples
+EXPORTS = {
+    "credits": (("Date", "Credit ID", "Customer", "Amount", "Description"), credit_rows),
+    "payments": (("Date", "Payment ID", "Customer", "Amount", "Method"), payment_rows),
+    "ledger": (("Date", "Description", "Debit", "Credit", "Balance"), ledger_rows),
+}
+
+
+class CsvWriter:
+    def __init__(self, path: str):
+        self._fh = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._fh)
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._fh.close()
+
+
+# Control characters XML 1.0 can't carry
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+class XlsxWriter:
+    """Single-sheet .xlsx written row by row into a zip entry.
+
+    Numbers become numeric cells; everything else, dates included, is an
+    inline string, so no shared-strings table has to be held in memory.
+    """
+
+    def __init__(self, path: str):
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        for name, content in _XLSX_PARTS.items():
+            self._zip.writestr(name, content)
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._sheet.write(
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        )
+
+    @staticmethod
+    def _cell(value) -> str:
+        if value is None:
+            return "<c/>"
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return f"<c><v>{value}</v></c>"
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        text = escape(_INVALID_XML.sub("", str(value)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def write_rows(self, rows):
+        self._sheet.write("".join(
+            "<row>" + "".join(self._cell(value) for value in row) + "</row>" for row in rows
+        ).encode())
+
+    def close(self):
+        self._sheet.write(b"</sheetData></worksheet>")
+        self._sheet.close()
+        self._zip.close()
+
+
+WRITERS = {"csv": CsvWriter, "xlsx": XlsxWriter}
+
+
+def write_export(session: Session, kind: str, user_id: int, params: dict, fmt: str, path: str) -> int:
+    """Write the export to `path` chunk by chunk; returns the number of data rows."""
+    header, rows = EXPORTS[kind]
+    writer = WRITERS[fmt](path)
+    count = 0
+    try:
+        writer.write_rows([header])
+        for chunk in rows(session, user_id, params):
+            writer.write_rows(chunk)
+            count += len(chunk)
+    finally:
+        writer.close()
+    return count
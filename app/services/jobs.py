@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, update
+from core.config import JOB_WORKERS, JOB_OUTPUT_DIR, JOB_HEARTBEAT_SECONDS, JOB_STALE_SECONDS
+from core.database import SessionLocal
+from models.models import Job
+from services.exports import write_export
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = ("queued", "running")
+
+# Jobs use the sync engine on their own threads, so a slow export never
+# holds a request worker or the shared threadpool.
+_executor = None
+
+# Jobs this process is running, kept alive by the heartbeat thread
+_running = set()
+_running_lock = threading.Lock()
+_heartbeat = None
+_stopping = None
+
+
+def _worker_id() -> str:
+    # Read on each call: serve.py imports this module before forking workers
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _beat(stopping: threading.Event):
+    while not stopping.wait(JOB_HEARTBEAT_SECONDS):
+        with _running_lock:
+            job_ids = list(_running)
+        if not job_ids:
+            continue
+        try:
+            with SessionLocal() as session:
+                session.execute(update(Job).where(
+                    Job.job_id.in_(job_ids), Job.status == "running", Job.worker == _worker_id()
+                ).values(heartbeat_at=datetime.utcnow()))
+                session.commit()
+        except Exception:
+            logger.exception("job heartbeat failed")
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor, _heartbeat, _stopping
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="jobs")
+        _stopping = threading.Event()
+        _heartbeat = threading.Thread(target=_beat, args=(_stopping,), name="jobs-heartbeat", daemon=True)
+        _heartbeat.start()
+    return _executor
+
+
+def _claim(session, job_id: int) -> bool:
+    # Conditional update so a job is only ever run once, even if it was
+    # submitted again by resume_jobs in another process.
+    now = datetime.utcnow()
+    result = session.execute(
+        update(Job).where(Job.job_id == job_id, Job.status == "queued").values(
+            status="running", started_at=now, worker=_worker_id(), heartbeat_at=now
+        )
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+def run_job(job_id: int):
+    with SessionLocal() as session:
+        if not _claim(session, job_id):
+            return
+        job = session.get(Job, job_id)
+        kind, user_id, params, fmt = job.kind, job.user_id, json.loads(job.params), job.format
+        path = os.path.join(JOB_OUTPUT_DIR, f"{job_id}.{fmt}")
+        partial = path + ".part"
+
+        with _running_lock:
+            _running.add(job_id)
+        try:
+            try:
+                os.makedirs(JOB_OUTPUT_DIR, exist_ok=True)
+                rows = write_export(session, kind, user_id, params, fmt, partial)
+                os.replace(partial, path)
+                outcome = {"status": "succeeded", "rows": rows, "size_bytes": os.path.getsize(path), "file_path": path}
+            except Exception as exc:
+                logger.exception("job %s (%s) failed", job_id, kind)
+                if os.path.exists(partial):
+                    os.remove(partial)
+                outcome = {"status": "failed", "error": str(exc)[:500] or type(exc).__name__}
+            session.rollback()
+
+            # Conditional, like _claim: a job failed as stale meanwhile stays failed
+            result = session.execute(update(Job).where(
+                Job.job_id == job_id, Job.status == "running", Job.worker == _worker_id()
+            ).values(finished_at=datetime.utcnow(), **outcome))
+            session.commit()
+            if not result.rowcount and outcome["status"] == "succeeded":
+                os.remove(path)
+        finally:
+            with _running_lock:
+                _running.discard(job_id)
+
+
+def submit(job_id: int):
+    """Queue an already committed job row for execution."""
+    _pool().submit(run_job, job_id)
+
+
+def fail_stale_jobs(session) -> int:
+    """Fail running jobs whose heartbeat stopped JOB_STALE_SECONDS ago.
+
+    Their process died before finishing them; left running they would count
+    against the shop's pending limit and couldn't be deleted. Jobs of live
+    processes, however long they run, keep beating and are left alone.
+    """
+    now = datetime.utcnow()
+    # Jobs claimed before heartbeats existed only have started_at
+    result = session.execute(update(Job).where(
+        Job.status == "running",
+        func.coalesce(Job.heartbeat_at, Job.started_at) < now - timedelta(seconds=JOB_STALE_SECONDS)
+    ).values(status="failed", error="Interrupted before it finished; submit it again", finished_at=now))
+    session.commit()
+    return result.rowcount
+
+
+def resume_jobs() -> int:
+    """Requeue jobs left queued by a previous run of the process and fail stale running ones."""
+    with SessionLocal() as session:
+        failed = fail_stale_jobs(session)
+        if failed:
+            logger.warning("failed %d job(s) left running by a stopped process", failed)
+        job_ids = session.scalars(select(Job.job_id).where(Job.status == "queued").order_by(Job.job_id)).all()
+    for job_id in job_ids:
+        submit(job_id)
+    return len(job_ids)
+
+
+def shutdown():
+    # Running exports finish; jobs still waiting stay queued for resume_jobs
+    global _executor, _heartbeat
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+        _stopping.set()
+        _heartbeat.join()
+        _heartbeat = None
+
+
+def remove_output(job: Job):
+    # Only called for jobs that aren't running, so a partial file is a
+    # leftover of a process that died mid-export
+    partial = os.path.join(JOB_OUTPUT_DIR, f"{job.job_id}.{job.format}.part")
+    for path in (job.file_path, partial):
+        if path and os.path.exists(path):
+            os.remove(path)
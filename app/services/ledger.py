@@ -0,0 +1,90 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, literal, union_all, Numeric, Integer
+from decimal import Decimal
+from datetime import date
+from typing import Optional
+from models.models import LedgerCheckpoint
+from services.periods import credit_tables, latest_checkpoint, payment_tables
+
+
+def opening_balance_query(customer_id: int, before: date, checkpoint: Optional[LedgerCheckpoint] = None):
+    """Balance carried into `before`, as one scalar select.
+
+    With `checkpoint` (the latest one ending before `before`) only the rows
+    dated after it are summed, onto its closing balance. Archived rows are
+    included, since `before` may fall in an archived period.
+    """
+    def total(table):
+        query = select(func.coalesce(func.sum(table.c.amount), 0)).where(
+            table.c.customer_id == customer_id, table.c.date < before
+        )
+        if checkpoint is not None:
+            query = query.where(table.c.date > checkpoint.period_end)
+        return query.scalar_subquery()
+
+    balance = literal(checkpoint.balance if checkpoint is not None else Decimal(0), Numeric(12, 2))
+    for table in credit_tables(archived=True):
+        balance = balance + total(table)
+    for table in payment_tables(archived=True):
+        balance = balance - total(table)
+    return select(balance)
+
+
+async def opening_balance(db: AsyncSession, customer_id: int, before: Optional[date]) -> Decimal:
+    """Balance carried into a statement that starts on `before`."""
+    if before is None:
+        return Decimal(0)
+    checkpoint = await latest_checkpoint(db, customer_id, before)
+    return Decimal(await db.scalar(opening_balance_query(customer_id, before, checkpoint)) or 0)
+
+
+def _in_range(table, customer_id: int, from_date: Optional[date], to_date: Optional[date]) -> list:
+    conditions = [table.c.customer_id == customer_id]
+    if from_date is not None:
+        conditions.append(table.c.date >= from_date)
+    if to_date is not None:
+        conditions.append(table.c.date <= to_date)
+    return conditions
+
+
+def ledger_entries(customer_id: int, from_date: Optional[date] = None, to_date: Optional[date] = None,
+                   opening: Decimal = Decimal(0), archived: bool = False):
+    """Credits and payments in ledger order with the running balance done in SQL.
+
+    Ordering matches get_ledger: by date, credits before payments, then id.
+    Pass `archived` when the range reaches into archived periods.
+    """
+    zero = literal(Decimal(0), Numeric(12, 2))
+    selects = []
+    for table in credit_tables(archived):
+        selects.append(select(
+            table.c.date.label("date"),
+            literal(0, Integer).label("sort_order"),
+            table.c.credit_id.label("entry_id"),
+            func.coalesce(table.c.description, "Credit entry").label("description"),
+            table.c.amount.label("debit"),
+            zero.label("credit")
+        ).where(*_in_range(table, customer_id, from_date, to_date)))
+    for table in payment_tables(archived):
+        selects.append(select(
+            table.c.date.label("date"),
+            literal(1, Integer).label("sort_order"),
+            table.c.payment_id.label("entry_id"),
+            (literal("Payment (") + table.c.payment_method + ")").label("description"),
+            zero.label("debit"),
+            table.c.amount.label("credit")
+        ).where(*_in_range(table, customer_id, from_date, to_date)))
+
+    entries = union_all(*selects).subquery()
+    order = (entries.c.date, entries.c.sort_order, entries.c.entry_id)
+    running = func.sum(entries.c.debit - entries.c.credit).over(order_by=order, rows=(None, 0))
+
+    return select(
+        entries.c.date,
+        entries.c.sort_order,
+        entries.c.entry_id,
+        entries.c.description,
+        entries.c.debit,
+        entries.c.credit,
+        (literal(opening, Numeric(12, 2)) + running).label("balance")
+    ).order_by(*order)
@@ -0,0 +1,94 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, extract, func, insert, literal, select, union_all, Numeric
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from collections import defaultdict
+from decimal import Decimal
+from datetime import date
+from core.database import engine
+from models.models import MonthlyTotal
+from services.periods import credit_tables, payment_tables
+
+
+async def apply_month_delta(db: AsyncSession, user_id: int, on: date, credits=Decimal(0), payments=Decimal(0)):
+    """Adjust the shop's rollup row for the month of `on` inside the caller's transaction.
+
+    One upsert, so two first writes in a new month can't both try to
+    insert the row.
+    """
+    insert_ = postgresql_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    statement = insert_(MonthlyTotal).values(
+        user_id=user_id, year=on.year, month=on.month, credits=credits, payments=payments
+    )
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[MonthlyTotal.user_id, MonthlyTotal.year, MonthlyTotal.month],
+        set_={
+            "credits": MonthlyTotal.credits + statement.excluded.credits,
+            "payments": MonthlyTotal.payments + statement.excluded.payments
+        }
+    ))
+
+
+async def apply_month_deltas(db: AsyncSession, user_id: int, amounts, field: str):
+    """Roll (date, amount) pairs up by month and apply them as `field` deltas."""
+    deltas = defaultdict(Decimal)
+    for on, amount in amounts:
+        deltas[date(on.year, on.month, 1)] += amount
+    for month_start, amount in sorted(deltas.items()):
+        await apply_month_delta(db, user_id, month_start, **{field: amount})
+
+
+def monthly_totals_query(user_id: int = None, customer_id: int = None):
+    """Per-shop monthly sums computed from the raw credits and payments (and the archived ones)."""
+    zero = literal(Decimal(0), Numeric(14, 2))
+    selects = []
+    sources = [(table, False) for table in credit_tables(archived=True)]
+    sources += [(table, True) for table in payment_tables(archived=True)]
+    for table, is_payment in sources:
+        entries = select(
+            table.c.user_id.label("user_id"),
+            extract("year", table.c.date).label("year"),
+            extract("month", table.c.date).label("month"),
+            zero.label("credits") if is_payment else table.c.amount.label("credits"),
+            table.c.amount.label("payments") if is_payment else zero.label("payments")
+        )
+        if user_id is not None:
+            entries = entries.where(table.c.user_id == user_id)
+        if customer_id is not None:
+            entries = entries.where(table.c.customer_id == customer_id)
+        selects.append(entries)
+
+    entries = union_all(*selects).subquery()
+    return select(
+        entries.c.user_id,
+        entries.c.year,
+        entries.c.month,
+        func.sum(entries.c.credits),
+        func.sum(entries.c.payments)
+    ).group_by(entries.c.user_id, entries.c.year, entries.c.month)
+
+
+async def remove_customer_totals(db: AsyncSession, user_id: int, customer_id: int):
+    """Take a customer's credits and payments back out of the rollup before they are deleted."""
+    rows = (await db.execute(monthly_totals_query(user_id, customer_id))).all()
+    for _, year, month, credits, payments in rows:
+        await apply_month_delta(db, user_id, date(int(year), int(month), 1), credits=-credits, payments=-payments)
+
+
+def backfill_statement(user_id: int = None):
+    return insert(MonthlyTotal).from_select(
+        ["user_id", "year", "month", "credits", "payments"], monthly_totals_query(user_id)
+    )
+
+
+async def rebuild_monthly_totals(db: AsyncSession, user_id: int = None) -> int:
+    """Replace the rollup with totals recomputed from the raw rows."""
+    clear = delete(MonthlyTotal)
+    if user_id is not None:
+        clear = clear.where(MonthlyTotal.user_id == user_id)
+
+    await db.execute(clear)
+    result = await db.execute(backfill_statement(user_id))
+    await db.commit()
+
+    return result.rowcount
@@ -0,0 +1,139 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, insert, select, update
+from collections import defaultdict
+from decimal import Decimal
+from datetime import date, datetime
+from typing import Optional
+from models.models import Credit, Payment, CreditArchive, PaymentArchive, ClosedPeriod, LedgerCheckpoint
+from services.versions import bump_version, stamp_customers
+
+
+class PeriodClosed(Exception):
+    """An entry is dated on or before the end of the shop's last closed period."""
+
+    def __init__(self, closed_through: date):
+        super().__init__(f"The books are closed through {closed_through}; "
+                         f"entries dated on or before it can't be added or removed")
+        self.closed_through = closed_through
+
+
+def credit_tables(archived: bool = False) -> tuple:
+    """Tables holding credits: the live one, plus the archive when `archived`."""
+    return (Credit.__table__, CreditArchive.__table__) if archived else (Credit.__table__,)
+
+
+def payment_tables(archived: bool = False) -> tuple:
+    return (Payment.__table__, PaymentArchive.__table__) if archived else (Payment.__table__,)
+
+
+def latest_checkpoint_query(customer_id: int, before: Optional[date] = None):
+    """The customer's most recent checkpoint, or the last one ending before `before`."""
+    query = select(LedgerCheckpoint).where(LedgerCheckpoint.customer_id == customer_id)
+    if before is not None:
+        query = query.where(LedgerCheckpoint.period_end < before)
+    return query.order_by(LedgerCheckpoint.period_end.desc()).limit(1)
+
+
+async def latest_checkpoint(db: AsyncSession, customer_id: int, before: Optional[date] = None) -> Optional[LedgerCheckpoint]:
+    return await db.scalar(latest_checkpoint_query(customer_id, before))
+
+
+def closed_through_query(user_id: int):
+    return select(func.max(ClosedPeriod.period_end)).where(ClosedPeriod.user_id == user_id)
+
+
+async def closed_through(db: AsyncSession, user_id: int) -> Optional[date]:
+    """End of the shop's last closed period; None if it never closed one."""
+    return await db.scalar(closed_through_query(user_id))
+
+
+async def ensure_open(db: AsyncSession, user_id: int, *dates: date):
+    """Raise PeriodClosed if any of `dates` falls in a closed period.
+
+    Call after bump_version: its row lock orders this check against a
+    concurrent close_period, which takes the same lock before it sums.
+    """
+    closed = await closed_through(db, user_id)
+    if closed is not None and min(dates) <= closed:
+        raise PeriodClosed(closed)
+
+
+async def close_period(db: AsyncSession, user_id: int, period_end: date) -> dict:
+    """Write every customer's checkpoint at `period_end` and close the books through it.
+
+    Only the rows dated since the previous close are summed; they are added
+    to that close's checkpoints. Later writes dated on or before
+    `period_end` are refused (see ensure_open), so the checkpoints stay
+    exact. Raises ValueError if `period_end` doesn't follow the last close.
+    """
+    version = await bump_version(db, user_id)
+    previous = await closed_through(db, user_id)
+    if previous is not None and period_end <= previous:
+        raise ValueError(f"The books are already closed through {previous}")
+
+    totals = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    if previous is not None:
+        carried = await db.execute(select(
+            LedgerCheckpoint.customer_id, LedgerCheckpoint.total_credits, LedgerCheckpoint.total_payments
+        ).where(LedgerCheckpoint.user_id == user_id, LedgerCheckpoint.period_end == previous))
+        for customer_id, total_credits, total_payments in carried.all():
+            totals[customer_id] = [total_credits, total_payments]
+
+    for position, model in enumerate((Credit, Payment)):
+        query = select(model.customer_id, func.sum(model.amount)).where(
+            model.user_id == user_id, model.date <= period_end
+        ).group_by(model.customer_id)
+        if previous is not None:
+            query = query.where(model.date > previous)
+        for customer_id, amount in (await db.execute(query)).all():
+            totals[customer_id][position] += amount
+
+    if totals:
+        await db.execute(insert(LedgerCheckpoint), [{
+            "customer_id": customer_id,
+            "period_end": period_end,
+            "user_id": user_id,
+            "total_credits": total_credits,
+            "total_payments": total_payments,
+            "balance": total_credits - total_payments
+        } for customer_id, (total_credits, total_payments) in totals.items()])
+
+    period = ClosedPeriod(user_id=user_id, period_end=period_end, customers=len(totals))
+    db.add(period)
+    # Ledgers now open at the checkpoint: new ETags for every customer in it
+    await stamp_customers(db, totals.keys(), version)
+    await db.commit()
+
+    return {"period_end": period_end, "customers": len(totals), "closed_at": period.closed_at, "archived_at": None}
+
+
+async def archive_period(db: AsyncSession, user_id: int, through: date) -> dict:
+    """Move the shop's credits and payments dated on or before `through` to the archive tables.
+
+    `through` must be the end of a closed period. The rows keep their ids,
+    so archived statements read the same entries; balances and monthly
+    totals don't change. Raises ValueError if `through` isn't closed.
+    """
+    await bump_version(db, user_id)
+    period = await db.get(ClosedPeriod, (user_id, through))
+    if period is None:
+        raise ValueError(f"No closed period ends on {through}")
+
+    moved = {}
+    for live, archive in ((Credit, CreditArchive), (Payment, PaymentArchive)):
+        columns = [column.name for column in archive.__table__.columns]
+        await db.execute(insert(archive).from_select(columns, select(
+            *(live.__table__.c[name] for name in columns)
+        ).where(live.user_id == user_id, live.date <= through)))
+        result = await db.execute(delete(live).where(live.user_id == user_id, live.date <= through))
+        moved[live.__tablename__] = result.rowcount
+
+    archived_at = datetime.utcnow()
+    await db.execute(update(ClosedPeriod).where(
+        ClosedPeriod.user_id == user_id,
+        ClosedPeriod.period_end <= through,
+        ClosedPeriod.archived_at.is_(None)
+    ).values(archived_at=archived_at))
+    await db.commit()
+
+    return {"period_end": through, "credits": moved["credits"], "payments": moved["payments"], "archived_at": archived_at}
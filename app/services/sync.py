@@ -0,0 +1,145 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, literal, select, union_all
+from typing import Optional
+from core.etag import shop_version
+from models.models import Customer, Credit, Payment, CreditArchive, PaymentArchive, Tombstone
+from services.periods import credit_tables, payment_tables
+
+# entity name -> (model, primary key column)
+ENTITIES = {
+    "customer": (Customer, Customer.customer_id),
+    "credit": (Credit, Credit.credit_id),
+    "payment": (Payment, Payment.payment_id),
+}
+ARCHIVED_ENTITIES = {
+    "credit": (CreditArchive, CreditArchive.credit_id),
+    "payment": (PaymentArchive, PaymentArchive.payment_id),
+}
+
+
+async def find_by_client_id(db: AsyncSession, entity: str, user_id: int, client_id: str) -> Optional[int]:
+    model, id_column = ENTITIES[entity]
+    return await db.scalar(select(id_column).where(model.user_id == user_id, model.client_id == client_id))
+
+
+async def find_tombstone(db: AsyncSession, entity: str, user_id: int, entity_id: int = None,
+                         client_id: str = None) -> Optional[int]:
+    query = select(Tombstone.entity_id).where(Tombstone.user_id == user_id, Tombstone.entity == entity)
+    if entity_id is not None:
+        query = query.where(Tombstone.entity_id == entity_id)
+    else:
+        query = query.where(Tombstone.client_id == client_id)
+    return await db.scalar(query.limit(1))
+
+
+async def record_deletions(db: AsyncSession, entity: str, version: int, *criteria, archived: bool = False):
+    """Write tombstones for the rows matching `criteria`; run before deleting them.
+
+    With `archived`, the rows are read from the entity's archive table.
+    """
+    model, id_column = (ARCHIVED_ENTITIES if archived else ENTITIES)[entity]
+    await db.execute(insert(Tombstone).from_select(
+        ["user_id", "entity", "entity_id", "client_id", "version"],
+        select(model.user_id, literal(entity), id_column, model.client_id, literal(version)).where(*criteria)
+    ))
+
+
+def _customer(row) -> dict:
+    return {
+        "customer_id": row.customer_id,
+        "client_id": row.client_id,
+        "name": row.name,
+        "phone": row.phone,
+        "email": row.email,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "version": row.version
+    }
+
+
+def _credit(row) -> dict:
+    return {
+        "credit_id": row.credit_id,
+        "client_id": row.client_id,
+        "customer_id": row.customer_id,
+        "amount": row.amount,
+        "description": row.description,
+        "date": row.date,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "version": row.version
+    }
+
+
+def _payment(row) -> dict:
+    return {
+        "payment_id": row.payment_id,
+        "client_id": row.client_id,
+        "customer_id": row.customer_id,
+        "amount": row.amount,
+        "payment_method": row.payment_method,
+        "date": row.date,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "version": row.version
+    }
+
+
+def _deletion(row) -> dict:
+    return {
+        "entity": row.entity,
+        "id": row.entity_id,
+        "client_id": row.client_id,
+        "version": row.version,
+        "deleted_at": row.deleted_at
+    }
+
+
+# response key -> (tables, primary key column name, serializer). Archived
+# credits and payments keep their versions, so a new device still gets
+# the whole history.
+FEEDS = {
+    "customers": ((Customer.__table__,), "customer_id", _customer),
+    "credits": (credit_tables(archived=True), "credit_id", _credit),
+    "payments": (payment_tables(archived=True), "payment_id", _payment),
+    "deleted": ((Tombstone.__table__,), "tombstone_id", _deletion),
+}
+
+
+def _feed(tables, user_id: int, since: int, until: int):
+    """The feed's rows with versions in (since, until], from all its tables."""
+    names = [column.name for column in tables[-1].columns]
+    return union_all(*(select(*(table.c[name] for name in names)).where(
+        table.c.user_id == user_id, table.c.version > since, table.c.version <= until
+    ) for table in tables)).subquery()
+
+
+async def changes_since(db: AsyncSession, user_id: int, since: int, limit: int) -> dict:
+    """Rows changed after version `since`, in whole versions.
+
+    Every feed is scanned on its (user_id, version) indexes. A page ends
+    before the first version that would push any feed past `limit` rows;
+    a single version larger than that (a bulk batch) is still returned
+    whole, so the cursor always moves forward.
+    """
+    current = await shop_version(db, user_id)
+    until = current
+
+    for tables, id_name, _ in FEEDS.values():
+        feed = _feed(tables, user_id, since, until)
+        # With the id selected too, each table is read in index order and merged
+        overflow = await db.scalar(select(feed.c.version, feed.c[id_name]).order_by(
+            feed.c.version, feed.c[id_name]
+        ).offset(limit).limit(1))
+        if overflow is not None:
+            until = overflow - 1 if overflow - 1 > since else overflow
+
+    changes = {}
+    for key, (tables, id_name, serialize) in FEEDS.items():
+        feed = _feed(tables, user_id, since, until)
+        rows = (await db.execute(select(feed).order_by(feed.c.version, feed.c[id_name]))).all()
+        changes[key] = [serialize(row) for row in rows]
+
+    changes["cursor"] = str(max(until, since))
+    changes["has_more"] = until < current
+    return changes
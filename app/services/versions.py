@@ -0,0 +1,44 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
+from typing import Iterable
+from core.etag import shop_version
+from core.replicas import note_write
+from models.models import CustomerBalance, ShopVersion
+
+
+async def bump_version(db: AsyncSession, user_id: int, customer_ids: Iterable[int] = ()) -> int:
+    """Advance the shop's change version inside the caller's transaction.
+
+    Customers whose ledger changed get the new shop version too, so their
+    versions only ever move forward even if a balance row is recreated.
+    The row lock taken here serialises a shop's writers, so versions commit
+    in order and can serve as the /api/sync cursor. Once the caller commits,
+    the shop's reads skip replicas that haven't reached the new version, so
+    they can't hide the write from it. Returns the new version.
+    """
+    result = await db.execute(
+        update(ShopVersion).where(ShopVersion.user_id == user_id).values(
+            version=ShopVersion.version + 1
+        ).execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        db.add(ShopVersion(user_id=user_id, version=1))
+        await db.flush()
+
+    version = await shop_version(db, user_id)
+    await stamp_customers(db, customer_ids, version)
+    note_write(db, user_id, version)
+    return version
+
+
+async def stamp_customers(db: AsyncSession, customer_ids: Iterable[int], version: int):
+    """Mark customers' ledgers as changed at `version` (from bump_version)."""
+    customer_ids = list(customer_ids)
+    if customer_ids:
+        await db.execute(
+            update(CustomerBalance).where(CustomerBalance.customer_id.in_(customer_ids)).values(
+                version=version,
+                # Not activity in itself; keep last_activity for search
+                updated_at=CustomerBalance.updated_at
+            ).execution_options(synchronize_session=False)
+        )
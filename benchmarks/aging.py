@@ -0,0 +1,161 @@
+"""Receivables aging report: time and peak memory as the ledger grows.
+
+Seeds one shop with a fixed number of customers and a growing number of
+credits and payments (a fresh temporary SQLite database per size), then
+requests /api/dashboard/aging in-process. Time per entry should stay flat
+(one pass over the entries) and peak Python memory should not grow with
+the number of entries, only with the number of customers:
+
+    python benchmarks/aging.py --sizes 100000,200000,400000 --customers 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+SEED_START = date(2024, 1, 1)
+SEED_DAYS = 730
+AS_OF = SEED_START + timedelta(days=SEED_DAYS)
+INSERT_CHUNK = 50000
+
+
+def seed(size, customers):
+    from sqlalchemy import insert
+    from core.database import engine
+    from migrations import upgrade
+    from models.models import User, Customer, Credit, Payment
+
+    upgrade(engine)
+    rng = random.Random(size)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "user_id": 1, "shop_name": "Bench Shop", "owner_name": "Bench",
+            "email": "bench@example.com", "phone": "0", "password": "bench"
+        }])
+        conn.execute(insert(Customer), [
+            {"customer_id": c, "user_id": 1, "name": f"Customer {c}", "phone": str(9000000000 + c)}
+            for c in range(1, customers + 1)
+        ])
+
+        credits, payments = [], []
+        for n in range(size):
+            customer_id = n % customers + 1
+            on = SEED_START + timedelta(days=rng.randrange(SEED_DAYS))
+            # Roughly one payment for every two credits
+            if rng.random() < 1 / 3:
+                payments.append({"user_id": 1, "customer_id": customer_id, "amount": rng.randint(50, 600),
+                                 "payment_method": "cash", "date": on})
+            else:
+                credits.append({"user_id": 1, "customer_id": customer_id, "amount": rng.randint(10, 500),
+                                "description": f"Item {n}", "date": on})
+            if len(credits) >= INSERT_CHUNK:
+                conn.execute(insert(Credit), credits)
+                credits = []
+            if len(payments) >= INSERT_CHUNK:
+                conn.execute(insert(Payment), payments)
+                payments = []
+        if credits:
+            conn.execute(insert(Credit), credits)
+        if payments:
+            conn.execute(insert(Payment), payments)
+    engine.dispose()
+
+
+async def measure(repeat):
+    import httpx
+    from main import app
+    from core.database import dispose_engines
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        login = await client.post("/api/auth/login", json={"email": "bench@example.com", "password": "bench"})
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        async def report():
+            response = await client.get("/api/dashboard/aging", params={"as_of": AS_OF.isoformat()})
+            response.raise_for_status()
+            return response.json()
+
+        # Warm up once (connections, compiled statements), then time
+        body = await report()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await report()
+            samples.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        await report()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    await dispose_engines()
+    return {
+        "seconds": round(statistics.median(samples), 4),
+        "peak_mib": round(peak / 2 ** 20, 2),
+        "customers_owing": len(body["customers"]),
+        "outstanding": body["totals"]["outstanding"],
+    }
+
+
+def child(args):
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    if args.child == "seed":
+        seed(args.size, args.customers)
+    else:
+        print(json.dumps(asyncio.run(measure(args.repeat))))
+
+
+def run_child(mode, size, env, args):
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--size", str(size),
+               "--customers", str(args.customers), "--repeat", str(args.repeat)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        sys.stderr.write(output.stderr)
+        raise SystemExit(f"{mode} failed for size {size}")
+    return output.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100000,200000,400000", help="Comma-separated entry counts")
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--child", choices=["seed", "measure"], help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    results = {}
+    print(f"{'entries':>9} {'seconds':>9} {'us/entry':>9} {'peak MiB':>9} {'owing':>7}")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory(prefix="shopkhata-aging-") as workdir:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/bench.db", CACHE_BACKEND="none")
+            run_child("seed", size, env, args)
+            result = json.loads(run_child("measure", size, env, args).strip().splitlines()[-1])
+        results[size] = result
+        print(f"{size:>9} {result['seconds']:>9} {result['seconds'] / size * 1e6:>9.2f} "
+              f"{result['peak_mib']:>9} {result['customers_owing']:>7}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Requests/second of the API in sync (threadpool) and async engine modes.
+
+Seeds a local SQLite file, starts uvicorn once per DB_ASYNC setting and
+drives a mix of read endpoints with concurrent clients:
+
+    python benchmarks/async_vs_sync.py --duration 10 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+
+def seed(path, customers, credits_per_customer):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    sys.path.insert(0, APP_DIR)
+    from sqlalchemy import insert
+    from core.database import engine
+    from migrations import upgrade
+    from models.models import User, Customer, Credit, Payment, CustomerBalance
+
+    upgrade(engine)
+    rng = random.Random(7)
+    start = date(2025, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "user_id": 1, "shop_name": "Bench Shop", "owner_name": "Bench",
+            "email": "bench@example.com", "phone": "0", "password": "bench"
+        }])
+        conn.execute(insert(Customer), [
+            {"customer_id": c, "user_id": 1, "name": f"Customer {c}", "phone": str(9000000000 + c)}
+            for c in range(1, customers + 1)
+        ])
+        credit_rows, payment_rows, balance_rows = [], [], []
+        for c in range(1, customers + 1):
+            total = 0
+            for _ in range(credits_per_customer):
+                amount = rng.randint(10, 500)
+                total += amount
+                credit_rows.append({
+                    "user_id": 1, "customer_id": c, "amount": amount,
+                    "date": start + timedelta(days=rng.randint(0, 600))
+                })
+            paid = total // 2
+            payment_rows.append({
+                "user_id": 1, "customer_id": c, "amount": paid,
+                "payment_method": "cash", "date": start + timedelta(days=rng.randint(0, 600))
+            })
+            balance_rows.append({
+                "customer_id": c, "user_id": 1, "total_credits": total,
+                "total_payments": paid, "outstanding": total - paid
+            })
+        conn.execute(insert(Credit), credit_rows)
+        conn.execute(insert(Payment), payment_rows)
+        conn.execute(insert(CustomerBalance), balance_rows)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def drive(base_url, duration, concurrency, customers):
+    paths = [
+        "/api/credits",
+        "/api/payments",
+        "/api/dashboard/stats",
+        "/api/dashboard/charts",
+    ]
+    done = errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        nonlocal done, errors
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths + [f"/api/ledger/{rng.randint(1, customers)}"])
+            response = await client.get(path)
+            if response.status_code == 200:
+                done += 1
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        login = await client.post("/api/auth/login", json={"email": "bench@example.com", "password": "bench"})
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {"requests": done, "errors": errors, "seconds": round(elapsed, 2), "rps": round(done / elapsed, 1)}
+
+
+def run_mode(db_path, db_async, args):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DB_ASYNC="true" if db_async else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base_url}/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        return asyncio.run(drive(base_url, args.duration, args.concurrency, args.customers))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--credits-per-customer", type=int, default=50)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="shopkhata-bench-")
+    try:
+        seeded = os.path.join(workdir, "seed.db")
+        seed(seeded, args.customers, args.credits_per_customer)
+
+        results = {}
+        for mode, db_async in (("sync", False), ("async", True)):
+            db_path = os.path.join(workdir, f"{mode}.db")
+            shutil.copy(seeded, db_path)
+            results[mode] = run_mode(db_path, db_async, args)
+            print(f"{mode:>5}: {results[mode]['rps']:>8} req/s  ({results[mode]['requests']} ok, {results[mode]['errors']} errors)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Per-request cost of resolving who is calling, before and after tokens.
+
+Compares, against a temporary SQLite database:
+
+  query_param    the old scheme: trust ?user_id= and re-check ownership
+                 of the customer with a query in the handler
+  token_no_cache verify the signed token, then load the user every time
+  token_cached   verify the signed token, user served from the LRU
+                 (what get_principal does once warm)
+
+    python benchmarks/auth_overhead.py --iterations 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure(iterations):
+    from fastapi.security import HTTPAuthorizationCredentials
+    from sqlalchemy import insert, select
+    from core import auth
+    from core.database import engine, session_scope, dispose_engines
+    from core.security import create_access_token, decode_access_token
+    from migrations import upgrade
+    from models.models import User, Customer
+
+    upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "user_id": 1, "shop_name": "Bench Shop", "owner_name": "Bench",
+            "email": "bench@example.com", "phone": "0", "password": "bench"
+        }])
+        conn.execute(insert(Customer), [{"customer_id": 1, "user_id": 1, "name": "Customer", "phone": "0"}])
+
+    token, _ = create_access_token(1)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def query_param(db):
+        customer = await db.scalar(select(Customer).where(Customer.customer_id == 1, Customer.user_id == 1))
+        assert customer is not None
+
+    async def token_no_cache(db):
+        claims = decode_access_token(token)
+        shop_name = await db.scalar(select(User.shop_name).where(User.user_id == claims["sub"]))
+        assert shop_name is not None
+
+    async def token_cached(db):
+        principal = await auth.get_principal(credentials, db)
+        assert principal.user_id == 1
+
+    results = {}
+    async with session_scope() as db:
+        for name, resolve in (("query_param", query_param), ("token_no_cache", token_no_cache),
+                              ("token_cached", token_cached)):
+            for _ in range(min(100, iterations)):
+                await resolve(db)
+            samples = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                await resolve(db)
+                samples.append(time.perf_counter() - started)
+            results[name] = {
+                "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+                "p50_us": round(statistics.median(samples) * 1e6, 1),
+                "p99_us": round(percentile(samples, 99) * 1e6, 1),
+            }
+
+    await dispose_engines()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="shopkhata-auth-") as workdir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        sys.path.insert(0, APP_DIR)
+        results = asyncio.run(measure(args.iterations))
+
+    for name, result in results.items():
+        print(f"{name:<16} mean {result['mean_us']:>8} us  p50 {result['p50_us']:>8} us  p99 {result['p99_us']:>8} us")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Cold start: app import time, time to first request and drain time.
+
+Import time is measured in fresh interpreters importing main. Time to
+first request starts serve.py with one worker against an already
+migrated temporary SQLite database and polls /health until it answers;
+the server is then stopped with SIGTERM and timed until it exits.
+Medians over --runs; compare against a saved result to catch regressions:
+
+    python benchmarks/cold_start.py --runs 5 --output cold.json
+    python benchmarks/cold_start.py --baseline cold.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str, timeout: float = 1.0):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.status, response.read()
+
+
+def import_seconds(env) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def serve_once(env, timeout: float) -> dict:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", "1", "--host", "127.0.0.1", "--port", str(port),
+         "--no-migrate", "--log-level", "warning"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise SystemExit(f"serve.py exited early:\n{server.stderr.read().decode()}")
+            if time.perf_counter() - started > timeout:
+                raise SystemExit("serve.py did not answer in time")
+            try:
+                if get(f"http://127.0.0.1:{port}/health")[0] == 200:
+                    break
+            except OSError:
+                time.sleep(0.01)
+        first_request = time.perf_counter() - started
+        reported = json.loads(get(f"http://127.0.0.1:{port}/metrics")[1])["startup"]
+
+        stopping = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=timeout)
+        return {
+            "first_request_seconds": first_request,
+            "shutdown_seconds": time.perf_counter() - stopping,
+            "worker_startup_seconds": reported["startup_seconds"],
+        }
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+
+
+def measure(runs: int, timeout: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix="shopkhata-cold-") as workdir:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+        subprocess.run([sys.executable, "manage.py", "migrate"], cwd=APP_DIR, env=env,
+                       capture_output=True, check=True)
+
+        imports = [import_seconds(env) for _ in range(runs)]
+        serves = [serve_once(env, timeout) for _ in range(runs)]
+
+    def median(samples):
+        return round(statistics.median(samples), 4)
+
+    return {
+        "import_seconds": median(imports),
+        "first_request_seconds": median([run["first_request_seconds"] for run in serves]),
+        "worker_startup_seconds": median([run["worker_startup_seconds"] for run in serves]),
+        "shutdown_seconds": median([run["shutdown_seconds"] for run in serves]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the server to start or stop")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    results = measure(args.runs, args.timeout)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+
+    regressions = 0
+    for name, value in results.items():
+        line = f"{name:<24} {value:>9.4f} s"
+        if baseline and baseline.get(name):
+            change = (value - baseline[name]) / baseline[name]
+            slower = change > args.threshold
+            regressions += slower
+            line += f"   was {baseline[name]:.4f} s ({change:+.0%}){'  SLOWER' if slower else ''}"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Login throughput at each password-hash cost setting.
+
+Each setting runs in a fresh process (hash parameters are read at import)
+against a temporary SQLite database. Logins are driven in-process through
+the ASGI app while a second client polls /health to show whether hashing
+starves other routes:
+
+    python benchmarks/login_throughput.py --duration 5 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+SETTINGS = [
+    {"PASSWORD_HASH_SCHEME": "scrypt", "SCRYPT_N": "4096"},
+    {"PASSWORD_HASH_SCHEME": "scrypt", "SCRYPT_N": "16384"},
+    {"PASSWORD_HASH_SCHEME": "scrypt", "SCRYPT_N": "65536"},
+    {"PASSWORD_HASH_SCHEME": "pbkdf2_sha256", "PBKDF2_ITERATIONS": "100000"},
+    {"PASSWORD_HASH_SCHEME": "pbkdf2_sha256", "PBKDF2_ITERATIONS": "600000"},
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure(duration, concurrency):
+    import httpx
+    from main import app
+    from core.database import dispose_engines, engine
+    from migrations import upgrade
+
+    upgrade(engine)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/api/auth/register", json={
+            "shop_name": "Bench", "owner_name": "Bench", "email": "bench@example.com",
+            "phone": "0", "password": "correct horse"
+        })
+        logins, login_latency, health_latency = 0, [], []
+        deadline = time.perf_counter() + duration
+
+        async def login_worker():
+            nonlocal logins
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post("/api/auth/login", json={
+                    "email": "bench@example.com", "password": "correct horse"
+                })
+                login_latency.append(time.perf_counter() - started)
+                if response.status_code == 200:
+                    logins += 1
+
+        async def health_probe():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/health")
+                health_latency.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        await asyncio.gather(health_probe(), *(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    await dispose_engines()
+    return {
+        "logins_per_second": round(logins / elapsed, 1),
+        "login_p50_ms": round(statistics.median(login_latency) * 1000, 1),
+        "login_p95_ms": round(percentile(login_latency, 95) * 1000, 1),
+        "health_p95_ms": round(percentile(health_latency, 95) * 1000, 2),
+    }
+
+
+def child(args):
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    print(json.dumps(asyncio.run(measure(args.duration, args.concurrency))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    results = []
+    for setting in SETTINGS:
+        with tempfile.TemporaryDirectory(prefix="shopkhata-login-") as workdir:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/bench.db", **setting)
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", "--duration", str(args.duration),
+                 "--concurrency", str(args.concurrency)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+        result = {"setting": setting, **json.loads(output)}
+        results.append(result)
+        label = ", ".join(f"{key}={value}" for key, value in setting.items())
+        print(f"{label:<60} {result['logins_per_second']:>8} logins/s  "
+              f"p95 {result['login_p95_ms']:>7} ms  /health p95 {result['health_p95_ms']:>6} ms")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
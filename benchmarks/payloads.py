@@ -0,0 +1,76 @@
+"""Payload size and encode time for credit list pages, by format and encoding.
+
+Encodes the same page as objects (the default) and as columns
+(format=columns), then compresses each body the way CompressionMiddleware
+does. Sizes are bytes on the wire; times are medians per page:
+
+    python benchmarks/payloads.py --rows 50 500 --repeat 50
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from serialization import APP_DIR, credit_rows
+
+
+def timed(fn, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, round(statistics.median(samples) * 1000, 3)
+
+
+def measure(rows, repeat):
+    from core.compression import ENCODERS
+    from core.responses import dumps, columnar_page
+    from routers.credits import CREDITS_COLUMNS
+
+    items = credit_rows(rows)
+    pages = {
+        "objects": lambda: {"items": items, "next_cursor": None},
+        "columns": lambda: columnar_page(items, CREDITS_COLUMNS, None),
+    }
+
+    results = {}
+    for name, build in pages.items():
+        body, encode_ms = timed(lambda: dumps(build()), repeat)
+        result = {"identity": {"bytes": len(body), "encode_ms": encode_ms}}
+        for encoding, encoder_class in ENCODERS.items():
+            def compress():
+                encoder = encoder_class()
+                return encoder.compress(body) + encoder.finish()
+            compressed, compress_ms = timed(compress, repeat)
+            result[encoding] = {"bytes": len(compressed), "encode_ms": round(encode_ms + compress_ms, 3)}
+        results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    results = {}
+    for rows in args.rows:
+        results[rows] = measure(rows, args.repeat)
+        baseline = results[rows]["objects"]["identity"]["bytes"]
+        print(f"{rows} rows")
+        for name, result in results[rows].items():
+            for encoding, sample in result.items():
+                print(f"  {name:<8} {encoding:<9} {sample['bytes']:>9} B  {sample['bytes'] / baseline:>6.1%}  "
+                      f"{sample['encode_ms']:>8} ms")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Concurrent payments against shared customers: correctness and throughput.
+
+Each level spreads the same number of concurrent payments over fewer
+"hot" customers, so more of them race for the same balance. Every
+customer is credited enough to cover only half of the payments aimed at
+it; afterwards the run checks that no balance went negative, that exactly
+the affordable payments were accepted and that the balance rows still
+match the raw credits and payments. Any violation exits non-zero:
+
+    python benchmarks/payment_contention.py --hot 64,16,4,1 --payments 400 --concurrency 32
+
+Levels run in fresh processes against a temporary SQLite database, or
+against --database-url (a scratch Postgres-compatible database; each level
+registers its own shop there).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+PAYMENT = Decimal("10.00")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def check_invariants(user_id, credited):
+    """Violations of the balance invariants for the shop, as messages."""
+    from sqlalchemy import func, select
+    from core.database import engine
+    from models.models import Credit, Payment, CustomerBalance
+
+    violations = []
+    with engine.connect() as conn:
+        credits = dict(conn.execute(select(Credit.customer_id, func.sum(Credit.amount)).where(
+            Credit.user_id == user_id
+        ).group_by(Credit.customer_id)).all())
+        payments = {row.customer_id: row for row in conn.execute(select(
+            Payment.customer_id, func.sum(Payment.amount).label("total"), func.count().label("count")
+        ).where(Payment.user_id == user_id).group_by(Payment.customer_id))}
+        balances = {row.customer_id: row for row in conn.execute(select(CustomerBalance).where(
+            CustomerBalance.user_id == user_id
+        ))}
+
+    for customer_id, amount in credited.items():
+        paid = payments.get(customer_id)
+        total_paid = paid.total if paid else Decimal(0)
+        accepted = paid.count if paid else 0
+        expected = int(amount // PAYMENT)
+        balance = balances.get(customer_id)
+        if total_paid > credits.get(customer_id, 0):
+            violations.append(f"customer {customer_id}: paid {total_paid} against {credits.get(customer_id)} credited")
+        if accepted != expected:
+            violations.append(f"customer {customer_id}: {accepted} payments accepted, {expected} affordable")
+        if balance is None or (balance.total_credits, balance.total_payments, balance.outstanding) != (
+            amount, total_paid, amount - total_paid
+        ):
+            violations.append(f"customer {customer_id}: balance row out of step with the ledger")
+    return violations
+
+
+async def measure(hot, payments, concurrency):
+    import httpx
+    from main import app
+    from core.database import dispose_engines, engine, write_retries
+    from migrations import upgrade
+
+    upgrade(engine)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        email = f"contention-{uuid.uuid4().hex[:12]}@example.com"
+        await client.post("/api/auth/register", json={
+            "shop_name": "Bench", "owner_name": "Bench", "email": email, "phone": "0", "password": "bench"
+        })
+        login = (await client.post("/api/auth/login", json={"email": email, "password": "bench"})).json()
+        client.headers["Authorization"] = f"Bearer {login['access_token']}"
+        user_id = login["user_id"]
+
+        customer_ids = (await client.post("/api/bulk/customers", json=[
+            {"name": f"Hot {n}", "phone": str(n)} for n in range(hot)
+        ])).json()["ids"]
+        # Each customer can afford half of the payments aimed at it
+        per_customer = payments // hot
+        credited = {customer_id: PAYMENT * max(1, per_customer // 2) for customer_id in customer_ids}
+        await client.post("/api/bulk/credits", json=[
+            {"customer_id": customer_id, "amount": str(amount), "date": "2025-06-01"}
+            for customer_id, amount in credited.items()
+        ])
+
+        queue = [customer_ids[n % hot] for n in range(per_customer * hot)]
+        latencies, statuses = [], {}
+        retries_before = write_retries.value
+
+        async def worker():
+            while queue:
+                customer_id = queue.pop()
+                started = time.perf_counter()
+                response = await client.post("/api/payments", json={
+                    "customer_id": customer_id, "amount": str(PAYMENT), "payment_method": "cash", "date": "2025-06-02"
+                })
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    violations = check_invariants(user_id, credited)
+    # Only accepted (200) and refused (400) are valid outcomes
+    violations += [f"{count} payment(s) answered {status}" for status, count in statuses.items() if status not in (200, 400)]
+    await dispose_engines()
+    return {
+        "hot_customers": hot,
+        "payments": len(latencies),
+        "accepted": statuses.get(200, 0),
+        "rejected": statuses.get(400, 0),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "retries": write_retries.value - retries_before,
+        "violations": violations,
+    }
+
+
+def child(args):
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    print(json.dumps(asyncio.run(measure(args.level, args.payments, args.concurrency))))
+
+
+def run_level(hot, args, env):
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--level", str(hot),
+               "--payments", str(args.payments), "--concurrency", str(args.concurrency)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        sys.stderr.write(output.stderr)
+        raise SystemExit(f"level with {hot} hot customer(s) failed")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hot", default="64,16,4,1", help="Comma-separated hot customer counts, one level each")
+    parser.add_argument("--payments", type=int, default=400, help="Payments per level")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--database-url", help="Scratch Postgres-compatible database")
+    parser.add_argument("--db-async", choices=["true", "false"], help="Override DB_ASYNC")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    env = dict(os.environ, CACHE_BACKEND="none")
+    if args.db_async is not None:
+        env["DB_ASYNC"] = args.db_async
+
+    results = []
+    print(f"{'hot customers':>13} {'accepted':>9} {'rejected':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'retries':>8}  invariant")
+    for hot in [int(level) for level in args.hot.split(",")]:
+        if args.database_url:
+            result = run_level(hot, args, dict(env, DATABASE_URL=args.database_url))
+        else:
+            with tempfile.TemporaryDirectory(prefix="shopkhata-contention-") as workdir:
+                result = run_level(hot, args, dict(env, DATABASE_URL=f"sqlite:///{workdir}/bench.db"))
+        results.append(result)
+        print(f"{hot:>13} {result['accepted']:>9} {result['rejected']:>9} {result['rps']:>9} "
+              f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['retries']:>8}  "
+              f"{'ok' if not result['violations'] else 'VIOLATED'}")
+        for violation in result["violations"][:10]:
+            print(f"    {violation}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if any(result["violations"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Period closing: ledger and balance-seeding time before and after closing the books.
+
+Seeds one shop with a customer whose history spans several years (a fresh
+temporary SQLite database per size), then times GET /api/ledger/{id} and
+the balance seed a payment falls back to (services.balances._raw_totals)
+in-process. Every year but the current one is then closed and archived
+and the same requests are timed again; their cost should now follow the
+open year's rows only, not the whole history:
+
+    python benchmarks/period_close.py --sizes 50000,100000,200000 --years 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+INSERT_CHUNK = 50000
+CUSTOMER_ID = 1
+
+
+def seed(size, years):
+    from sqlalchemy import insert
+    from core.database import engine
+    from migrations import upgrade
+    from models.models import User, Customer, Credit, Payment
+
+    upgrade(engine)
+    rng = random.Random(size)
+    start = date(date.today().year - years + 1, 1, 1)
+    days = (date.today() - start).days
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "user_id": 1, "shop_name": "Bench Shop", "owner_name": "Bench",
+            "email": "bench@example.com", "phone": "0", "password": "bench"
+        }])
+        conn.execute(insert(Customer), [{"customer_id": CUSTOMER_ID, "user_id": 1, "name": "Customer", "phone": "1"}])
+
+        credits, payments = [], []
+        for n in range(size):
+            on = start + timedelta(days=rng.randrange(days))
+            # Payments are smaller than credits, so the balance never goes negative
+            if n % 3 == 2:
+                payments.append({"user_id": 1, "customer_id": CUSTOMER_ID, "amount": rng.randint(1, 10),
+                                 "payment_method": "cash", "date": on})
+            else:
+                credits.append({"user_id": 1, "customer_id": CUSTOMER_ID, "amount": rng.randint(10, 500),
+                                "description": f"Item {n}", "date": on})
+            if len(credits) >= INSERT_CHUNK:
+                conn.execute(insert(Credit), credits)
+                credits = []
+            if len(payments) >= INSERT_CHUNK:
+                conn.execute(insert(Payment), payments)
+                payments = []
+        if credits:
+            conn.execute(insert(Credit), credits)
+        if payments:
+            conn.execute(insert(Payment), payments)
+    engine.dispose()
+
+
+async def measure(repeat, years):
+    import httpx
+    from main import app
+    from core.database import dispose_engines, session_scope
+    from services.balances import _raw_totals
+    from services.periods import archive_period, close_period
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        login = await client.post("/api/auth/login", json={"email": "bench@example.com", "password": "bench"})
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        async def ledger():
+            response = await client.get(f"/api/ledger/{CUSTOMER_ID}")
+            response.raise_for_status()
+            return response.json()
+
+        async def seed_totals():
+            async with session_scope() as db:
+                return await _raw_totals(db, CUSTOMER_ID)
+
+        async def timed(operation):
+            result = await operation()
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await operation()
+                samples.append(time.perf_counter() - started)
+            return result, round(statistics.median(samples), 4)
+
+        full, ledger_before = await timed(ledger)
+        totals, totals_before = await timed(seed_totals)
+
+        started = time.perf_counter()
+        async with session_scope() as db:
+            for year in range(date.today().year - years + 1, date.today().year):
+                await close_period(db, 1, date(year, 12, 31))
+            await archive_period(db, 1, date(date.today().year - 1, 12, 31))
+        close_seconds = time.perf_counter() - started
+
+        current, ledger_after = await timed(ledger)
+        closed_totals, totals_after = await timed(seed_totals)
+
+    await dispose_engines()
+    if (current["outstanding_balance"], closed_totals) != (full["outstanding_balance"], totals):
+        raise SystemExit("Balances differ after closing the books")
+    return {
+        "ledger_seconds": ledger_before,
+        "ledger_seconds_closed": ledger_after,
+        "seed_seconds": totals_before,
+        "seed_seconds_closed": totals_after,
+        "close_and_archive_seconds": round(close_seconds, 4),
+        "open_entries": len(current["transactions"]),
+    }
+
+
+def child(args):
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    if args.child == "seed":
+        seed(args.size, args.years)
+    else:
+        print(json.dumps(asyncio.run(measure(args.repeat, args.years))))
+
+
+def run_child(mode, size, env, args):
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--size", str(size),
+               "--years", str(args.years), "--repeat", str(args.repeat)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        sys.stderr.write(output.stderr)
+        raise SystemExit(f"{mode} failed for size {size}")
+    return output.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="50000,100000,200000", help="Comma-separated entry counts")
+    parser.add_argument("--years", type=int, default=5, help="Years of history; all but the current one are closed")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--child", choices=["seed", "measure"], help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    results = {}
+    print(f"{'entries':>9} {'open':>7} {'ledger s':>9} {'closed':>9} {'seed s':>9} {'closed':>9} {'close s':>9}")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory(prefix="shopkhata-close-") as workdir:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/bench.db", CACHE_BACKEND="none")
+            run_child("seed", size, env, args)
+            result = json.loads(run_child("measure", size, env, args).strip().splitlines()[-1])
+        results[size] = result
+        print(f"{size:>9} {result['open_entries']:>7} {result['ledger_seconds']:>9} {result['ledger_seconds_closed']:>9} "
+              f"{result['seed_seconds']:>9} {result['seed_seconds_closed']:>9} {result['close_and_archive_seconds']:>9}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Response serialization cost for a 10k-row credit listing and ledger.
+
+Compares FastAPI's default path (validate the handler's dicts against the
+response_model, encode, json.dumps) with returning a FastJSONResponse,
+which encodes the trusted dicts directly:
+
+    python benchmarks/serialization.py --rows 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+
+def credit_rows(rows):
+    start = date(2025, 1, 1)
+    return [{
+        "credit_id": n,
+        "user_id": 1,
+        "customer_id": n % 200 + 1,
+        "customer_name": f"Customer {n % 200 + 1}",
+        "amount": Decimal(f"{n % 500}.50"),
+        "description": None if n % 3 else f"Item {n}",
+        "date": start + timedelta(days=n % 365),
+        "created_at": datetime(2025, 1, 1, 9, 30) + timedelta(minutes=n)
+    } for n in range(rows)]
+
+
+def ledger(rows):
+    start = date(2025, 1, 1)
+    balance = Decimal(0)
+    transactions = []
+    for n in range(rows):
+        debit, credit = (Decimal("25.00"), Decimal(0)) if n % 4 else (Decimal(0), Decimal("10.00"))
+        balance += debit - credit
+        transactions.append({
+            "date": start + timedelta(days=n // 30),
+            "description": "Credit entry" if n % 4 else "Payment (cash)",
+            "debit": debit,
+            "credit": credit,
+            "balance": balance
+        })
+    return {"customer_name": "Customer 1", "transactions": transactions, "outstanding_balance": balance}
+
+
+async def timed(render, repeat):
+    samples, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(await render())
+        samples.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(samples) * 1000, 2), "min_ms": round(min(samples) * 1000, 2), "bytes": size}
+
+
+async def measure(rows, repeat):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from core.responses import FastJSONResponse, orjson
+    from schemas.credit import CreditPage
+    from schemas.ledger import LedgerResponse
+
+    cases = {
+        "credits": (CreditPage, {"items": credit_rows(rows), "next_cursor": None}),
+        "ledger": (LedgerResponse, ledger(rows)),
+    }
+    results = {"encoder": "orjson" if orjson is not None else "json"}
+
+    for name, (model, content) in cases.items():
+        field = create_response_field(name=f"Response_{name}", type_=model)
+
+        async def validated():
+            # What FastAPI does for a handler that returns plain content
+            value = await serialize_response(field=field, response_content=content, is_coroutine=True)
+            return JSONResponse(value).body
+
+        async def fast():
+            return FastJSONResponse(content).body
+
+        results[name] = {
+            "response_model": await timed(validated, repeat),
+            "fast_json": await timed(fast, repeat),
+        }
+        results[name]["speedup"] = round(
+            results[name]["response_model"]["median_ms"] / results[name]["fast_json"]["median_ms"], 1
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    results = asyncio.run(measure(args.rows, args.repeat))
+
+    print(f"{args.rows} rows, encoder: {results['encoder']}")
+    for name in ("credits", "ledger"):
+        result = results[name]
+        print(f"{name:<8} response_model {result['response_model']['median_ms']:>8} ms   "
+              f"fast_json {result['fast_json']['median_ms']:>8} ms   x{result['speedup']}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""Endpoint benchmark suite: latency, throughput and queries per request.
+
+Seeds one synthetic shop per size (number of credits), drives every route
+of the app in-process through the ASGI interface and writes the results
+as JSON. Two result files can be compared to flag regressions:
+
+    python benchmarks/suite.py run --sizes 100,10000,1000000 --output after.json
+    python benchmarks/suite.py compare before.json after.json --threshold 0.15
+
+SQLite seeds are kept in --data-dir and reused across runs. --database-url
+points the suite at a Postgres-compatible scratch database instead; its
+tables are dropped and re-seeded for every size.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+SEED_START = date(2024, 1, 1)
+SEED_DAYS = 730
+CREDITS_PER_CUSTOMER = 50
+INSERT_CHUNK = 50000
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def customers_for(size):
+    return max(5, size // CREDITS_PER_CUSTOMER)
+
+
+# --- seeding (runs in a child process so DATABASE_URL is read fresh) -------
+
+def seed(size):
+    from sqlalchemy import insert
+    from core.database import Base, engine
+    from migrations import upgrade, schema_migrations
+    from models.models import User, Customer, Credit, Payment, CustomerBalance
+    from services.monthly_totals import backfill_statement
+
+    if engine.dialect.name != "sqlite":
+        Base.metadata.drop_all(engine)
+        with engine.begin() as conn:
+            schema_migrations.drop(conn, checkfirst=True)
+    upgrade(engine)
+
+    rng = random.Random(size)
+    customers = customers_for(size)
+    credits_total = [0] * (customers + 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{
+            "user_id": 1, "shop_name": "Bench Shop", "owner_name": "Bench",
+            "email": "bench@example.com", "phone": "0", "password": "bench"
+        }])
+        conn.execute(insert(Customer), [
+            {"customer_id": c, "user_id": 1, "name": f"Customer {c}", "phone": str(9000000000 + c)}
+            for c in range(1, customers + 1)
+        ])
+
+        for offset in range(0, size, INSERT_CHUNK):
+            rows = []
+            for n in range(offset, min(size, offset + INSERT_CHUNK)):
+                # Every customer gets a credit before any gets a second one
+                customer_id = n + 1 if n < customers else rng.randint(1, customers)
+                amount = rng.randint(10, 500)
+                credits_total[customer_id] += amount
+                rows.append({
+                    "user_id": 1, "customer_id": customer_id, "amount": amount,
+                    "description": f"Item {n}", "date": SEED_START + timedelta(days=rng.randrange(SEED_DAYS))
+                })
+            conn.execute(insert(Credit), rows)
+
+        payments_total = [0] * (customers + 1)
+        rows = []
+        for customer_id in range(1, customers + 1):
+            paid = credits_total[customer_id] // 4
+            if paid:
+                payments_total[customer_id] = paid
+                rows.append({
+                    "user_id": 1, "customer_id": customer_id, "amount": paid, "payment_method": "cash",
+                    "date": SEED_START + timedelta(days=rng.randrange(SEED_DAYS))
+                })
+        for offset in range(0, len(rows), INSERT_CHUNK):
+            conn.execute(insert(Payment), rows[offset:offset + INSERT_CHUNK])
+
+        conn.execute(insert(CustomerBalance), [{
+            "customer_id": c, "user_id": 1,
+            "total_credits": credits_total[c], "total_payments": payments_total[c],
+            "outstanding": credits_total[c] - payments_total[c]
+        } for c in range(1, customers + 1)])
+        conn.execute(backfill_statement())
+
+    engine.dispose()
+
+
+# --- measuring -------------------------------------------------------------
+
+class Context:
+    def __init__(self, customers, rng):
+        self.customers = customers
+        self.rng = rng
+        self.created = {"customers": [], "credits": [], "payments": [], "tokens": []}
+
+    def customer_id(self):
+        return self.rng.randint(1, self.customers)
+
+    def take(self, kind):
+        return self.created[kind].pop()
+
+
+def scenarios(ctx):
+    """(name, request builder, kind of id to remember from the response, request count factor).
+
+    Each builder returns (method, path, httpx keyword arguments). Single-row
+    writes are paired so the shop keeps its size: every created row is
+    deleted again by a later scenario.
+    """
+    today = date(2025, 6, 1).isoformat()
+
+    def credit_rows():
+        return [
+            {"customer_id": ctx.customer_id(), "amount": "12.50", "date": today}
+            for _ in range(100)
+        ]
+
+    return [
+        ("GET /", lambda: ("GET", "/", {}), None, 1),
+        ("GET /health", lambda: ("GET", "/health", {}), None, 1),
+        ("GET /metrics", lambda: ("GET", "/metrics", {}), None, 1),
+        ("POST /api/auth/register", lambda: ("POST", "/api/auth/register", {"json": {
+            "shop_name": "Other", "owner_name": "Other", "phone": "0", "password": "bench",
+            "email": f"user-{ctx.rng.getrandbits(64)}@example.com"
+        }}), None, 0.1),
+        ("POST /api/auth/login", lambda: ("POST", "/api/auth/login", {"json": {
+            "email": "bench@example.com", "password": "bench"
+        }}), ("tokens", "access_token"), 0.1),
+        ("POST /api/auth/logout", lambda: ("POST", "/api/auth/logout", {
+            "headers": {"Authorization": f"Bearer {ctx.take('tokens')}"}
+        }), None, 0.1),
+        ("GET /api/customers", lambda: ("GET", "/api/customers", {}), None, 1),
+        ("POST /api/customers", lambda: ("POST", "/api/customers", {"json": {
+            "name": "Bench customer", "phone": "1"
+        }}), ("customers", "customer_id"), 1),
+        ("PUT /api/customers/{id}", lambda: ("PUT", f"/api/customers/{ctx.created['customers'][-1]}", {"json": {
+            "name": "Renamed customer", "phone": "2"
+        }}), None, 1),
+        ("DELETE /api/customers/{id}", lambda: ("DELETE", f"/api/customers/{ctx.take('customers')}", {}), None, 1),
+        ("GET /api/credits", lambda: ("GET", "/api/credits", {}), None, 1),
+        ("GET /api/credits?customer_id", lambda: ("GET", "/api/credits", {
+            "params": {"customer_id": ctx.customer_id()}
+        }), None, 1),
+        ("POST /api/credits", lambda: ("POST", "/api/credits", {"json": {
+            "customer_id": ctx.customer_id(), "amount": "25.00", "description": "Bench", "date": today
+        }}), ("credits", "credit_id"), 1),
+        ("DELETE /api/credits/{id}", lambda: ("DELETE", f"/api/credits/{ctx.take('credits')}", {}), None, 1),
+        ("GET /api/payments", lambda: ("GET", "/api/payments", {}), None, 1),
+        ("POST /api/payments", lambda: ("POST", "/api/payments", {"json": {
+            "customer_id": ctx.customer_id(), "amount": "0.01", "payment_method": "cash", "date": today
+        }}), ("payments", "payment_id"), 1),
+        ("DELETE /api/payments/{id}", lambda: ("DELETE", f"/api/payments/{ctx.take('payments')}", {}), None, 1),
+        ("GET /api/dashboard/stats", lambda: ("GET", "/api/dashboard/stats", {}), None, 1),
+        ("GET /api/dashboard/charts", lambda: ("GET", "/api/dashboard/charts", {
+            "params": {"year": 2025}
+        }), None, 1),
+        ("GET /api/ledger/{id}", lambda: ("GET", f"/api/ledger/{ctx.customer_id()}", {}), None, 1),
+        ("GET /api/ledger/{id}/stream", lambda: ("GET", f"/api/ledger/{ctx.customer_id()}/stream", {}), None, 1),
+        ("POST /api/bulk/credits (100 rows)", lambda: ("POST", "/api/bulk/credits", {
+            "json": credit_rows()
+        }), None, 0.1),
+    ]
+
+
+async def measure(size, requests, concurrency):
+    import httpx
+    from sqlalchemy import event
+    from main import app
+    from core.database import engine, async_engine, dispose_engines
+
+    queries = 0
+
+    def count_query(*args):
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine, "before_cursor_execute", count_query)
+    if async_engine is not None:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count_query)
+
+    ctx = Context(customers_for(size), random.Random(42))
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        login = await client.post("/api/auth/login", json={"email": "bench@example.com", "password": "bench"})
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        for name, build, remember, factor in scenarios(ctx):
+            total = max(1, int(requests * factor))
+            latencies, errors = [], 0
+            queries_before = queries
+
+            async def send(method, path, kwargs):
+                nonlocal errors
+                started = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+                elif remember is not None:
+                    kind, field = remember
+                    ctx.created[kind].append(response.json()[field])
+
+            async def worker(share):
+                for _ in range(share):
+                    await send(*build())
+
+            started = time.perf_counter()
+            shares = [total // concurrency + (1 if n < total % concurrency else 0) for n in range(concurrency)]
+            await asyncio.gather(*(worker(share) for share in shares if share))
+            elapsed = time.perf_counter() - started
+
+            results[name] = {
+                "requests": total,
+                "errors": errors,
+                "p50_ms": round(statistics.median(latencies) * 1000, 3),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+                "rps": round(total / elapsed, 1),
+                "queries_per_request": round((queries - queries_before) / total, 2),
+            }
+
+    await dispose_engines()
+    return results
+
+
+def child(args):
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    if args.child == "seed":
+        seed(args.size)
+    else:
+        print(json.dumps(asyncio.run(measure(args.size, args.requests, args.concurrency))))
+
+
+def run_child(mode, size, env, args):
+    command = [sys.executable, os.path.abspath(__file__), "run", "--child", mode, "--size", str(size),
+               "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        sys.stderr.write(output.stderr)
+        raise SystemExit(f"{mode} failed for size {size}")
+    return output.stdout
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    if args.child:
+        child(args)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), "shopkhata-bench")
+    os.makedirs(data_dir, exist_ok=True)
+    env = dict(os.environ, CACHE_BACKEND=args.cache_backend)
+    if args.db_async is not None:
+        env["DB_ASYNC"] = args.db_async
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "database": "url" if args.database_url else "sqlite",
+            "db_async": env.get("DB_ASYNC", "false"),
+            "cache_backend": args.cache_backend,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": {},
+    }
+
+    for size in sizes:
+        started = time.perf_counter()
+        if args.database_url:
+            size_env = dict(env, DATABASE_URL=args.database_url)
+            run_child("seed", size, size_env, args)
+        else:
+            seeded = os.path.join(data_dir, f"seed-{size}.db")
+            if not os.path.exists(seeded):
+                run_child("seed", size, dict(env, DATABASE_URL=f"sqlite:///{seeded}.partial"), args)
+                os.replace(f"{seeded}.partial", seeded)
+            working = os.path.join(data_dir, f"run-{size}.db")
+            shutil.copy(seeded, working)
+            size_env = dict(env, DATABASE_URL=f"sqlite:///{working}")
+        seeded_in = time.perf_counter() - started
+
+        results = json.loads(run_child("measure", size, size_env, args).strip().splitlines()[-1])
+        report["results"][str(size)] = results
+        print(f"\n== {size} credits (seed ready in {seeded_in:.1f}s)")
+        print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+
+def print_results(results):
+    print(f"{'endpoint':<36} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'queries':>8} {'errors':>7}")
+    for name, result in results.items():
+        print(f"{name:<36} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9} "
+              f"{result['rps']:>9} {result['queries_per_request']:>8} {result['errors']:>7}")
+
+
+def compare(args):
+    with open(args.before) as fh:
+        before = json.load(fh)["results"]
+    with open(args.after) as fh:
+        after = json.load(fh)["results"]
+
+    regressions = 0
+    for size in after:
+        if size not in before:
+            continue
+        print(f"\n== {size} credits")
+        print(f"{'endpoint':<36} {'p95 before':>11} {'p95 after':>11} {'change':>8} {'queries':>11}  flags")
+        for name, new in after[size].items():
+            old = before[size].get(name)
+            if old is None:
+                continue
+            change = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+            flags = []
+            if change > args.threshold:
+                flags.append("SLOWER")
+            if old["rps"] and (old["rps"] - new["rps"]) / old["rps"] > args.threshold:
+                flags.append("LOWER RPS")
+            if new["queries_per_request"] > old["queries_per_request"]:
+                flags.append("MORE QUERIES")
+            if new["errors"] > old["errors"]:
+                flags.append("ERRORS")
+            regressions += bool(flags)
+            queries = f"{old['queries_per_request']}->{new['queries_per_request']}"
+            print(f"{name:<36} {old['p95_ms']:>11} {new['p95_ms']:>11} {change:>+8.0%} {queries:>11}  {' '.join(flags)}")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Seed and benchmark every endpoint")
+    run_parser.add_argument("--sizes", default="100,10000,1000000", help="Comma-separated credit counts")
+    run_parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument("--database-url", help="Scratch Postgres-compatible database (tables are dropped)")
+    run_parser.add_argument("--data-dir", help="Where SQLite seeds are kept between runs")
+    run_parser.add_argument("--db-async", choices=["true", "false"], help="Override DB_ASYNC")
+    run_parser.add_argument("--cache-backend", default="none",
+                            help="CACHE_BACKEND for the run; off by default so reads hit the database")
+    run_parser.add_argument("--output", help="Write results as JSON to this file")
+    run_parser.add_argument("--child", choices=["seed", "measure"], help=argparse.SUPPRESS)
+    run_parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions between two result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Relative p95 / req/s change that counts as a regression")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()